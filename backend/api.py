@@ -0,0 +1,180 @@
+import hashlib
+import json
+from flask import Blueprint, Response, jsonify, request, session
+from backend.database import get_db
+from backend.archive import tickets_source, comments_source
+from backend.models import TICKET_FILTERS, TICKET_SORTS, USER_FILTERS, USER_SORTS
+from backend.paging import keyset_page
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+TICKET_FIELDS = ("id", "username", "title", "category", "description", "email", "phone",
+                 "attachment", "status", "created_at", "closed_at", "assignee", "due_at", "escalated_at")
+COMMENT_FIELDS = ("id", "ticket_id", "technician", "comment", "created_at")
+USER_FIELDS = ("id", "username", "role")
+COMMENT_FILTERS = {"ticket_id": "ticket_id = ?"}
+COMMENT_SORTS = {"oldest": ("ASC", ("created_at", "id"))}
+
+# Representative keyset queries, checked by migrations.check_query_plans.
+HOT_QUERIES = [
+    ("api_tickets_page", "SELECT id, title FROM tickets WHERE status = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+     ("open", "2024-01-01 00:00:00", 10, 51), False),
+    ("api_comments_page", "SELECT id, comment FROM comments WHERE ticket_id = ? AND (created_at, id) > (?, ?) ORDER BY created_at ASC, id ASC LIMIT ?",
+     (1, "2024-01-01 00:00:00", 10, 51), False),
+    ("api_table_versions", "SELECT name, version FROM table_versions WHERE name IN (?, ?)", ("tickets", "comments"), False),
+]
+
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(e):
+    return jsonify({"error": e.message}), e.status
+
+
+@api.before_request
+def require_login():
+    if "user" not in session:
+        return jsonify({"error": "Authentication required."}), 401
+
+
+def current_user():
+    return session["user"]
+
+
+def require_technician():
+    if current_user()["role"] != "technician":
+        raise ApiError("Unauthorized access.", 403)
+
+
+def table_versions(*tables):
+    conn = get_db()
+    placeholders = ",".join("?" * len(tables))
+    rows = conn.execute(f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})", tables).fetchall()
+    return {row["name"]: row["version"] for row in rows}
+
+
+def etag_for(*tables):
+    """ETag for the current request, derived from per-table change counters.
+
+    It changes whenever one of ``tables`` is written, or the URL or the
+    caller changes, without running the query itself.
+    """
+    key = json.dumps([request.full_path, current_user(), table_versions(*tables)], sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(tables, build):
+    """Answer 304 if the client's copy is current, otherwise call ``build``.
+
+    Access checks must run before this, since a 304 skips ``build``.
+    """
+    etag = etag_for(*tables)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    response = jsonify(build())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def page_limit():
+    limit = request.args.get("limit", API_PAGE_SIZE, type=int)
+    return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+
+def selected_fields(allowed, required):
+    """Columns for ``?fields=a,b``; the keyset columns are always included."""
+    fields = request.args.get("fields")
+    if not fields:
+        return list(allowed)
+    chosen = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in chosen if f not in allowed]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(list(required) + chosen))
+
+
+def listing(source, fields, filters, allowed, sort, sorts):
+    """The page of ``source`` selected by ``?cursor=`` and ``?limit=``, with
+    the cursors of the pages after and before it."""
+    try:
+        page = keyset_page(get_db(), source, filters, allowed, sort, sorts, request.args.get("cursor"),
+                           page_limit(), fields)
+    except ValueError as e:
+        raise ApiError(str(e))
+    return {"data": page["rows"], "next_cursor": page["next_cursor"], "prev_cursor": page["prev_cursor"]}
+
+
+def include_archived():
+    """``?include_archived=1`` extends ticket reads to the archive."""
+    return request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+
+
+def ticket_visible(ticket_id):
+    row = get_db().execute(
+        f"SELECT username FROM {tickets_source(include_archived())} WHERE id = ?", (ticket_id,)
+    ).fetchone()
+    if not row:
+        raise ApiError("Ticket not found.", 404)
+    user = current_user()
+    if user["role"] != "technician" and row["username"] != user["username"]:
+        raise ApiError("Unauthorized access.", 403)
+
+
+@api.route("/tickets")
+def list_tickets():
+    fields = selected_fields(TICKET_FIELDS, ("id", "created_at"))
+    user = current_user()
+    username = request.args.get("username") if user["role"] == "technician" else user["username"]
+    filters = [("username", username)] + [(name, request.args.get(name)) for name in ("status", "category", "assignee")]
+    return conditional(
+        ("tickets",),
+        lambda: listing(tickets_source(include_archived()), fields, filters, TICKET_FILTERS, "newest", TICKET_SORTS)
+    )
+
+
+@api.route("/tickets/<int:ticket_id>")
+def get_ticket(ticket_id):
+    fields = selected_fields(TICKET_FIELDS, ("id",))
+    # Checked before the ETag, so a 304 never answers for a ticket the caller may not see.
+    ticket_visible(ticket_id)
+
+    def build():
+        row = get_db().execute(
+            f"SELECT {', '.join(fields)} FROM {tickets_source(include_archived())} WHERE id = ?", (ticket_id,)
+        ).fetchone()
+        return {"data": dict(row)}
+    return conditional(("tickets",), build)
+
+
+@api.route("/tickets/<int:ticket_id>/comments")
+def list_comments(ticket_id):
+    fields = selected_fields(COMMENT_FIELDS, ("id", "created_at"))
+    ticket_visible(ticket_id)
+
+    def build():
+        return listing(comments_source(include_archived()), fields, [("ticket_id", ticket_id)], COMMENT_FILTERS,
+                       "oldest", COMMENT_SORTS)
+    return conditional(("tickets", "comments"), build)
+
+
+@api.route("/users")
+def list_users():
+    require_technician()
+    fields = selected_fields(USER_FIELDS, ("id",))
+    return conditional(
+        ("users",),
+        lambda: listing("users", fields, [("role", request.args.get("role"))], USER_FILTERS, "id", USER_SORTS)
+    )
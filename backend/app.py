@@ -1,25 +1,63 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from backend.database import init_db, get_db
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, abort, send_from_directory
+from backend.database import get_db, init_app
+from backend.cache import get_or_set, cache_stats
+from backend import assets, metrics
+from backend.migrations import ensure_schema
+from backend.api import api
+from backend.events import stream
+from backend.reporting import weekly_counts, weekly_counts_by, category_breakdown, backlog, time_to_close_percentiles
+from backend.search import search_tickets, search_users as search_usernames, clamp_page, SEARCH_PAGE_SIZE
+from backend.similarity import similar_open_tickets, incident_clusters, SUGGESTION_LIMIT
 from backend.auth import login_required, role_required
-from backend.models import create_ticket, get_tickets, get_ticket_counts_by_week, create_user, get_users, send_ticket_confirmation, get_ticket_by_id
-from backend.emailer import send_email
+from backend.models import get_ticket_page, get_ticket_facets, get_user_page, get_user_role_counts, listing_key, TICKET_SORTS, USER_SORTS, TICKET_STATUSES, TICKET_CATEGORIES
+from backend.models import create_ticket, get_tickets, get_ticket_counts_by_week, create_user, get_users, get_ticket_by_id, get_comments, get_user_by_username, authenticate, create_comment, update_ticket_status, attach_comment_previews, bulk_update_tickets, reassign_ticket, get_technician_profile, set_technician_availability, set_user_role, remove_user, set_password
 import os, re
-from werkzeug.security import check_password_hash, generate_password_hash
+from markupsafe import Markup
+from backend.passwords import check_password, HashingBusy
+from backend.writer import WriterBusy
 from werkzeug.utils import secure_filename
+from backend.attachments import store_upload, discard_upload, get_attachment, serve_attachment, AttachmentTooLarge, MAX_ATTACHMENT_BYTES, ATTACHMENT_OFFLOAD
 
 UPLOAD_FOLDER = "frontend/static/attachments"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "pdf", "docx"}
 
 app = Flask(__name__, template_folder="../frontend/templates", static_folder="../frontend/static")
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+# Reject oversized bodies before they are parsed; the slack covers the form fields.
+app.config["MAX_CONTENT_LENGTH"] = MAX_ATTACHMENT_BYTES + 1024 * 1024
+app.config["USE_X_SENDFILE"] = ATTACHMENT_OFFLOAD == "x-sendfile"
 app.secret_key = os.getenv("SECRET_KEY", "devkey")
+init_app(app)
+metrics.init_app(app)
+assets.init_app(app)
+app.register_blueprint(api)
+# With APP_PRELOAD, create_app() compiles every template before workers fork.
+APP_PRELOAD = os.getenv("APP_PRELOAD", "1") == "1"
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-init_db()
+def wants_json():
+    """True for the dashboard's fetch() calls, which ask for JSON instead of a redirect."""
+    return request.accept_mimetypes.best == "application/json"
+
+def render_fragment(key, template, load):
+    """Render a template fragment once per data version; ``load`` supplies its context."""
+    return get_or_set(("fragment",) + key, lambda: Markup(render_template(template, **load())))
+
+# Filters a listing page takes from the query string.
+TICKET_LIST_FILTERS = ("status", "category", "created_from", "created_to")
+
+def listing_request(names, default_sort):
+    """(filters, sort, cursor) of a listing page from the query string."""
+    filters = {name: request.args[name] for name in names if request.args.get(name)}
+    return filters, request.args.get("sort", default_sort), request.args.get("cursor") or None
 
 # ---- Routes ----
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    return assets.serve_asset(filename)
+
 @app.route("/")
 def welcome():
     return render_template("welcome.html")
@@ -29,62 +67,88 @@ def welcome():
 @role_required("technician")
 def add_comment(ticket_id):
     comment = request.form["comment"]
-    conn = get_db()
-    conn.execute("INSERT INTO comments (ticket_id, technician, comment) VALUES (?, ?, ?)",
-                 (ticket_id, session["user"]["username"], comment))
-    conn.commit()
-    ticket = get_ticket_by_id(ticket_id)
-    send_email(
-        to=ticket["email"],
-        subject="New Comment on Your Ticket",
-        body=f"Dear {ticket['username']},\n\nA new comment has been added to your ticket '{ticket['title']}'. Please log in to view the details.\n\nThank you!"
-    )
-    conn.close()
+    if not create_comment(ticket_id, session["user"]["username"], comment):
+        if wants_json():
+            return jsonify({"error": "Ticket not found."}), 404
+        flash("Ticket not found.", "danger")
+        return redirect(url_for("technician_dashboard"))
+    if wants_json():
+        return jsonify({"ok": True, "ticket_id": ticket_id})
     flash("Comment added and student notified.", "success")
     return redirect(url_for("technician_dashboard"))
 
+@app.route("/ticket/<int:ticket_id>/comments")
+@login_required
+def ticket_comments(ticket_id):
+    ticket = get_ticket_by_id(ticket_id, include_archived=True)
+    if not ticket:
+        return jsonify({"error": "Ticket not found."}), 404
+    user = session["user"]
+    if user["role"] != "technician" and ticket["username"] != user["username"]:
+        return jsonify({"error": "Unauthorized access."}), 403
+    return jsonify(get_comments(ticket_id, include_archived=True))
+
 @app.route("/ticket/<int:ticket_id>/status", methods=["POST"])
 @login_required
 @role_required("technician")
 def change_status(ticket_id):
     status = request.form["status"]
-    conn = get_db()
-    conn.execute("UPDATE tickets SET status=? WHERE id=?", (status, ticket_id))
-    conn.commit()
-    ticket = get_ticket_by_id(ticket_id)
-    send_email(
-        to=ticket["email"],
-        subject="Ticket Status Updated",
-        body=f"Dear {ticket['username']},\n\nThe status of your ticket '{ticket['title']}' has been updated to '{status}'. Please log in to view the details.\n\nThank you!"
-    )
-    conn.close()
+    try:
+        ticket = update_ticket_status(ticket_id, status)
+    except ValueError as e:
+        if wants_json():
+            return jsonify({"error": str(e)}), 400
+        flash(str(e), "danger")
+        return redirect(url_for("technician_dashboard"))
+    if not ticket:
+        if wants_json():
+            return jsonify({"error": "Ticket not found."}), 404
+        flash("Ticket not found.", "danger")
+        return redirect(url_for("technician_dashboard"))
+    if wants_json():
+        return jsonify({"ok": True, "ticket_id": ticket_id, "status": status})
     flash("Status updated.", "success")
     return redirect(url_for("technician_dashboard"))
 
+@app.route("/tickets/bulk", methods=["POST"])
+@login_required
+@role_required("technician")
+def bulk_ticket_action():
+    ticket_ids = request.form.getlist("ticket_ids", type=int)
+    status = request.form.get("status") or None
+    comment = request.form.get("comment", "").strip() or None
+    try:
+        if not ticket_ids:
+            raise ValueError("Select at least one ticket.")
+        results = bulk_update_tickets(ticket_ids, session["user"]["username"], status, comment)
+    except ValueError as e:
+        if wants_json():
+            return jsonify({"error": str(e)}), 400
+        flash(str(e), "danger")
+        return redirect(url_for("technician_dashboard"))
+    updated = sum(1 for r in results if r["ok"] and r["changed"])
+    failed = sum(1 for r in results if not r["ok"])
+    if wants_json():
+        return jsonify({"results": results, "updated": updated, "failed": failed})
+    flash(f"{updated} tickets updated, {failed} failed.", "success" if not failed else "danger")
+    return redirect(url_for("technician_dashboard"))
+
 @app.route("/users/edit/<int:user_id>", methods=["GET", "POST"])
 @login_required
 @role_required("technician")
 def edit_user(user_id):
-    conn = get_db()
-    user = conn.execute("SELECT id, username, role FROM users WHERE id = ?", (user_id,)).fetchone()
+    user = get_db().execute("SELECT id, username, role FROM users WHERE id = ?", (user_id,)).fetchone()
     if request.method == "POST":
-        new_role = request.form["role"]
-        conn.execute("UPDATE users SET role=? WHERE id=?", (new_role, user_id))
-        conn.commit()
-        conn.close()
+        set_user_role(user_id, request.form["role"])
         flash("User updated successfully.", "success")
         return redirect(url_for("users"))
-    conn.close()
     return render_template("edit_user.html", user=user)
 
 @app.route("/users/delete/<int:user_id>", methods=["POST"])
 @login_required
 @role_required("technician")
 def delete_user(user_id):
-    conn = get_db()
-    conn.execute("DELETE FROM users WHERE id=?", (user_id,))
-    conn.commit()
-    conn.close()
+    remove_user(user_id)
     flash("User deleted successfully.", "success")
     return redirect(url_for("users"))
 
@@ -92,12 +156,7 @@ def delete_user(user_id):
 @login_required
 @role_required("technician")
 def reset_user_password(user_id):
-    new_pw = request.form["new_password"]
-    hashed_pw = generate_password_hash(new_pw)
-    conn = get_db()
-    conn.execute("UPDATE users SET password=? WHERE id=?", (hashed_pw, user_id))
-    conn.commit()
-    conn.close()
+    set_password(user_id, request.form["new_password"])
     flash("Password reset successfully.", "success")
     return redirect(url_for("users"))
 
@@ -106,10 +165,8 @@ def index():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
-        conn = get_db()
-        user = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
-        conn.close()
-        if user and check_password_hash(user["password"], password):
+        user = authenticate(username, password)
+        if user:
             session["user"] = {"username": user["username"], "role": user["role"]}
             if user["role"] == "student":
                 return redirect(url_for("student_dashboard"))
@@ -121,51 +178,47 @@ def index():
 @login_required
 @role_required("student")
 def student_dashboard():
-    tickets = get_tickets(session["user"]["username"])
-    return render_template("student.html", tickets=tickets, user=session["user"])
-
-# @app.route("/api/tickets", methods=["GET"])
-# def api_get_tickets():
-#     tickets = get_tickets()
-#     return jsonify(tickets)
-
+    username = session["user"]["username"]
+    archived = request.args.get("archived") == "1"
+    filters, sort, cursor = listing_request(TICKET_LIST_FILTERS, "newest")
+    chosen = dict(filters)
+    filters["username"] = username
+    try:
+        page = get_ticket_page(filters, sort, cursor, include_archived=archived)
+        facets = get_ticket_facets(filters, include_archived=archived)
+    except ValueError as e:
+        abort(400, str(e))
+    ticket_list = render_fragment(("student-tickets", listing_key(filters), sort, cursor, archived), "_student_tickets.html",
+                                  lambda: {"tickets": page["rows"]})
+    return render_template("student.html", ticket_list=ticket_list, archived=archived, user=session["user"],
+                           page=page, facets=facets, filters=chosen, sort=sort, sorts=TICKET_SORTS,
+                           statuses=TICKET_STATUSES, categories=TICKET_CATEGORIES)
 
 @app.route("/users")
 @login_required
 @role_required("technician")
 def users():
-    page = int(request.args.get("page", 1))
-    per_page = 10
-    offset = (page - 1) * per_page
-    conn = get_db()
-    users = conn.execute("SELECT id, username, role FROM users ORDER BY id LIMIT ? OFFSET ?", (per_page, offset)).fetchall()
-    total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-    conn.close()
-    user_list = [dict(u) for u in users]
-    return render_template("users.html", users=user_list, user=session["user"], page=page, total=total, per_page=per_page)
+    filters, sort, cursor = listing_request(("role",), "id")
+    try:
+        page = get_user_page(filters, sort, cursor)
+    except ValueError as e:
+        abort(400, str(e))
+    role_counts = get_user_role_counts()
+    user_rows = render_fragment(("user-rows", listing_key(filters), sort, cursor), "_user_rows.html",
+                                lambda: {"users": page["rows"]})
+    return render_template("users.html", user_rows=user_rows, user=session["user"], page=page, filters=filters,
+                           sort=sort, sorts=USER_SORTS, role_counts=role_counts, total=sum(role_counts.values()))
 
 @app.route("/users/search")
 @login_required
 @role_required("technician")
 def search_users():
     query = request.args.get("q", "")
-    page = int(request.args.get("page", 1))
-    per_page = 10
-    offset = (page - 1) * per_page
-    conn = get_db()
-    users = conn.execute(
-        "SELECT id, username, role FROM users WHERE username LIKE ? ORDER BY id LIMIT ? OFFSET ?",
-        (f"%{query}%", per_page, offset)
-    ).fetchall()
-    total = conn.execute(
-        "SELECT COUNT(*) FROM users WHERE username LIKE ?",
-        (f"%{query}%",)
-    ).fetchone()[0]
-    conn.close()
-    user_list = [dict(u) for u in users]
+    page, per_page = clamp_page(request.args.get("page", 1, type=int), 10)
+    user_list, total = search_usernames(query, page, per_page)
     return render_template(
         "users.html",
-        users=user_list,
+        user_rows=Markup(render_template("_user_rows.html", users=user_list)),
         user=session["user"],
         query=query,
         page=page,
@@ -173,12 +226,144 @@ def search_users():
         per_page=per_page
     )
 
+@app.route("/search")
+@login_required
+def search():
+    user = session["user"]
+    page, per_page = clamp_page(request.args.get("page", 1, type=int),
+                                request.args.get("per_page", SEARCH_PAGE_SIZE, type=int))
+    results, total = search_tickets(
+        request.args.get("q", ""),
+        status=request.args.get("status") or None,
+        category=request.args.get("category") or None,
+        # Students only ever search their own tickets.
+        username=None if user["role"] == "technician" else user["username"],
+        page=page,
+        per_page=per_page,
+        include_archived=request.args.get("archived") == "1",
+    )
+    for result in results:
+        result["snippet"] = str(result["snippet"])
+    return jsonify({"results": results, "total": total, "page": page, "per_page": per_page})
+
+# view -> (filters for the signed-in technician, default sort)
+TECHNICIAN_VIEWS = {
+    "mine": (lambda username: {"assignee": username, "open": True}, "due"),
+    "unassigned": (lambda username: {"unassigned": True, "open": True}, "due"),
+    "all": (lambda username: {}, "newest"),
+}
+
 @app.route("/technician")
 @login_required
 @role_required("technician")
 def technician_dashboard():
-    tickets = get_tickets()
-    return render_template("technician.html", tickets=tickets, user=session["user"])
+    """The technician's own queue by default; the backlog or every ticket on request."""
+    username = session["user"]["username"]
+    view = request.args.get("view", "mine")
+    if view not in TECHNICIAN_VIEWS:
+        view = "mine"
+    view_filters, default_sort = TECHNICIAN_VIEWS[view]
+    filters, sort, cursor = listing_request(TICKET_LIST_FILTERS + ("username",), default_sort)
+    chosen = dict(filters)
+    filters.update(view_filters(username))
+    try:
+        page = get_ticket_page(filters, sort, cursor)
+        facets = get_ticket_facets(filters)
+    except ValueError as e:
+        abort(400, str(e))
+    ticket_grid = render_fragment(("technician-grid", listing_key(filters), sort, cursor), "_ticket_grid.html",
+                                  lambda: {"tickets": page["rows"]})
+    # Live inserts go to the top, which is only right on an unfiltered first page.
+    live_insert = not chosen and not cursor and sort == default_sort
+    return render_template("technician.html", ticket_grid=ticket_grid, clusters=incident_clusters(), user=session["user"],
+                           view=view, profile=get_technician_profile(username), page=page, facets=facets, filters=chosen,
+                           sort=sort, sorts=TICKET_SORTS, statuses=TICKET_STATUSES, categories=TICKET_CATEGORIES,
+                           live_insert=live_insert)
+
+@app.route("/ticket/<int:ticket_id>/assign", methods=["POST"])
+@login_required
+@role_required("technician")
+def take_ticket(ticket_id):
+    if not reassign_ticket(ticket_id, session["user"]["username"]):
+        if wants_json():
+            return jsonify({"error": "Only open tickets can be taken."}), 400
+        flash("Only open tickets can be taken.", "danger")
+        return redirect(url_for("technician_dashboard"))
+    if wants_json():
+        return jsonify({"ok": True, "ticket_id": ticket_id, "assignee": session["user"]["username"]})
+    flash("Ticket added to your queue.", "success")
+    return redirect(url_for("technician_dashboard"))
+
+@app.route("/technician/availability", methods=["POST"])
+@login_required
+@role_required("technician")
+def technician_availability():
+    available = request.form.get("available") == "1"
+    moved = set_technician_availability(session["user"]["username"], available)
+    if available:
+        flash("You are back on the rota; new tickets will be assigned to you.", "success")
+    else:
+        flash(f"You are off the rota; {moved} open tickets were handed to other technicians.", "success")
+    return redirect(url_for("technician_dashboard"))
+
+@app.route("/tickets/similar")
+@login_required
+def similar_tickets():
+    """Open tickets resembling a draft, so students can spot a known incident.
+
+    Students only see their own tickets; other people's are counted, since
+    their titles can carry personal details.
+    """
+    title, description = request.args.get("title", ""), request.args.get("description", "")
+    user = session["user"]
+    if user["role"] == "technician":
+        return jsonify({"results": similar_open_tickets(title, description)})
+    matches = similar_open_tickets(title, description, limit=None)
+    own = [m for m in matches if m["username"] == user["username"]]
+    for match in own:
+        del match["username"]
+    return jsonify({"results": own[:SUGGESTION_LIMIT], "others": len(matches) - len(own)})
+
+@app.route("/ticket/<int:ticket_id>/card")
+@login_required
+@role_required("technician")
+def ticket_card(ticket_id):
+    ticket = get_ticket_by_id(ticket_id)
+    if not ticket:
+        abort(404)
+    attach_comment_previews(get_db(), [ticket])
+    return render_template("_ticket_card.html", ticket=ticket)
+
+@app.route("/events")
+@login_required
+@role_required("technician")
+def event_stream():
+    # The stream outlives the request context, so it must not hold a pooled
+    # database connection; the in-memory broker needs none.
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    return Response(
+        stream(last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/metrics")
+def metrics_endpoint():
+    user = session.get("user")
+    if not metrics.METRICS_ENABLED:
+        abort(404)
+    # A local reverse proxy also connects from localhost, so forwarded
+    # requests need a technician session.
+    local = request.remote_addr in ("127.0.0.1", "::1") and "X-Forwarded-For" not in request.headers
+    if not local and (not user or user["role"] != "technician"):
+        abort(403)
+    return Response(metrics.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+@app.route("/cache/stats")
+@login_required
+@role_required("technician")
+def cache_statistics():
+    return jsonify(cache_stats())
 
 @app.route("/ticket/new", methods=["POST"])
 @login_required
@@ -190,20 +375,119 @@ def new_ticket():
     email = request.form["email"]
     phone = request.form["phone"]
     attachment = request.files.get("attachment")
-    if attachment and allowed_file(attachment.filename):
-        filename = secure_filename(attachment.filename)
-        attachment.save(os.path.join(app.config["UPLOAD_FOLDER"], filename))
-    create_ticket(session["user"]["username"], title, category, description, email, phone, filename if attachment else None)
-    send_ticket_confirmation(email, title)
+    stored = None
+    if attachment and attachment.filename:
+        if not allowed_file(attachment.filename):
+            flash("Attachments must be one of: " + ", ".join(sorted(ALLOWED_EXTENSIONS)) + ".", "danger")
+            return redirect(url_for("student_dashboard"))
+        try:
+            stored = store_upload(attachment)
+        except AttachmentTooLarge as e:
+            flash(str(e), "danger")
+            return redirect(url_for("student_dashboard"))
+    try:
+        ticket_id = create_ticket(
+            session["user"]["username"], title, category, description, email, phone,
+            secure_filename(attachment.filename) if stored else None,
+            upload=stored,
+        )
+    except Exception:
+        # The file was written before the ticket; don't leave it orphaned.
+        if stored:
+            discard_upload(stored)
+        raise
     flash("Ticket created successfully!", "success")
+    similar = similar_open_tickets(title, description, exclude=ticket_id)
+    if similar:
+        flash(f"{len(similar)} open tickets look like the same issue; technicians will handle them together.", "info")
     return redirect(url_for("student_dashboard"))
 
+@app.route("/ticket/<int:ticket_id>/attachment")
+@login_required
+def ticket_attachment(ticket_id):
+    ticket = get_ticket_by_id(ticket_id, include_archived=True)
+    user = session["user"]
+    if not ticket or not ticket["attachment"]:
+        abort(404)
+    if user["role"] != "technician" and ticket["username"] != user["username"]:
+        abort(403)
+    if ticket["attachment_id"]:
+        return serve_attachment(get_attachment(ticket["attachment_id"]), ticket["attachment"])
+    # Uploads from before the attachment store live under static/attachments.
+    return send_from_directory(os.path.abspath(app.config["UPLOAD_FOLDER"]), ticket["attachment"], conditional=True)
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(e):
+    # Sign-ins are queued behind a bounded hashing pool; when it is full,
+    # ask the client to come back instead of tying up another worker.
+    return Response("Too many sign-ins at once, please try again in a moment.", 503, {"Retry-After": "2"}, mimetype="text/plain")
+
+@app.errorhandler(WriterBusy)
+def writer_busy(e):
+    # The write queue is full or the database stayed locked; nothing was saved.
+    if wants_json():
+        return jsonify({"error": "The server is busy, please try again."}), 503, {"Retry-After": "1"}
+    return Response("The server is busy and your change was not saved, please try again.", 503, {"Retry-After": "1"}, mimetype="text/plain")
+
+@app.errorhandler(413)
+def attachment_too_large(e):
+    message = f"Attachments are limited to {MAX_ATTACHMENT_BYTES // (1024 * 1024)} MB."
+    if wants_json() or request.blueprint == "api":
+        return jsonify({"error": message}), 413
+    flash(message, "danger")
+    user = session.get("user")
+    if not user:
+        return redirect(url_for("index"))
+    return redirect(url_for("technician_dashboard" if user["role"] == "technician" else "student_dashboard"))
+
 @app.route("/reporting")
 @login_required
 @role_required("technician")
 def reporting():
     data = get_ticket_counts_by_week()
-    return render_template("reporting.html", data=data)
+    return render_template(
+        "reporting.html",
+        data=data,
+        categories=category_breakdown(),
+        backlog=backlog(),
+        time_to_close=time_to_close_percentiles(),
+    )
+
+def report_filters():
+    return {
+        "since": request.args.get("since") or None,
+        "until": request.args.get("until") or None,
+    }
+
+@app.route("/api/reporting/weekly")
+@login_required
+@role_required("technician")
+def reporting_weekly():
+    by = request.args.get("by")
+    category = request.args.get("category") or None
+    if by:
+        if by not in ("category", "status", "assignee"):
+            return jsonify({"error": "by must be category, status or assignee."}), 400
+        return jsonify(weekly_counts_by(by, category=category, **report_filters()))
+    return jsonify(weekly_counts(category=category, **report_filters()))
+
+@app.route("/api/reporting/categories")
+@login_required
+@role_required("technician")
+def reporting_categories():
+    return jsonify(category_breakdown(**report_filters()))
+
+@app.route("/api/reporting/backlog")
+@login_required
+@role_required("technician")
+def reporting_backlog():
+    return jsonify(backlog())
+
+@app.route("/api/reporting/time-to-close")
+@login_required
+@role_required("technician")
+def reporting_time_to_close():
+    return jsonify(time_to_close_percentiles(category=request.args.get("category") or None, **report_filters()))
 
 def is_valid_password(password):
     """Check password complexity"""
@@ -268,26 +552,25 @@ def change_password():
     if request.method == "POST":
         old_pw = request.form["old_password"]
         new_pw = request.form["new_password"]
-        conn = get_db()
-        user = conn.execute("SELECT * FROM users WHERE username = ?", (session["user"]["username"],)).fetchone()
-        if user and check_password_hash(user["password"], old_pw):
-            hashed_pw = generate_password_hash(new_pw)
-            conn.execute("UPDATE users SET password=? WHERE username=?", (hashed_pw, user["username"]))
-            conn.commit()
+        user = get_user_by_username(session["user"]["username"])
+        if user and check_password(user["password"], old_pw):
+            set_password(user["id"], new_pw)
             flash("Password changed!", "success")
         else:
             flash("Old password incorrect.", "danger")
-        conn.close()
     return render_template("change_password.html", user=session["user"])
 
 @app.route("/ticket/<int:ticket_id>/close", methods=["POST"])
 @login_required
 @role_required("technician")
 def close_ticket(ticket_id):
-    conn = get_db()
-    conn.execute("UPDATE tickets SET status='closed' WHERE id=?", (ticket_id,))
-    conn.commit()
-    conn.close()
+    if not update_ticket_status(ticket_id, "closed", notify=False):
+        if wants_json():
+            return jsonify({"error": "Ticket not found."}), 404
+        flash("Ticket not found.", "danger")
+        return redirect(url_for("technician_dashboard"))
+    if wants_json():
+        return jsonify({"ok": True, "ticket_id": ticket_id, "status": "closed"})
     flash("Ticket closed.", "success")
     return redirect(url_for("technician_dashboard"))
 
@@ -297,5 +580,29 @@ def logout():
     flash("Logged out.", "info")
     return redirect(url_for("welcome"))
 
+_created = False
+
+def create_app(preload=APP_PRELOAD):
+    """Return the app ready to serve: schema current, asset manifest loaded,
+    and with ``preload`` every template compiled.
+
+    Importing this module does no database work; serve through this
+    factory, e.g. ``gunicorn --preload "backend.app:create_app()"``, so the
+    master does it once and workers fork warm. No pooled connection is
+    opened here, so none is shared across the fork.
+    """
+    global _created
+    if not _created:
+        ensure_schema()
+        assets.use_bytecode_cache(app)
+        if assets.load_manifest():
+            for path in assets.missing_vendored():
+                app.logger.warning("%s is not vendored; pages load it from %s. Run build-assets.",
+                                   path, assets.VENDORED[path])
+        if preload:
+            assets.compile_templates(app)
+        _created = True
+    return app
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
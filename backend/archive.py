@@ -0,0 +1,199 @@
+import os
+import time
+from backend.database import get_db, release_db
+from backend.cache import bump_data_version
+from backend.scheduler import sla_case_sql
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# Pause between batches so request writes are not starved of the write lock.
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", "0.05"))
+
+TICKET_COLUMNS = ("id", "username", "title", "category", "description", "email", "phone",
+                  "attachment", "status", "created_at", "closed_at", "attachment_id", "assignee", "due_at",
+                  "escalated_at")
+COMMENT_COLUMNS = ("id", "ticket_id", "technician", "comment", "created_at")
+
+# The archive file is not versioned by MIGRATIONS, since it can be moved or
+# recreated on its own; these statements are applied whenever the schema is
+# checked.
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.tickets (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        title TEXT,
+        category TEXT,
+        description TEXT,
+        email TEXT,
+        phone TEXT,
+        attachment TEXT,
+        status TEXT,
+        created_at TIMESTAMP,
+        closed_at TIMESTAMP,
+        attachment_id INTEGER,
+        assignee TEXT,
+        due_at TIMESTAMP,
+        escalated_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_tickets_username_created ON tickets (username, created_at)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_tickets_created ON tickets (created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS archive.comments (
+        id INTEGER PRIMARY KEY,
+        ticket_id INTEGER,
+        technician TEXT,
+        comment TEXT,
+        created_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_comments_ticket_created ON comments (ticket_id, created_at)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS archive.tickets_fts USING fts5(
+        title, description, category, comments,
+        tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+SQL_ARCHIVE_CANDIDATES = """
+SELECT id FROM tickets
+WHERE status = 'closed' AND closed_at < datetime('now', ?)
+ORDER BY closed_at
+LIMIT ?
+"""
+
+HOT_QUERIES = [
+    ("archive_candidates", SQL_ARCHIVE_CANDIDATES, ("-180 days", 500), False),
+]
+
+
+# Columns added to tickets after the archive file may have been created.
+ARCHIVE_ADDED_COLUMNS = (("assignee", "TEXT"), ("due_at", "TIMESTAMP"), ("escalated_at", "TIMESTAMP"))
+
+
+def ensure_archive_schema(conn):
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement)
+    existing = {row[1] for row in conn.execute("PRAGMA archive.table_info(tickets)")}
+    for column, kind in ARCHIVE_ADDED_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE archive.tickets ADD COLUMN {column} {kind}")
+    if "due_at" not in existing:
+        # Listings sorted by deadline need one on every row, as migration 11
+        # gave the live tickets.
+        conn.execute(f"UPDATE archive.tickets SET due_at = {sla_case_sql('category', 'COALESCE(created_at, archived_at)')}")
+    conn.commit()
+
+
+def tickets_source(include_archived=False):
+    """FROM clause for tickets, optionally with the archived ones."""
+    if not include_archived:
+        return "tickets"
+    columns = ", ".join(TICKET_COLUMNS)
+    return f"(SELECT {columns} FROM main.tickets UNION ALL SELECT {columns} FROM archive.tickets)"
+
+
+def comments_source(include_archived=False):
+    if not include_archived:
+        return "comments"
+    columns = ", ".join(COMMENT_COLUMNS)
+    return f"(SELECT {columns} FROM main.comments UNION ALL SELECT {columns} FROM archive.comments)"
+
+
+def archive_batch(conn, ids):
+    """Copy tickets ``ids`` and their comments to the archive, then delete them.
+
+    In WAL mode a transaction spanning attached files is atomic per file
+    only, so the copy uses INSERT OR REPLACE: if a crash leaves rows in
+    both files, the next pass copies them again and finishes the delete.
+    """
+    placeholders = ",".join("?" * len(ids))
+    columns = ", ".join(TICKET_COLUMNS)
+    comment_columns = ", ".join(COMMENT_COLUMNS)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            f"INSERT OR REPLACE INTO archive.tickets ({columns}) SELECT {columns} FROM main.tickets WHERE id IN ({placeholders})",
+            ids
+        )
+        conn.execute(
+            f"INSERT OR REPLACE INTO archive.comments ({comment_columns}) "
+            f"SELECT {comment_columns} FROM main.comments WHERE ticket_id IN ({placeholders})",
+            ids
+        )
+        conn.execute(f"DELETE FROM archive.tickets_fts WHERE rowid IN ({placeholders})", ids)
+        conn.execute(
+            f"""
+            INSERT INTO archive.tickets_fts (rowid, title, description, category, comments)
+            SELECT t.id, t.title, t.description, t.category,
+                   COALESCE((SELECT group_concat(c.comment, ' ') FROM main.comments c WHERE c.ticket_id = t.id), '')
+            FROM main.tickets t WHERE t.id IN ({placeholders})
+            """,
+            ids
+        )
+        # Tickets first: their search rows go with them, so the comment
+        # triggers that follow have no search document left to rewrite.
+        conn.execute(f"DELETE FROM main.tickets WHERE id IN ({placeholders})", ids)
+        conn.execute(f"DELETE FROM main.comments WHERE ticket_id IN ({placeholders})", ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def archive_closed(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None,
+                   pause=ARCHIVE_PAUSE_SECONDS, echo=None):
+    """Move tickets closed more than ``older_than_days`` ago, a batch at a time.
+
+    Returns the number of tickets archived. The reporting rollups are not
+    decremented, so reports keep covering archived tickets.
+    """
+    conn = get_db()
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = [r[0] for r in conn.execute(SQL_ARCHIVE_CANDIDATES, (f"-{older_than_days} days", batch_size))]
+        if not ids:
+            break
+        archive_batch(conn, ids)
+        total += len(ids)
+        batches += 1
+        if echo:
+            echo(f"Archived {total} tickets.")
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    if total:
+        bump_data_version()
+    return total
+
+
+def vacuum():
+    """Compact the archive and reclaim the pages archival freed in the main file."""
+    conn = get_db()
+    conn.commit()
+    conn.execute("VACUUM archive")
+    conn.execute("VACUUM main")
+
+
+def run_archiver(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, interval=3600, echo=print):
+    """Archive in the background: one pass every ``interval`` seconds."""
+    try:
+        while True:
+            count = archive_closed(older_than_days, batch_size)
+            if count:
+                echo(f"Archive pass moved {count} tickets.")
+            time.sleep(interval)
+    finally:
+        release_db()
+
+
+def archive_stats():
+    conn = get_db()
+    return {
+        "hot_tickets": conn.execute("SELECT COUNT(*) FROM main.tickets").fetchone()[0],
+        "archived_tickets": conn.execute("SELECT COUNT(*) FROM archive.tickets").fetchone()[0],
+        "archived_comments": conn.execute("SELECT COUNT(*) FROM archive.comments").fetchone()[0],
+    }
@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import urllib.request
+from flask import request, send_from_directory, url_for
+from jinja2 import FileSystemBytecodeCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, "frontend", "static")
+# Built assets: content-hashed copies of the static files, their
+# precompressed variants and the manifest mapping one to the other.
+ASSET_DIR = os.getenv("ASSET_DIR") or os.path.join(STATIC_DIR, "dist")
+ASSET_MANIFEST = os.path.join(ASSET_DIR, "manifest.json")
+# Hashed names never change content, so browsers may keep them for a year.
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR") or os.path.join(ROOT, ".jinja-cache")
+# Static subdirectories that are not assets.
+SKIP_DIRS = {"dist", "attachments"}
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+
+CHART_JS_URL = os.getenv("CHART_JS_URL", "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js")
+# Third-party files kept under static/vendor, and where they are fetched from.
+VENDORED = {
+    "vendor/chart.umd.min.js": CHART_JS_URL,
+}
+
+_manifest = {}
+
+
+def vendor(force=False, echo=None):
+    """Download the VENDORED files that are missing; returns the paths fetched."""
+    fetched = []
+    for path, url in VENDORED.items():
+        target = os.path.join(STATIC_DIR, path)
+        if os.path.exists(target) and not force:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            body = response.read()
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, target)
+        fetched.append(path)
+        if echo:
+            echo(f"Vendored {path} from {url} ({len(body)} bytes)")
+    return fetched
+
+
+def missing_vendored():
+    """VENDORED paths not fetched yet; asset_url() sends browsers to their CDN."""
+    return [path for path in VENDORED if not os.path.exists(os.path.join(STATIC_DIR, path))]
+
+
+def source_files():
+    """Logical paths ("css/styles.css") of every static asset."""
+    for directory, dirs, files in os.walk(STATIC_DIR):
+        if directory == STATIC_DIR:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            if not name.startswith(".") and not name.endswith(".tmp"):
+                yield os.path.relpath(os.path.join(directory, name), STATIC_DIR).replace(os.sep, "/")
+
+
+def hashed_name(path, body):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:16]}{ext}"
+
+
+def write_file(path, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def build_assets(echo=None):
+    """Copy each static file to ASSET_DIR under a content-hashed name, with
+    .gz and (when the brotli package is installed) .br variants, and write
+    the manifest. Files from earlier builds are kept, so pages already
+    served keep working during a deploy. Vendored files that are missing
+    are reported through ``echo``; pages then load them from their CDN.
+    """
+    manifest = {}
+    totals = {"files": 0, "bytes": 0, "gzip": 0, "brotli": 0}
+    for path in source_files():
+        with open(os.path.join(STATIC_DIR, path), "rb") as f:
+            body = f.read()
+        name = hashed_name(path, body)
+        manifest[path] = name
+        target = os.path.join(ASSET_DIR, name)
+        totals["files"] += 1
+        totals["bytes"] += len(body)
+        if not os.path.exists(target):
+            write_file(target, body)
+        if os.path.splitext(path)[1] not in COMPRESSIBLE:
+            continue
+        # mtime=0 keeps the .gz bytes identical across builds.
+        for kind, suffix, compress in (("gzip", ".gz", lambda b: gzip.compress(b, compresslevel=9, mtime=0)),
+                                       ("brotli", ".br", brotli and (lambda b: brotli.compress(b, quality=11)))):
+            if compress is None or os.path.exists(target + suffix):
+                continue
+            compressed = compress(body)
+            if len(compressed) < len(body):
+                write_file(target + suffix, compressed)
+                totals[kind] += 1
+    write_file(ASSET_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    if echo:
+        echo(f"Built {totals['files']} assets ({totals['bytes']} bytes) into {ASSET_DIR}; "
+             f"{totals['gzip']} gzip and {totals['brotli']} brotli variants written.")
+        if brotli is None:
+            echo("Install the brotli package to also write .br variants.")
+        for path in missing_vendored():
+            echo(f"Warning: {path} is not vendored; pages will load it from {VENDORED[path]}.")
+    return manifest
+
+
+def load_manifest():
+    global _manifest
+    try:
+        with open(ASSET_MANIFEST) as f:
+            _manifest = json.load(f)
+    except FileNotFoundError:
+        _manifest = {}
+    return _manifest
+
+
+def asset_url(path):
+    """URL of a static file: its hashed build when there is one, the plain
+    static file otherwise, and the upstream URL of a vendored file that has
+    not been fetched."""
+    if path in _manifest:
+        return url_for("asset", filename=_manifest[path])
+    if path in VENDORED and path in missing_vendored():
+        return VENDORED[path]
+    return url_for("static", filename=path)
+
+
+def serve_asset(filename):
+    """Send a built asset, precompressed when the client accepts it."""
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if candidate in request.accept_encodings and os.path.isfile(os.path.join(ASSET_DIR, filename + suffix)):
+            encoding = candidate
+            filename += suffix
+            break
+    response = send_from_directory(ASSET_DIR, filename, mimetype=mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def use_bytecode_cache(app):
+    """Create JINJA_CACHE_DIR and keep compiled templates there."""
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+
+
+def compile_templates(app):
+    """Compile every template once, filling the bytecode cache; returns the count."""
+    use_bytecode_cache(app)
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    # The bytecode cache is attached by create_app(), so importing the app
+    # writes nothing to disk.
+    app.jinja_env.globals["asset_url"] = asset_url
+    load_manifest()
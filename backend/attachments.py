@@ -0,0 +1,115 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+from flask import Response, send_file
+from backend.database import get_db
+
+ATTACHMENT_DIR = os.path.abspath(os.getenv("ATTACHMENT_DIR", "attachments"))
+MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", str(10 * 1024 * 1024)))
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+# "" serves files from the worker, "x-sendfile" hands them to Apache/lighttpd
+# (Flask's USE_X_SENDFILE), "x-accel-redirect" hands them to nginx through an
+# internal location mapped onto ATTACHMENT_DIR at ATTACHMENT_ACCEL_PREFIX.
+ATTACHMENT_OFFLOAD = os.getenv("ATTACHMENT_OFFLOAD", "").lower()
+ATTACHMENT_ACCEL_PREFIX = os.getenv("ATTACHMENT_ACCEL_PREFIX", "/protected-attachments/")
+ATTACHMENT_MAX_AGE = int(os.getenv("ATTACHMENT_MAX_AGE", "3600"))
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+def blob_path(sha256):
+    return os.path.join(ATTACHMENT_DIR, sha256[:2], sha256)
+
+
+def store_upload(file_storage, max_bytes=MAX_ATTACHMENT_BYTES):
+    """Stream an upload to the content-addressed store.
+
+    The file is copied in chunks while its SHA-256 is computed, so it never
+    sits in worker memory, and identical content is stored once. Returns
+    the blob's sha256, size and mime_type, and whether this upload created
+    the file; record_attachment() writes its row inside the write that
+    creates the ticket referencing it, and discard_upload() removes the
+    file when that write fails.
+    """
+    tmp_dir = os.path.join(ATTACHMENT_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file_storage.stream.read(ATTACHMENT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AttachmentTooLarge(f"Attachments are limited to {max_bytes // (1024 * 1024)} MB.")
+                digest.update(chunk)
+                out.write(chunk)
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        created = not os.path.exists(path)
+        if not created:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    mime_type = (mimetypes.guess_type(file_storage.filename or "")[0]
+                 or file_storage.mimetype or "application/octet-stream")
+    return {"sha256": sha256, "size": size, "mime_type": mime_type, "created": created}
+
+
+def discard_upload(blob):
+    """Remove a blob store_upload() created when no attachment row refers to it."""
+    if not blob["created"]:
+        return
+    if get_db().execute("SELECT 1 FROM attachments WHERE sha256 = ?", (blob["sha256"],)).fetchone():
+        return
+    try:
+        os.remove(blob_path(blob["sha256"]))
+    except FileNotFoundError:
+        pass
+
+
+def record_attachment(conn, blob):
+    """Insert the row for a stored blob, or find the existing one; does not commit."""
+    conn.execute(
+        "INSERT INTO attachments (sha256, size, mime_type) VALUES (?, ?, ?) ON CONFLICT (sha256) DO NOTHING",
+        (blob["sha256"], blob["size"], blob["mime_type"])
+    )
+    row = conn.execute("SELECT * FROM attachments WHERE sha256 = ?", (blob["sha256"],)).fetchone()
+    return dict(row)
+
+
+def get_attachment(attachment_id):
+    row = get_db().execute("SELECT * FROM attachments WHERE id = ?", (attachment_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def serve_attachment(attachment, download_name):
+    """Response for a stored attachment with ETag and Range support."""
+    path = blob_path(attachment["sha256"])
+    if ATTACHMENT_OFFLOAD == "x-accel-redirect":
+        response = Response(mimetype=attachment["mime_type"])
+        response.headers["X-Accel-Redirect"] = ATTACHMENT_ACCEL_PREFIX + os.path.relpath(path, ATTACHMENT_DIR).replace(os.sep, "/")
+        response.headers["Content-Disposition"] = f'inline; filename="{download_name}"'
+        response.set_etag(attachment["sha256"])
+        return response
+    # send_file answers Range and If-None-Match itself when conditional=True,
+    # and emits X-Sendfile instead of the body when USE_X_SENDFILE is set.
+    return send_file(
+        path,
+        mimetype=attachment["mime_type"],
+        download_name=download_name,
+        conditional=True,
+        etag=attachment["sha256"],
+        max_age=ATTACHMENT_MAX_AGE,
+    )
@@ -0,0 +1,206 @@
+import json
+import math
+import platform
+import random
+import sqlite3
+import threading
+import time
+from backend.database import get_db, release_db, enable_statement_counting, DB_PATH
+from backend.metrics import statement_count
+from backend.seed import SEED_PASSWORD, SUBJECTS, CATEGORY_WEIGHTS
+
+# Relative weight of each route in the default mixed workload.
+DEFAULT_MIX = {
+    "login": 5,
+    "student_dashboard": 30,
+    "technician_dashboard": 15,
+    "search": 20,
+    "reporting": 10,
+    "create_ticket": 12,
+    "add_comment": 8,
+}
+PERCENTILES = (50, 95, 99)
+SEARCH_TERMS = sorted({word for subjects in SUBJECTS.values() for subject in subjects for word in subject.split()})
+
+
+class Worker:
+    """One benchmark thread with a logged-in student and technician client."""
+
+    def __init__(self, app, rng, students, technicians, max_ticket_id):
+        self.app = app
+        self.rng = rng
+        self.students = students
+        self.technicians = technicians
+        self.max_ticket_id = max_ticket_id
+        self.student = self.login(rng.choice(students))
+        self.technician = self.login(rng.choice(technicians))
+
+    def login(self, username):
+        client = self.app.test_client()
+        client.post("/login", data={"username": username, "password": SEED_PASSWORD})
+        return client
+
+    def run(self, route):
+        rng = self.rng
+        if route == "login":
+            client = self.app.test_client()
+            return client.post("/login", data={"username": rng.choice(self.students), "password": SEED_PASSWORD})
+        if route == "student_dashboard":
+            return self.student.get("/student")
+        if route == "technician_dashboard":
+            return self.technician.get("/technician")
+        if route == "search":
+            return self.technician.get("/search", query_string={"q": rng.choice(SEARCH_TERMS)})
+        if route == "reporting":
+            return self.technician.get("/reporting")
+        if route == "create_ticket":
+            return self.student.post("/ticket/new", data={
+                "title": "Benchmark ticket",
+                "category": rng.choice(list(CATEGORY_WEIGHTS)),
+                "description": f"The {rng.choice(SEARCH_TERMS)} is not working.",
+                "email": "bench@campus.example",
+                "phone": "555-0000",
+            })
+        if route == "add_comment":
+            ticket_id = rng.randint(1, self.max_ticket_id)
+            return self.technician.post(f"/ticket/{ticket_id}/comment", data={"comment": "Benchmark comment."})
+        raise ValueError(f"Unknown route: {route}")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _sample_users():
+    conn = get_db()
+    students = [r[0] for r in conn.execute("SELECT username FROM users WHERE role = 'student' ORDER BY id LIMIT 1000")]
+    technicians = [r[0] for r in conn.execute("SELECT username FROM users WHERE role = 'technician' ORDER BY id LIMIT 100")]
+    max_ticket_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tickets").fetchone()[0]
+    dataset = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("users", "tickets", "comments")
+    }
+    release_db()
+    if not students or not technicians or not max_ticket_id:
+        raise ValueError("The benchmark needs seeded students, technicians and tickets; run `seed` first.")
+    return students, technicians, max_ticket_id, dataset
+
+
+def run_bench(workers=4, requests=1000, warmup=10, mix=None, seed=1):
+    """Drive the app through the Flask test client and return per-route stats.
+
+    Each worker thread runs its share of ``requests`` routes drawn from
+    ``mix`` with its own seeded RNG, so the sequence of routes is the same on
+    every run. Writes go to DB_PATH, so point it at a copy of a seeded file.
+    """
+    enable_statement_counting()
+    # Imported here: creating the app migrates the database to the latest version.
+    from backend.app import create_app
+    app = create_app()
+    mix = mix or DEFAULT_MIX
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    students, technicians, max_ticket_id, dataset = _sample_users()
+
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    lock = threading.Lock()
+    ready = threading.Barrier(workers + 1)
+
+    def work(index):
+        rng = random.Random(seed * 1000 + index)
+        worker = Worker(app, rng, students, technicians, max_ticket_id)
+        for route in rng.choices(routes, weights, k=warmup):
+            worker.run(route)
+        plan = rng.choices(routes, weights, k=requests // workers + (index < requests % workers))
+        local = []
+        ready.wait()
+        for route in plan:
+            before = statement_count()
+            start = time.perf_counter()
+            try:
+                status = worker.run(route).status_code
+            except Exception:
+                status = 599
+            local.append((route, time.perf_counter() - start, statement_count() - before, status))
+        with lock:
+            for route, elapsed, statements, status in local:
+                samples[route].append((elapsed, statements))
+                if status >= 500:
+                    errors[route] += 1
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for route in routes:
+        latencies = sorted(s[0] * 1000 for s in samples[route])
+        count = len(latencies)
+        if not count:
+            continue
+        stats = {"requests": count, "errors": errors[route]}
+        for p in PERCENTILES:
+            stats[f"p{p}_ms"] = round(percentile(latencies, p), 2)
+        stats["mean_ms"] = round(sum(latencies) / count, 2)
+        stats["max_ms"] = round(latencies[-1], 2)
+        stats["throughput_rps"] = round(count / elapsed, 2)
+        stats["sql_per_request"] = round(sum(s[1] for s in samples[route]) / count, 2)
+        results[route] = stats
+    total = sum(r["requests"] for r in results.values())
+    return {
+        "meta": {
+            "db_path": DB_PATH,
+            "dataset": dataset,
+            "workers": workers,
+            "seed": seed,
+            "mix": mix,
+            "elapsed_seconds": round(elapsed, 3),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "routes": results,
+        "total": {
+            "requests": total,
+            "errors": sum(r["errors"] for r in results.values()),
+            "throughput_rps": round(total / elapsed, 2),
+        },
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """List regressions of ``results`` against a saved ``baseline`` run.
+
+    A route regresses when its p95 latency grows by more than ``threshold``
+    (a fraction), when it runs more SQL statements per request, or when it
+    starts failing.
+    """
+    regressions = []
+    for route, current in results["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{route}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["sql_per_request"] > before["sql_per_request"] + 0.5:
+            regressions.append(f"{route}: SQL per request {before['sql_per_request']} -> {current['sql_per_request']}")
+        if current["errors"] > before["errors"]:
+            regressions.append(f"{route}: errors {before['errors']} -> {current['errors']}")
+    before_total = baseline.get("total", {}).get("throughput_rps")
+    if before_total and results["total"]["throughput_rps"] < before_total * (1 - threshold):
+        regressions.append(f"throughput {before_total} -> {results['total']['throughput_rps']} req/s")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
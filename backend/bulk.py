@@ -0,0 +1,273 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from backend.database import get_db
+from backend.cache import bump_data_version
+from backend.passwords import hash_many
+from backend.similarity import rebuild_similarity_index
+
+# Columns that may be imported and exported per table, and the unique key an
+# import upserts on. Rows without their key are always inserted.
+TABLES = {
+    "tickets": {
+        "columns": ("id", "username", "title", "category", "description", "email", "phone",
+                    "attachment", "status", "created_at", "closed_at", "assignee", "due_at", "escalated_at"),
+        "key": "id",
+        "required": ("username", "title"),
+    },
+    "comments": {
+        "columns": ("id", "ticket_id", "technician", "comment", "created_at"),
+        "key": "id",
+        "required": ("ticket_id", "comment"),
+    },
+    "users": {
+        "columns": ("id", "username", "password", "role"),
+        "key": "username",
+        "required": ("username", "password", "role"),
+    },
+}
+EXPORT_COLUMNS = {
+    "tickets": TABLES["tickets"]["columns"],
+    "comments": TABLES["comments"]["columns"],
+    # Password hashes stay in the database.
+    "users": ("id", "username", "role"),
+}
+CONFLICT_MODES = ("update", "skip", "fail")
+PASSWORD_HASH_PREFIXES = ("scrypt:", "pbkdf2:")
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        return "jsonl"
+    if path.endswith(".csv"):
+        return "csv"
+    raise BulkImportError(f"Cannot tell the format of {path}; pass --format csv or --format jsonl.")
+
+
+def read_rows(path, fmt):
+    """Yield (line_number, row dict) from a CSV or JSONL file, one row at a time."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                # CSV has no null; an empty field means no value.
+                yield reader.line_num, {k: (v if v != "" else None) for k, v in row.items()}
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+
+def upsert_sql(table, columns, on_conflict):
+    spec = TABLES[table]
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if on_conflict == "fail" or spec["key"] not in columns:
+        return sql
+    if on_conflict == "skip":
+        return sql + f" ON CONFLICT ({spec['key']}) DO NOTHING"
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != spec["key"])
+    return sql + f" ON CONFLICT ({spec['key']}) DO UPDATE SET {updates}"
+
+
+def prepare(table, columns, line_number, row, defaults):
+    values = []
+    for column in columns:
+        value = row.get(column)
+        if value is None:
+            value = defaults.get(column)
+        if value is None and column in TABLES[table]["required"]:
+            raise BulkImportError(f"Line {line_number}: missing {column}.")
+        if column == "password" and not isinstance(value, str):
+            raise BulkImportError(f"Line {line_number}: password must be a string.")
+        if not isinstance(value, (str, int, float, type(None))):
+            raise BulkImportError(f"Line {line_number}: {column} must be a string or a number.")
+        values.append(value)
+    return values
+
+
+def drop_existing(conn, table, columns, batch):
+    """Leave out rows whose key is already stored, before any work is spent on them."""
+    key = TABLES[table]["key"]
+    if key not in columns:
+        return batch
+    index = columns.index(key)
+    keys = [row[index] for row in batch if row[index] is not None]
+    existing = set()
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        existing.update(r[0] for r in conn.execute(
+            f"SELECT {key} FROM {table} WHERE {key} IN ({', '.join('?' * len(chunk))})", chunk
+        ))
+    return [row for row in batch if row[index] not in existing]
+
+
+def hash_passwords(pool, batch, index):
+    """Replace plain-text passwords at ``index`` of each row with hashes."""
+    plain = [row for row in batch if not row[index].startswith(PASSWORD_HASH_PREFIXES)]
+    for row, hashed in zip(plain, hash_many(pool, [row[index] for row in plain])):
+        row[index] = hashed
+
+
+def load_checkpoint(path, source):
+    """Return the last committed line of ``source``, or 0."""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != os.path.abspath(source) or checkpoint.get("size") != os.path.getsize(source):
+        raise BulkImportError(f"Checkpoint {path} belongs to a different file; remove it or pass --restart.")
+    return checkpoint["line"]
+
+
+def save_checkpoint(path, source, table, line):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"source": os.path.abspath(source), "size": os.path.getsize(source), "table": table, "line": line}, f)
+    os.replace(tmp, path)
+
+
+def import_file(table, path, fmt=None, batch_size=1000, on_conflict="update", checkpoint=None, restart=False,
+                defaults=None, processes=None, echo=None):
+    """Stream rows from ``path`` into ``table`` in batched transactions.
+
+    Each batch is one ``executemany`` and one commit, after which the
+    checkpoint file records the last line committed; a rerun resumes after
+    it. Rows that carry the table's key are upserted (or skipped), so
+    replaying a batch after a crash does not duplicate it. Plain-text
+    passwords are hashed a batch at a time on a pool of ``processes``.
+    """
+    if table not in TABLES:
+        raise BulkImportError(f"Unknown table: {table}")
+    if on_conflict not in CONFLICT_MODES:
+        raise BulkImportError(f"Unknown conflict mode: {on_conflict}")
+    fmt = detect_format(path, fmt)
+    checkpoint = checkpoint or path + ".checkpoint"
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    resume_after = load_checkpoint(checkpoint, path)
+    defaults = defaults or {}
+    conn = get_db()
+    columns = sql = pool = None
+    batch, last_line, done = [], resume_after, 0
+    started = time.monotonic()
+
+    def flush():
+        nonlocal batch, done, pool
+        if on_conflict == "skip":
+            batch = drop_existing(conn, table, columns, batch)
+        if "password" in columns and batch:
+            pool = pool or ProcessPoolExecutor(processes)
+            hash_passwords(pool, batch, columns.index("password"))
+        try:
+            conn.executemany(sql, batch)
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            raise BulkImportError(f"Batch ending at line {last_line}: {e}")
+        conn.commit()
+        done += len(batch)
+        batch = []
+        save_checkpoint(checkpoint, path, table, last_line)
+        if echo:
+            elapsed = time.monotonic() - started
+            echo(f"{table}: {done} rows imported ({done / elapsed:.0f} rows/s)")
+
+    try:
+        for line_number, row in read_rows(path, fmt):
+            if columns is None:
+                columns = [c for c in TABLES[table]["columns"] if c in row or c in defaults]
+                missing = [c for c in TABLES[table]["required"] if c not in columns]
+                if missing:
+                    raise BulkImportError(f"{path} has no {', '.join(missing)} column.")
+                sql = upsert_sql(table, columns, on_conflict)
+            if line_number <= resume_after:
+                continue
+            batch.append(prepare(table, columns, line_number, row, defaults))
+            last_line = line_number
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if done:
+            bump_data_version()
+    if table == "tickets" and done:
+        # Imported text bypasses create_ticket, so it is indexed here.
+        rebuild_similarity_index()
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return {"rows": done, "resumed_after_line": resume_after, "seconds": round(time.monotonic() - started, 2)}
+
+
+def export_query(table, since=None, status=None):
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    clauses, params = [], []
+    if since:
+        if table == "users":
+            raise ValueError("Users have no creation time to filter on.")
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if status:
+        if table != "tickets":
+            raise ValueError("Only tickets have a status.")
+        clauses.append("status = ?")
+        params.append(status)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return f"SELECT {', '.join(EXPORT_COLUMNS[table])} FROM {table}{where} ORDER BY id", params
+
+
+def export_rows(table, since=None, status=None, batch_size=1000):
+    """Yield rows of ``table`` in id order from one cursor, a batch at a time.
+
+    A single cursor reads one consistent snapshot, so an audit export does
+    not mix rows from before and after a concurrent write.
+    """
+    sql, params = export_query(table, since, status)
+    cur = get_db().execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        cur.close()
+
+
+def export_file(table, output="-", fmt=None, since=None, status=None, batch_size=1000, echo=None):
+    """Write ``table`` to ``output`` ("-" for stdout) as CSV or JSONL."""
+    fmt = fmt or (detect_format(output) if output != "-" else "jsonl")
+    out = sys.stdout if output == "-" else open(output, "w", newline="", encoding="utf-8")
+    started = time.monotonic()
+    count = 0
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS[table])
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda row: out.write(json.dumps(row) + "\n")
+        for row in export_rows(table, since, status, batch_size):
+            write(row)
+            count += 1
+            if echo and count % (batch_size * 10) == 0:
+                echo(f"{table}: {count} rows exported ({count / (time.monotonic() - started):.0f} rows/s)")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if echo:
+        echo(f"{table}: {count} rows exported in {time.monotonic() - started:.1f}s")
+    return count
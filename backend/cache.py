@@ -0,0 +1,178 @@
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+from backend.database import get_db
+
+# "local" keeps the data version in this process, bumped by the write paths;
+# "sqlite" reads the per-table change counters that triggers maintain in the
+# database file, so every gunicorn worker sees every other worker's writes.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local").lower()
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+
+
+def copy_value(value):
+    """Copy the dicts and lists of a cached value; everything else in it
+    (strings, numbers, Markup) is immutable and shared."""
+    if isinstance(value, dict):
+        return {k: copy_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_value(v) for v in value]
+    return value
+
+
+def approx_size(value, depth=0):
+    """Rough memory footprint of a cached value, used for the byte bound."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    size = sys.getsizeof(value)
+    if depth > 3:
+        return size
+    if isinstance(value, dict):
+        size += sum(approx_size(k, depth + 1) + approx_size(v, depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v, depth + 1) for v in value)
+    return size
+
+
+class LRUCache:
+    """Thread-safe LRU with an entry bound, a byte bound and a TTL."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        """Return (found, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, size, expires = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value):
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class LocalVersion:
+    def __init__(self):
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._version
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+
+
+class SQLiteVersion:
+    def current(self):
+        return get_db().execute("SELECT COALESCE(SUM(version), 0) FROM table_versions").fetchone()[0]
+
+    def bump(self):
+        # The table_versions triggers already counted the write.
+        pass
+
+
+VERSION_BACKENDS = {"local": LocalVersion, "sqlite": SQLiteVersion}
+
+if CACHE_BACKEND not in VERSION_BACKENDS:
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+cache = LRUCache()
+data_version = VERSION_BACKENDS[CACHE_BACKEND]()
+
+
+def bump_data_version():
+    """Call after every committed write that cached views may depend on."""
+    data_version.bump()
+
+
+def get_or_set(key, build):
+    """Return the cached value for ``key`` at the current data version,
+    building and storing it on a miss.
+
+    Every caller gets its own copy, so changing a result does not change
+    what the next request sees.
+    """
+    if not CACHE_ENABLED:
+        return build()
+    versioned_key = (key, data_version.current())
+    found, value = cache.get(versioned_key)
+    if found:
+        return copy_value(value)
+    value = build()
+    cache.set(versioned_key, copy_value(value))
+    return value
+
+
+def cached(name):
+    """Cache a function's result per arguments and data version."""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return get_or_set(key, lambda: f(*args, **kwargs))
+        wrapper.uncached = f
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    stats = cache.stats()
+    stats["backend"] = CACHE_BACKEND
+    stats["data_version"] = data_version.current()
+    return stats
@@ -1,6 +1,20 @@
 import click
-from backend.database import init_db
+import json
+from backend.migrations import init_db, migrate, check_query_plans, current_version
+from backend.database import connect
+from backend import assets, metrics
 from backend.models import get_ticket_counts_by_week
+from backend.search import rebuild_search_index
+from backend.reporting import rebuild_rollups
+from backend.similarity import rebuild_similarity_index, benchmark as bench_similarity
+from backend.seed import seed, SCALES
+from backend.bench import run_bench, compare, load_results, DEFAULT_MIX
+from backend.bulk import import_file, export_file, BulkImportError, TABLES, CONFLICT_MODES
+from backend.archive import archive_closed, run_archiver, vacuum, archive_stats, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from backend.scheduler import update_profile, set_availability, assign_backlog, technician_profiles, run_sla_worker
+from backend.writer import write
+from backend.cache import bump_data_version
+from backend.outbox import run_worker, outbox_stats, retry_dead, OUTBOX_BATCH_SIZE, OUTBOX_POLL_SECONDS
 
 @click.group()
 def cli():
@@ -11,11 +25,285 @@ def init():
     init_db()
     click.echo("Database initialized.")
 
+@cli.command("migrate")
+@click.option("--target", type=int, default=None, help="Stop after this schema version.")
+def migrate_command(target):
+    applied = migrate(target=target)
+    for version, name in applied:
+        click.echo(f"Applied migration {version}: {name}")
+    conn = connect()
+    click.echo(f"Schema is at version {current_version(conn)}.")
+    conn.close()
+
+@cli.command("check-plans")
+@click.option("--live", is_flag=True, help="Explain against DB_PATH and its statistics instead of a fresh schema.")
+def check_plans(live):
+    failed = False
+    conn = connect() if live else None
+    try:
+        for name, plan, problems in check_query_plans(conn):
+            status = "FULL SCAN" if problems else "ok"
+            click.echo(f"{name}: {status}")
+            for detail in plan:
+                click.echo(f"    {detail}")
+            failed = failed or bool(problems)
+    finally:
+        if conn is not None:
+            conn.close()
+    if failed:
+        raise click.ClickException("One or more queries fall back to a full table scan.")
+
 @cli.command()
 def report():
     data = get_ticket_counts_by_week()
     for row in data:
         click.echo(f"Week {row['week']}: {row['count']} tickets")
 
+@cli.command("outbox-worker")
+@click.option("--batch-size", type=int, default=OUTBOX_BATCH_SIZE, show_default=True)
+@click.option("--poll-interval", type=float, default=OUTBOX_POLL_SECONDS, show_default=True, help="Seconds to sleep when the outbox is empty.")
+@click.option("--once", is_flag=True, help="Drain what is due now and exit.")
+@click.option("--metrics-port", type=int, default=None, help="Serve this worker's metrics on 127.0.0.1:PORT (needs METRICS_ENABLED=1).")
+def outbox_worker(batch_size, poll_interval, once, metrics_port):
+    """Deliver queued notification emails over one reused SMTP session."""
+    if metrics_port:
+        metrics.serve(metrics_port)
+    run_worker(batch_size=batch_size, poll_seconds=poll_interval, once=once, echo=click.echo)
+
+@cli.command("outbox-status")
+def outbox_status():
+    stats = outbox_stats()
+    for status in ("pending", "sent", "dead"):
+        click.echo(f"{status}: {stats.get(status, 0)}")
+
+@cli.command("outbox-retry-dead")
+def outbox_retry_dead():
+    count = retry_dead()
+    click.echo(f"Requeued {count} dead-lettered messages.")
+
+@cli.command()
+def reindex():
+    """Rebuild the full-text search indexes from the tickets and users tables."""
+    count = rebuild_search_index()
+    click.echo(f"Reindexed {count} tickets.")
+
+@cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the reporting rollups from the live and archived tickets."""
+    count = rebuild_rollups()
+    click.echo(f"Rolled up {count} tickets.")
+
+@cli.command("rebuild-similarity")
+def rebuild_similarity_command():
+    """Rebuild the duplicate-ticket similarity index from the open tickets."""
+    init_db()
+    count = rebuild_similarity_index()
+    click.echo(f"Indexed {count} open tickets.")
+
+@cli.command("bench-similarity")
+@click.option("--queries", type=int, default=200, show_default=True, help="Lookups of random open tickets to time.")
+@click.option("--seed", "random_seed", type=int, default=1, show_default=True)
+@click.option("--no-brute-force", is_flag=True, help="Skip the full comparison used to measure recall.")
+def bench_similarity_command(queries, random_seed, no_brute_force):
+    """Time the similarity index on DB_PATH and print JSON results."""
+    init_db()
+    try:
+        results = bench_similarity(queries, random_seed, brute_force=not no_brute_force)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps(results, indent=2))
+
+@cli.command()
+@click.argument("username", required=False)
+@click.option("--skills", default=None, help="Categories the technician handles first, e.g. 'IT,Facilities'.")
+@click.option("--capacity", type=int, default=None, help="Open tickets before new ones go to others.")
+@click.option("--available/--offline", default=None, help="Put the technician on or off the rota.")
+def technician(username, skills, capacity, available):
+    """Show technicians' assignment profiles, or change one."""
+    init_db()
+    if username:
+        assigned = write(update_profile, username, skills, capacity)
+        if assigned is None:
+            raise click.ClickException(f"{username} is not a technician.")
+        moved = []
+        if available is not None:
+            moved, more = write(set_availability, username, available)
+            assigned += more
+        bump_data_version()
+        click.echo(f"{len(moved)} tickets unassigned, {len(assigned)} assigned from the backlog.")
+    for profile in technician_profiles():
+        if username and profile["username"] != username:
+            continue
+        state = "available" if profile["available"] else "offline"
+        click.echo(f"{profile['username']}: {state}, {profile['open_tickets']} open tickets, "
+                   f"capacity {'default' if profile['capacity'] is None else profile['capacity']}, skills: {profile['skills'] or '-'}")
+
+@cli.command("assign-backlog")
+def assign_backlog_command():
+    """Assign unassigned open tickets while technicians have capacity."""
+    init_db()
+    assigned = write(assign_backlog)
+    if assigned:
+        bump_data_version()
+    click.echo(f"Assigned {len(assigned)} tickets.")
+
+@cli.command("sla-worker")
+@click.option("--once", is_flag=True, help="Escalate what is overdue now and exit.")
+def sla_worker(once):
+    """Escalate tickets as their SLA deadlines pass and refill technicians' queues."""
+    init_db()
+    run_sla_worker(once=once, echo=click.echo)
+
+@cli.command("build-assets")
+@click.option("--refresh-vendor", is_flag=True, help="Download vendored files again even if present.")
+@click.option("--no-vendor", is_flag=True, help="Build offline from the files already in static/.")
+def build_assets_command(refresh_vendor, no_vendor):
+    """Vendor third-party files, build hashed and precompressed assets, and compile templates."""
+    if not no_vendor:
+        try:
+            assets.vendor(force=refresh_vendor, echo=click.echo)
+        except OSError as e:
+            raise click.ClickException(f"Could not vendor assets ({e}); pass --no-vendor to build without them.")
+    assets.build_assets(echo=click.echo)
+    # Imported here: the app is only needed for its template loader.
+    from backend.app import app
+    count = assets.compile_templates(app)
+    click.echo(f"Compiled {count} templates into {assets.JINJA_CACHE_DIR}.")
+
+@cli.command("seed")
+@click.option("--scale", type=click.Choice(list(SCALES)), default="small", show_default=True)
+@click.option("--users", type=int, default=None, help="Override the number of users of the scale.")
+@click.option("--tickets", type=int, default=None, help="Override the number of tickets of the scale.")
+@click.option("--comments", type=int, default=None, help="Override the number of comments of the scale.")
+@click.option("--seed", "random_seed", type=int, default=42, show_default=True)
+@click.option("--batch-size", type=int, default=5000, show_default=True)
+def seed_command(scale, users, tickets, comments, random_seed, batch_size):
+    """Fill an empty database with a deterministic synthetic dataset."""
+    init_db()
+    default_users, default_tickets, default_comments = SCALES[scale]
+    try:
+        counts = seed(
+            users if users is not None else default_users,
+            tickets if tickets is not None else default_tickets,
+            comments if comments is not None else default_comments,
+            seed=random_seed, batch_size=batch_size, echo=click.echo,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Seeded {counts['users']} users, {counts['tickets']} tickets and {counts['comments']} comments.")
+
+def parse_mix(value):
+    if not value:
+        return None
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if route not in DEFAULT_MIX:
+            raise click.BadParameter(f"Unknown route {route!r}; choose from {', '.join(DEFAULT_MIX)}.")
+        mix[route] = float(weight or 1)
+    return mix
+
+@cli.command()
+@click.option("--workers", type=int, default=4, show_default=True, help="Concurrent client threads.")
+@click.option("--requests", type=int, default=1000, show_default=True, help="Measured requests across all workers.")
+@click.option("--warmup", type=int, default=10, show_default=True, help="Unmeasured requests per worker.")
+@click.option("--mix", default=None, help="Route weights, e.g. 'search=5,reporting=1'. Defaults to a mixed read/write workload.")
+@click.option("--seed", "random_seed", type=int, default=1, show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Also write the results JSON here.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None, help="Results JSON of an earlier run to compare against.")
+@click.option("--threshold", type=float, default=0.2, show_default=True, help="Allowed p95 and throughput change before flagging.")
+def bench(workers, requests, warmup, mix, random_seed, output, baseline, threshold):
+    """Benchmark the main routes against DB_PATH and print JSON results."""
+    try:
+        results = run_bench(workers=workers, requests=requests, warmup=warmup, mix=parse_mix(mix), seed=random_seed)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    text = json.dumps(results, indent=2)
+    click.echo(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    if baseline:
+        regressions = compare(results, load_results(baseline), threshold)
+        for regression in regressions:
+            click.echo(f"REGRESSION {regression}", err=True)
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} regression(s) against {baseline}.")
+
+@cli.command("import")
+@click.argument("table", type=click.Choice(list(TABLES)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None, help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Rows per transaction.")
+@click.option("--on-conflict", type=click.Choice(CONFLICT_MODES), default="update", show_default=True,
+              help="What to do with rows whose id (username for users) already exists.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False), default=None, help="Defaults to PATH.checkpoint.")
+@click.option("--restart", is_flag=True, help="Ignore an existing checkpoint and start from the first row.")
+def import_command(table, path, fmt, batch_size, on_conflict, checkpoint, restart):
+    """Stream a CSV or JSONL file into a table, resuming from its checkpoint."""
+    try:
+        result = import_file(table, path, fmt=fmt, batch_size=batch_size, on_conflict=on_conflict,
+                             checkpoint=checkpoint, restart=restart, echo=click.echo)
+    except BulkImportError as e:
+        raise click.ClickException(str(e))
+    if result["resumed_after_line"]:
+        click.echo(f"Resumed after line {result['resumed_after_line']}.")
+    click.echo(f"Imported {result['rows']} {table} rows in {result['seconds']}s.")
+
+@cli.command("provision-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None, help="Defaults to the file extension.")
+@click.option("--role", type=click.Choice(["student", "technician"]), default="student", show_default=True,
+              help="Role for rows without one.")
+@click.option("--processes", type=int, default=None, help="Hashing processes; defaults to one per core.")
+@click.option("--batch-size", type=int, default=500, show_default=True, help="Users hashed and inserted per transaction.")
+@click.option("--on-conflict", type=click.Choice(CONFLICT_MODES), default="skip", show_default=True,
+              help="What to do with usernames that already exist.")
+@click.option("--restart", is_flag=True, help="Ignore an existing checkpoint and start from the first row.")
+def provision_users(path, fmt, role, processes, batch_size, on_conflict, restart):
+    """Create accounts from a username,password[,role] file, hashing on every core."""
+    try:
+        result = import_file("users", path, fmt=fmt, batch_size=batch_size, on_conflict=on_conflict,
+                             restart=restart, defaults={"role": role}, processes=processes, echo=click.echo)
+    except BulkImportError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Provisioned {result['rows']} users in {result['seconds']}s.")
+
+@cli.command("export")
+@click.argument("table", type=click.Choice(list(TABLES)))
+@click.option("--output", "-o", default="-", show_default=True, help="File to write, or - for stdout.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None, help="Defaults to the file extension, JSONL for stdout.")
+@click.option("--since", default=None, help="Only rows created at or after this time, e.g. 2024-09-01.")
+@click.option("--status", default=None, help="Only tickets with this status.")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Rows fetched per round trip.")
+def export_command(table, output, fmt, since, status, batch_size):
+    """Stream a table to CSV or JSONL in id order."""
+    try:
+        export_file(table, output, fmt=fmt, since=since, status=status, batch_size=batch_size,
+                    echo=lambda message: click.echo(message, err=True))
+    except (ValueError, BulkImportError) as e:
+        raise click.ClickException(str(e))
+
+@cli.command()
+@click.option("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS, show_default=True,
+              help="Archive tickets closed at least this many days ago.")
+@click.option("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, show_default=True, help="Tickets moved per transaction.")
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+@click.option("--vacuum", "run_vacuum", is_flag=True, help="Then compact the archive and reclaim space in the main database.")
+@click.option("--watch", is_flag=True, help="Keep running, one pass every --interval seconds.")
+@click.option("--interval", type=float, default=3600, show_default=True)
+def archive(older_than_days, batch_size, max_batches, run_vacuum, watch, interval):
+    """Move long-closed tickets and their comments to the archive database."""
+    if watch:
+        run_archiver(older_than_days, batch_size, interval, echo=click.echo)
+        return
+    count = archive_closed(older_than_days, batch_size, max_batches, echo=click.echo)
+    click.echo(f"Archived {count} tickets closed more than {older_than_days} days ago.")
+    if run_vacuum:
+        vacuum()
+        click.echo("Vacuumed the archive and main databases.")
+    stats = archive_stats()
+    click.echo(f"{stats['hot_tickets']} tickets in the main database, {stats['archived_tickets']} archived.")
+
 if __name__ == "__main__":
     cli()
@@ -1,47 +1,173 @@
 import sqlite3
 import os
+import queue
+import threading
+from flask import g, has_app_context
+from backend.metrics import METRICS_ENABLED, InstrumentedConnection
 
 DB_PATH = os.getenv("DB_PATH", "tickets.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+# Negative values are KiB, positive values are pages (see PRAGMA cache_size).
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-16000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+# Archived tickets live in a second file ATTACHed to every connection as
+# "archive". It gets a small page cache so cold rows do not crowd out the
+# hot set in memory.
+ARCHIVE_DB_PATH = os.getenv("ARCHIVE_DB_PATH") or os.path.splitext(DB_PATH)[0] + "-archive.db"
+ARCHIVE_CACHE_SIZE = int(os.getenv("ARCHIVE_CACHE_SIZE", "-2000"))
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# Connections are instrumented (timed and counted, see metrics.py) when
+# metrics are on, or once the benchmark asks for statement counts.
+_instrumented = METRICS_ENABLED
+
+
+def enable_statement_counting():
+    """Instrument every connection, so metrics.statement_count() counts the
+    SQL statements each thread executes.
+
+    Idle pooled connections are dropped so every connection is instrumented.
+    """
+    global _instrumented
+    _instrumented = True
+    if _pool is not None:
+        _pool.close_all()
+
+
+def archive_path_for(path):
+    if path in (None, DB_PATH):
+        return ARCHIVE_DB_PATH
+    if path == ":memory:":
+        return ":memory:"
+    return os.path.splitext(path)[0] + "-archive.db"
+
+
+def connect(path=None):
+    """Open a connection with the tuned settings used by the pool."""
+    synchronous = DB_SYNCHRONOUS.upper()
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"Invalid DB_SYNCHRONOUS value: {DB_SYNCHRONOUS}")
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE,
+        factory=InstrumentedConnection if _instrumented else sqlite3.Connection,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute(f"PRAGMA cache_size={DB_CACHE_SIZE}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path_for(path),))
+    conn.execute("PRAGMA archive.journal_mode=WAL")
+    conn.execute(f"PRAGMA archive.synchronous={synchronous}")
+    conn.execute(f"PRAGMA archive.cache_size={ARCHIVE_CACHE_SIZE}")
     return conn
 
-def init_db():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password TEXT,
-        role TEXT
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tickets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT,
-        title TEXT,
-        category TEXT,
-        description TEXT,
-        email TEXT,
-        phone TEXT,
-        attachment TEXT,
-        status TEXT DEFAULT 'open',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS comments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        ticket_id INTEGER,
-        technician TEXT,
-        comment TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    conn.commit()
-    conn.close()
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out LIFO so the
+    most recently used (warmest) connection is reused first.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return connect(self.path)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except sqlite3.Error:
+            conn.close()
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool():
+    global _pool
+    # A forked worker must not share the parent's sqlite handles.
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool(DB_PATH)
+                _local.__dict__.clear()
+    return _pool
+
+
+def get_db():
+    """Return the connection bound to the current request or thread.
+
+    Inside a Flask app context the connection is stored on ``g`` and handed
+    back to the pool on teardown. Outside one (CLI, background workers) it is
+    kept per thread until ``release_db()`` is called.
+    """
+    if has_app_context():
+        if "db" not in g:
+            g.db = get_pool().acquire()
+        return g.db
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = get_pool().acquire()
+    return conn
+
+
+def close_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+def release_db():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        del _local.conn
+        get_pool().release(conn)
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
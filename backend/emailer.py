@@ -1,21 +1,74 @@
 import smtplib, os
 from email.mime.text import MIMEText
+from backend.metrics import timed, email_seconds
 
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-SMTP_PORT = 587
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER or "noreply@localhost"
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
 
-def send_email(to, subject, body):
-    if not (SMTP_USER and SMTP_PASS):
-        print("⚠️ Email not configured. Skipping send.")
-        return
+def email_configured():
+    # Credentials, or an explicitly chosen relay that does not need them.
+    return bool(SMTP_USER and SMTP_PASS) or "SMTP_HOST" in os.environ
+
+def build_message(to, subject, body):
     msg = MIMEText(body)
     msg["Subject"] = subject
-    msg["From"] = SMTP_USER
+    msg["From"] = SMTP_FROM
     msg["To"] = to
+    return msg
+
+class SMTPSession:
+    """One SMTP connection reused for many messages.
+
+    The connection (STARTTLS and login included) is opened on the first
+    send and reopened once if the server has dropped it since.
+    """
+
+    def __init__(self, host=None, port=None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.server = None
+
+    def connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USER and SMTP_PASS:
+            server.login(SMTP_USER, SMTP_PASS)
+        self.server = server
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
-        server.sendmail(SMTP_USER, [to], msg.as_string())
+    def send(self, to, subject, body):
+        msg = build_message(to, subject, body)
+        with timed(email_seconds):
+            if self.server is None:
+                self.connect()
+            try:
+                self.server.sendmail(SMTP_FROM, [to], msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                self.connect()
+                self.server.sendmail(SMTP_FROM, [to], msg.as_string())
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                self.server.close()
+            self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def send_email(to, subject, body):
+    if not email_configured():
+        print("⚠️ Email not configured. Skipping send.")
+        return
+    with SMTPSession() as session:
+        session.send(to, subject, body)
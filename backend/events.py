@@ -0,0 +1,201 @@
+import abc
+import collections
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from backend.database import connect
+
+# "memory" keeps events inside one process; "sqlite" shares them between
+# gunicorn workers through the events table in the database file.
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory").lower()
+EVENT_HISTORY = int(os.getenv("EVENT_HISTORY", "1000"))
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "0.5"))
+EVENT_RETENTION = int(os.getenv("EVENT_RETENTION", "10000"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+# Longest pause of the SQLite poller after repeated database errors.
+EVENT_POLL_MAX_BACKOFF = float(os.getenv("EVENT_POLL_MAX_BACKOFF", "30"))
+
+log = logging.getLogger(__name__)
+
+
+class EventBroker(abc.ABC):
+    """Fan-out of ticket events to the event streams of this process.
+
+    Recent events are kept in a bounded buffer so a reconnecting client can
+    resume from its Last-Event-ID. Subclasses decide how events arrive.
+
+    A change publishes its events in two steps: ``record`` inside the write
+    job, so they commit (or roll back) with the change, then
+    ``publish_many`` once the write has committed.
+    """
+
+    def __init__(self, history=EVENT_HISTORY):
+        self._events = collections.deque(maxlen=history)
+        self._cond = threading.Condition()
+        self.last_id = 0
+        self._evicted_id = 0
+
+    def _append(self, event_id, event_type, data):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self._evicted_id = self._events[0][0]
+            self._events.append((event_id, event_type, data))
+            self.last_id = event_id
+            self._cond.notify_all()
+
+    def record(self, conn, events):
+        """Store (event_type, data) pairs in the write running on ``conn``."""
+
+    @abc.abstractmethod
+    def publish_many(self, events):
+        """Send the events of a committed write to the streams, in order."""
+
+    def publish(self, event_type, data):
+        self.publish_many([(event_type, data)])
+
+    def subscribe(self):
+        """Return the id a new subscriber should start after."""
+        return self.last_id
+
+    def wait(self, after_id, timeout):
+        """Block until there are events after ``after_id`` or ``timeout`` passes.
+
+        Returns (events, missed); ``missed`` is true when events the client
+        has not seen already dropped out of the buffer.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.last_id > after_id, timeout)
+            events = [e for e in self._events if e[0] > after_id]
+            return events, after_id < self._evicted_id
+
+
+class MemoryBroker(EventBroker):
+    def publish_many(self, events):
+        with self._cond:
+            for event_type, data in events:
+                self._append(self.last_id + 1, event_type, data)
+
+
+class SQLiteBroker(EventBroker):
+    """Events go through the events table; a poller thread per process reads
+    new rows and hands them to this process's streams."""
+
+    def __init__(self, history=EVENT_HISTORY):
+        super().__init__(history)
+        self._poller = None
+        self._lock = threading.Lock()
+
+    def record(self, conn, events):
+        conn.executemany(
+            "INSERT INTO events (type, data) VALUES (?, ?)",
+            [(event_type, json.dumps(data)) for event_type, data in events]
+        )
+
+    def publish_many(self, events):
+        # Recorded rows reach every process through its poller.
+        pass
+
+    def subscribe(self):
+        with self._lock:
+            if self._poller is None:
+                conn = connect()
+                self.last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+                self._poller = threading.Thread(target=self._poll, args=(conn,), daemon=True)
+                self._poller.start()
+        return self.last_id
+
+    def _poll(self, conn):
+        polls = 0
+        backoff = EVENT_POLL_SECONDS
+        while True:
+            try:
+                rows = conn.execute(
+                    "SELECT id, type, data FROM events WHERE id > ? ORDER BY id LIMIT 500", (self.last_id,)
+                ).fetchall()
+                conn.rollback()
+                for row in rows:
+                    self._append(row["id"], row["type"], json.loads(row["data"]))
+                polls += 1
+                if polls % 1000 == 0:
+                    conn.execute("DELETE FROM events WHERE id <= ?", (self.last_id - EVENT_RETENTION,))
+                    conn.commit()
+            except sqlite3.Error:
+                # A locked or briefly unreadable database must not end the
+                # stream of every client in this process; try again later.
+                log.exception("Event poll failed; retrying in %.1fs", backoff)
+                with contextlib.suppress(sqlite3.Error):
+                    conn.rollback()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, EVENT_POLL_MAX_BACKOFF)
+                continue
+            backoff = EVENT_POLL_SECONDS
+            if len(rows) < 500:
+                time.sleep(EVENT_POLL_SECONDS)
+
+
+BROKERS = {"memory": MemoryBroker, "sqlite": SQLiteBroker}
+
+_broker = None
+_broker_pid = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker, _broker_pid
+    if _broker is None or _broker_pid != os.getpid():
+        with _broker_lock:
+            if _broker is None or _broker_pid != os.getpid():
+                if EVENT_BACKEND not in BROKERS:
+                    raise ValueError(f"Unknown EVENT_BACKEND: {EVENT_BACKEND}")
+                _broker = BROKERS[EVENT_BACKEND]()
+                _broker_pid = os.getpid()
+    return _broker
+
+
+def record_events(conn, events):
+    """Record events inside a write job; call publish_many after it commits."""
+    get_broker().record(conn, events)
+
+
+def publish(event_type, data):
+    get_broker().publish(event_type, data)
+
+
+def publish_many(events):
+    get_broker().publish_many(events)
+
+
+def format_event(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream(last_event_id=None, heartbeat=EVENT_HEARTBEAT_SECONDS):
+    """Generator of Server-Sent Events text for one client."""
+    broker = get_broker()
+    current = broker.subscribe()
+    yield "retry: 3000\n\n"
+    if last_event_id is None:
+        after = current
+    elif last_event_id > current:
+        # Ids from before a restart of the in-memory broker.
+        yield format_event(current, "resync", {})
+        after = current
+    else:
+        after = last_event_id
+    while True:
+        events, missed = broker.wait(after, heartbeat)
+        if missed:
+            # The client fell too far behind; it has to reload the page.
+            after = events[-1][0]
+            yield format_event(after, "resync", {})
+            continue
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event_id, event_type, data in events:
+            yield format_event(event_id, event_type, data)
+            after = event_id
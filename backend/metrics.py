@@ -0,0 +1,302 @@
+import bisect
+import http.server
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from flask import g, has_request_context, request, before_render_template, template_rendered
+
+# Instrumentation is opt-in: it wraps every cursor and costs a little on each
+# statement. Metrics are kept per process, so each worker serves its own.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+slow_query_log = logging.getLogger("backend.slow_query")
+if SLOW_QUERY_LOG:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_log.addHandler(_handler)
+    slow_query_log.setLevel(logging.INFO)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(labelnames, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((self.name + "_bucket", labels + (bound,), cumulative))
+                samples.append((self.name + "_bucket", labels + ("+Inf",), count))
+                samples.append((self.name + "_sum", labels, total))
+                samples.append((self.name + "_count", labels, count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                labelnames = metric.labelnames + ("le",) if name.endswith("_bucket") else metric.labelnames
+                lines.append(f"{name}{_label_text(labelnames, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+request_seconds = registry.register(Histogram(
+    "smartcampus_request_duration_seconds", "Time to handle a request.", ("route", "method", "status")))
+request_statements = registry.register(Histogram(
+    "smartcampus_request_sql_statements", "SQL statements executed per request.", ("route",), COUNT_BUCKETS))
+request_sql_seconds = registry.register(Histogram(
+    "smartcampus_request_sql_seconds", "Time spent in SQLite per request.", ("route",)))
+sql_statements = registry.register(Counter(
+    "smartcampus_sql_statements_total", "SQL statements executed.", ("route",)))
+slow_queries = registry.register(Counter(
+    "smartcampus_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("route",)))
+template_seconds = registry.register(Histogram(
+    "smartcampus_template_render_seconds", "Time to render a template.", ("template",)))
+email_seconds = registry.register(Histogram(
+    "smartcampus_email_send_seconds", "Time to hand one email to the SMTP server.", ("outcome",)))
+write_batch_size = registry.register(Histogram(
+    "smartcampus_write_batch_size", "Writes committed together by the writer thread.", (), COUNT_BUCKETS))
+write_rejections = registry.register(Counter(
+    "smartcampus_write_rejections_total", "Writes turned away because the queue was full or the database locked.", ("reason",)))
+
+_local = threading.local()
+
+
+def current_route():
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else "unmatched"
+    return "-"
+
+
+WHITESPACE = re.compile(r"\s+")
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and literals so variants of one query group together."""
+    sql = LITERALS.sub("?", WHITESPACE.sub(" ", sql).strip())
+    return PLACEHOLDER_LIST.sub("(?, ...)", sql)
+
+
+def record_sql(seconds, new_statement):
+    _local.statements = getattr(_local, "statements", 0) + new_statement
+    stats = getattr(_local, "request", None)
+    if stats is not None:
+        stats["statements"] += new_statement
+        stats["sql_seconds"] += seconds
+    if new_statement:
+        sql_statements.inc(current_route())
+
+
+def statement_count():
+    """Statements this thread has executed on instrumented connections."""
+    return getattr(_local, "statements", 0)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execution and row fetching of its statement."""
+
+    _sql = None
+    _elapsed = 0.0
+    _logged = False
+
+    def _timed(self, method, *args, new_statement=False, sql=None):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            if new_statement:
+                self._sql, self._elapsed, self._logged = sql, 0.0, False
+            self._elapsed += elapsed
+            record_sql(elapsed, new_statement)
+            if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+                self._logged = True
+                route = current_route()
+                slow_queries.inc(route)
+                slow_query_log.warning("%.1fms route=%s sql=%s", self._elapsed * 1000, route, normalize_sql(self._sql or ""))
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters, new_statement=True, sql=sql)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters, new_statement=True, sql=sql)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose shortcut ``execute`` methods use InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class timed:
+    """Context manager observing the elapsed time into ``histogram``; the
+    ``outcome`` label becomes "error" when the block raises."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if METRICS_ENABLED:
+            self.histogram.observe(time.perf_counter() - self.start, "error" if exc_type else "ok")
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    _local.request = {"statements": 0, "sql_seconds": 0.0}
+
+
+def _after_request(response):
+    stats = getattr(_local, "request", None)
+    start = g.pop("metrics_start", None)
+    if stats is None or start is None:
+        return response
+    route = current_route()
+    request_seconds.observe(time.perf_counter() - start, route, request.method, response.status_code)
+    request_statements.observe(stats["statements"], route)
+    request_sql_seconds.observe(stats["sql_seconds"], route)
+    _local.request = None
+    return response
+
+
+def _template_started(sender, template, context, **extra):
+    stack = getattr(_local, "templates", None)
+    if stack is None:
+        stack = _local.templates = []
+    stack.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stack = getattr(_local, "templates", None)
+    if stack:
+        template_seconds.observe(time.perf_counter() - stack.pop(), template.name or "-")
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+
+def render():
+    return registry.render()
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Expose the metrics of a non-web process (the outbox worker) over HTTP."""
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
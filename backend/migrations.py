@@ -0,0 +1,613 @@
+import re
+from backend.database import connect
+from backend import api, archive, models, reporting, scheduler, search, similarity
+
+# Append new migrations to the end of this list; never edit or reorder an
+# entry once it has shipped. Each entry is (version, name, statements).
+MIGRATIONS = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            title TEXT,
+            category TEXT,
+            description TEXT,
+            email TEXT,
+            phone TEXT,
+            attachment TEXT,
+            status TEXT DEFAULT 'open',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id INTEGER,
+            technician TEXT,
+            comment TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "indexes for dashboard, comment and report queries", [
+        "CREATE INDEX IF NOT EXISTS idx_tickets_username_created ON tickets (username, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON tickets (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_comments_ticket_created ON comments (ticket_id, created_at)",
+    ]),
+    (3, "email outbox", [
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (next_attempt_at) WHERE status = 'pending'",
+    ]),
+    (4, "full-text search over tickets and usernames", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+            title, description, category, comments,
+            tokenize = 'porter unicode61'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            username, content = 'users', content_rowid = 'id', tokenize = 'trigram'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO tickets_fts (rowid, title, description, category, comments)
+            VALUES (new.id, new.title, new.description, new.category, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_au AFTER UPDATE OF title, description, category ON tickets BEGIN
+            UPDATE tickets_fts SET title = new.title, description = new.description, category = new.category
+            WHERE rowid = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_fts_ad AFTER DELETE ON tickets BEGIN
+            DELETE FROM tickets_fts WHERE rowid = old.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN
+            UPDATE tickets_fts SET comments = comments || ' ' || new.comment WHERE rowid = new.ticket_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE ON comments BEGIN
+            UPDATE tickets_fts
+            SET comments = COALESCE((SELECT group_concat(comment, ' ') FROM comments WHERE ticket_id = tickets_fts.rowid), '')
+            WHERE rowid IN (old.ticket_id, new.ticket_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN
+            UPDATE tickets_fts
+            SET comments = COALESCE((SELECT group_concat(comment, ' ') FROM comments WHERE ticket_id = old.ticket_id), '')
+            WHERE rowid = old.ticket_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, username) VALUES (new.id, new.username);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+            INSERT INTO users_fts (rowid, username) VALUES (new.id, new.username);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+        END
+        """,
+        """
+        INSERT INTO tickets_fts (rowid, title, description, category, comments)
+        SELECT t.id, t.title, t.description, t.category,
+               COALESCE((SELECT group_concat(c.comment, ' ') FROM comments c WHERE c.ticket_id = t.id), '')
+        FROM tickets t
+        """,
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+    ]),
+    (5, "incremental reporting rollups", [
+        "ALTER TABLE tickets ADD COLUMN closed_at TIMESTAMP",
+        """
+        CREATE TABLE IF NOT EXISTS ticket_rollup (
+            week TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT '',
+            assignee TEXT NOT NULL DEFAULT '',
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (week, category, status, assignee)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ticket_close_histogram (
+            week TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (week, category, bucket)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS ticket_rollup_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO ticket_rollup (week, category, status, assignee, count)
+            VALUES (strftime('%Y-%W', new.created_at), COALESCE(new.category, ''), COALESCE(new.status, ''), '', 1)
+            ON CONFLICT (week, category, status, assignee) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS ticket_rollup_au AFTER UPDATE OF status, category, created_at ON tickets
+        WHEN old.status IS NOT new.status OR old.category IS NOT new.category OR old.created_at IS NOT new.created_at
+        BEGIN
+            UPDATE ticket_rollup SET count = count - 1
+            WHERE week = strftime('%Y-%W', old.created_at) AND category = COALESCE(old.category, '')
+              AND status = COALESCE(old.status, '') AND assignee = '';
+            INSERT INTO ticket_rollup (week, category, status, assignee, count)
+            VALUES (strftime('%Y-%W', new.created_at), COALESCE(new.category, ''), COALESCE(new.status, ''), '', 1)
+            ON CONFLICT (week, category, status, assignee) DO UPDATE SET count = count + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS ticket_close_histogram_ai AFTER INSERT ON tickets
+        WHEN new.status = 'closed' AND new.closed_at IS NOT NULL
+        BEGIN
+            INSERT INTO ticket_close_histogram (week, category, bucket, count)
+            VALUES (strftime('%Y-%W', new.closed_at), COALESCE(new.category, ''),
+                    {reporting.bucket_expr(reporting.minutes_between("new.created_at", "new.closed_at"))}, 1)
+            ON CONFLICT (week, category, bucket) DO UPDATE SET count = count + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tickets_closed AFTER UPDATE OF status ON tickets
+        WHEN new.status = 'closed' AND old.status IS NOT 'closed'
+        BEGIN
+            UPDATE tickets SET closed_at = datetime('now') WHERE id = new.id;
+            INSERT INTO ticket_close_histogram (week, category, bucket, count)
+            VALUES (strftime('%Y-%W', 'now'), COALESCE(new.category, ''),
+                    {reporting.bucket_expr(reporting.minutes_between("new.created_at", "datetime('now')"))}, 1)
+            ON CONFLICT (week, category, bucket) DO UPDATE SET count = count + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tickets_reopened AFTER UPDATE OF status ON tickets
+        WHEN old.status = 'closed' AND new.status IS NOT 'closed' AND old.closed_at IS NOT NULL
+        BEGIN
+            UPDATE ticket_close_histogram SET count = count - 1
+            WHERE week = strftime('%Y-%W', old.closed_at) AND category = COALESCE(old.category, '')
+              AND bucket = {reporting.bucket_expr(reporting.minutes_between("old.created_at", "old.closed_at"))};
+            UPDATE tickets SET closed_at = NULL WHERE id = new.id;
+        END
+        """,
+        """
+        INSERT INTO ticket_rollup (week, category, status, assignee, count)
+        SELECT strftime('%Y-%W', created_at), COALESCE(category, ''), COALESCE(status, ''), '', COUNT(*)
+        FROM tickets
+        GROUP BY 1, 2, 3, 4
+        """,
+        f"""
+        INSERT INTO ticket_close_histogram (week, category, bucket, count)
+        SELECT strftime('%Y-%W', closed_at), COALESCE(category, ''),
+               {reporting.bucket_expr(reporting.minutes_between("created_at", "closed_at"))}, COUNT(*)
+        FROM tickets
+        WHERE status = 'closed' AND closed_at IS NOT NULL
+        GROUP BY 1, 2, 3
+        """,
+    ]),
+    (6, "per-table change counters", [
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO table_versions (name) VALUES ('tickets'), ('comments'), ('users')",
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_version_ai AFTER INSERT ON tickets BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'tickets';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_version_au AFTER UPDATE ON tickets BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'tickets';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tickets_version_ad AFTER DELETE ON tickets BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'tickets';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_version_ai AFTER INSERT ON comments BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'comments';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_version_au AFTER UPDATE ON comments BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'comments';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_version_ad AFTER DELETE ON comments BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'comments';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_version_ai AFTER INSERT ON users BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_version_au AFTER UPDATE ON users BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_version_ad AFTER DELETE ON users BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'users';
+        END
+        """,
+    ]),
+    (7, "content-addressed attachments", [
+        """
+        CREATE TABLE IF NOT EXISTS attachments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sha256 TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mime_type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "ALTER TABLE tickets ADD COLUMN attachment_id INTEGER REFERENCES attachments (id)",
+    ]),
+    (8, "ticket event log", [
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (9, "index for archiving closed tickets", [
+        "CREATE INDEX IF NOT EXISTS idx_tickets_closed ON tickets (closed_at) WHERE status = 'closed'",
+    ]),
+    (10, "similarity index of open tickets", [
+        """
+        CREATE TABLE IF NOT EXISTS ticket_lsh (
+            bucket INTEGER NOT NULL,
+            ticket_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, ticket_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_lsh_ticket ON ticket_lsh (ticket_id)",
+        """
+        CREATE TABLE IF NOT EXISTS ticket_clusters (
+            ticket_id INTEGER PRIMARY KEY,
+            leader_id INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_clusters_leader ON ticket_clusters (leader_id)",
+        # Only open tickets are indexed. Reopened tickets are indexed again
+        # by the code that reopens them, since SQL cannot compute signatures.
+        """
+        CREATE TRIGGER IF NOT EXISTS ticket_lsh_closed AFTER UPDATE OF status ON tickets
+        WHEN new.status = 'closed' AND old.status IS NOT 'closed' BEGIN
+            DELETE FROM ticket_lsh WHERE ticket_id = new.id;
+            DELETE FROM ticket_clusters WHERE ticket_id = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS ticket_lsh_ad AFTER DELETE ON tickets BEGIN
+            DELETE FROM ticket_lsh WHERE ticket_id = old.id;
+            DELETE FROM ticket_clusters WHERE ticket_id = old.id;
+        END
+        """,
+        similarity.index_open_tickets,
+    ]),
+    (11, "ticket assignment and SLA deadlines", [
+        "ALTER TABLE tickets ADD COLUMN assignee TEXT",
+        "ALTER TABLE tickets ADD COLUMN due_at TIMESTAMP",
+        "ALTER TABLE tickets ADD COLUMN escalated_at TIMESTAMP",
+        f"UPDATE tickets SET due_at = {scheduler.sla_case_sql('category', 'created_at')}",
+        # Imported rows get a deadline from the SLA in force when this ran;
+        # create_ticket sets its own from the current SLA_HOURS.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tickets_due_ai AFTER INSERT ON tickets WHEN new.due_at IS NULL BEGIN
+            UPDATE tickets SET due_at = {scheduler.sla_case_sql('new.category', 'COALESCE(new.created_at, CURRENT_TIMESTAMP)')}
+            WHERE id = new.id;
+        END
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS technician_profiles (
+            username TEXT PRIMARY KEY,
+            skills TEXT NOT NULL DEFAULT '',
+            available INTEGER NOT NULL DEFAULT 1,
+            capacity INTEGER,
+            open_tickets INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO technician_profiles (username) SELECT username FROM users WHERE role = 'technician'",
+        # open_tickets is kept by triggers, so a technician's load is one
+        # primary-key read whichever process assigned or closed the ticket.
+        """
+        CREATE TRIGGER IF NOT EXISTS technician_load_ai AFTER INSERT ON tickets
+        WHEN new.assignee IS NOT NULL AND new.status IS NOT 'closed' BEGIN
+            UPDATE technician_profiles SET open_tickets = open_tickets + 1 WHERE username = new.assignee;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS technician_load_au AFTER UPDATE OF assignee, status ON tickets
+        WHEN new.assignee IS NOT old.assignee OR (new.status = 'closed') IS NOT (old.status = 'closed') BEGIN
+            UPDATE technician_profiles SET open_tickets = open_tickets - 1
+            WHERE username = old.assignee AND old.status IS NOT 'closed';
+            UPDATE technician_profiles SET open_tickets = open_tickets + 1
+            WHERE username = new.assignee AND new.status IS NOT 'closed';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS technician_load_ad AFTER DELETE ON tickets
+        WHEN old.assignee IS NOT NULL AND old.status IS NOT 'closed' BEGIN
+            UPDATE technician_profiles SET open_tickets = open_tickets - 1 WHERE username = old.assignee;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS technician_profile_ai AFTER INSERT ON users WHEN new.role = 'technician' BEGIN
+            INSERT OR IGNORE INTO technician_profiles (username) VALUES (new.username);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS technician_profile_au AFTER UPDATE OF role ON users
+        WHEN new.role IS NOT old.role BEGIN
+            INSERT OR IGNORE INTO technician_profiles (username) SELECT new.username WHERE new.role = 'technician';
+            UPDATE tickets SET assignee = NULL
+            WHERE old.role = 'technician' AND assignee = old.username AND status != 'closed';
+            DELETE FROM technician_profiles WHERE old.role = 'technician' AND username = old.username;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS technician_profile_ad AFTER DELETE ON users WHEN old.role = 'technician' BEGIN
+            UPDATE tickets SET assignee = NULL WHERE assignee = old.username AND status != 'closed';
+            DELETE FROM technician_profiles WHERE username = old.username;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_due ON tickets (assignee, due_at) WHERE status != 'closed'",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_sla ON tickets (due_at) WHERE status != 'closed' AND escalated_at IS NULL",
+    ]),
+    (12, "indexes for filtered ticket and user listings", [
+        "CREATE INDEX IF NOT EXISTS idx_tickets_category_created ON tickets (category, created_at)",
+        # Covers the facet counts, date filters included, without reading rows.
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_category_created ON tickets (status, category, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)",
+    ]),
+    (13, "assignee dimension of the ticket rollup", [
+        "DROP TRIGGER IF EXISTS ticket_rollup_ai",
+        "DROP TRIGGER IF EXISTS ticket_rollup_au",
+        """
+        CREATE TRIGGER ticket_rollup_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO ticket_rollup (week, category, status, assignee, count)
+            VALUES (strftime('%Y-%W', new.created_at), COALESCE(new.category, ''), COALESCE(new.status, ''),
+                    COALESCE(new.assignee, ''), 1)
+            ON CONFLICT (week, category, status, assignee) DO UPDATE SET count = count + 1;
+        END
+        """,
+        # A reassignment moves the ticket from the old assignee's row to the new one's.
+        """
+        CREATE TRIGGER ticket_rollup_au AFTER UPDATE OF status, category, created_at, assignee ON tickets
+        WHEN old.status IS NOT new.status OR old.category IS NOT new.category OR old.created_at IS NOT new.created_at
+          OR old.assignee IS NOT new.assignee
+        BEGIN
+            UPDATE ticket_rollup SET count = count - 1
+            WHERE week = strftime('%Y-%W', old.created_at) AND category = COALESCE(old.category, '')
+              AND status = COALESCE(old.status, '') AND assignee = COALESCE(old.assignee, '');
+            INSERT INTO ticket_rollup (week, category, status, assignee, count)
+            VALUES (strftime('%Y-%W', new.created_at), COALESCE(new.category, ''), COALESCE(new.status, ''),
+                    COALESCE(new.assignee, ''), 1)
+            ON CONFLICT (week, category, status, assignee) DO UPDATE SET count = count + 1;
+        END
+        """,
+    ]),
+    # Rollups built before 13 have no assignees and, if rebuilt after an
+    # archive pass, miss the archived tickets.
+    (14, "rebuild rollups by assignee over live and archived tickets", [
+        "DELETE FROM ticket_rollup",
+        "DELETE FROM ticket_close_histogram",
+        """
+        INSERT INTO ticket_rollup (week, category, status, assignee, count)
+        SELECT strftime('%Y-%W', created_at), COALESCE(category, ''), COALESCE(status, ''), COALESCE(assignee, ''),
+               COUNT(*)
+        FROM (SELECT created_at, category, status, assignee FROM main.tickets
+              UNION ALL SELECT created_at, category, status, assignee FROM archive.tickets)
+        GROUP BY 1, 2, 3, 4
+        """,
+        f"""
+        INSERT INTO ticket_close_histogram (week, category, bucket, count)
+        SELECT strftime('%Y-%W', closed_at), COALESCE(category, ''),
+               {reporting.bucket_expr(reporting.minutes_between("created_at", "closed_at"))}, COUNT(*)
+        FROM (SELECT created_at, closed_at, category, status FROM main.tickets
+              UNION ALL SELECT created_at, closed_at, category, status FROM archive.tickets)
+        WHERE status = 'closed' AND closed_at IS NOT NULL
+        GROUP BY 1, 2, 3
+        """,
+    ]),
+    # ticket_clusters.leader_id keeps naming the ticket that founded the
+    # cluster, which is the cluster's id from here on; the summary row names
+    # its current leader, re-elected when the leader closes.
+    (15, "incident cluster summaries", [
+        """
+        CREATE TABLE IF NOT EXISTS ticket_cluster_summaries (
+            cluster_id INTEGER PRIMARY KEY,
+            leader_id INTEGER NOT NULL,
+            size INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_cluster_summaries_size ON ticket_cluster_summaries (size DESC, leader_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ticket_cluster_summaries_leader ON ticket_cluster_summaries (leader_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS ticket_cluster_summaries_ai AFTER INSERT ON ticket_clusters BEGIN
+            INSERT INTO ticket_cluster_summaries (cluster_id, leader_id, size) VALUES (new.leader_id, new.ticket_id, 1)
+            ON CONFLICT (cluster_id) DO UPDATE SET size = size + 1;
+        END
+        """,
+        # The oldest remaining member takes over from a leader that closes.
+        """
+        CREATE TRIGGER IF NOT EXISTS ticket_cluster_summaries_ad AFTER DELETE ON ticket_clusters BEGIN
+            DELETE FROM ticket_cluster_summaries WHERE cluster_id = old.leader_id AND size <= 1;
+            UPDATE ticket_cluster_summaries
+            SET size = size - 1,
+                leader_id = CASE WHEN leader_id = old.ticket_id
+                            THEN (SELECT MIN(ticket_id) FROM ticket_clusters WHERE leader_id = old.leader_id)
+                            ELSE leader_id END
+            WHERE cluster_id = old.leader_id;
+        END
+        """,
+        """
+        INSERT INTO ticket_cluster_summaries (cluster_id, leader_id, size)
+        SELECT leader_id, MIN(ticket_id), COUNT(*) FROM ticket_clusters GROUP BY leader_id
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def current_version(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def pending_migrations(conn):
+    version = current_version(conn)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def migrate(conn=None, target=None):
+    """Apply pending migrations in order and return the ones applied.
+
+    Each migration runs in its own IMMEDIATE transaction, and the version is
+    re-read under the write lock so concurrent workers apply it only once.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    applied = []
+    try:
+        _ensure_version_table(conn)
+        # Before the migrations, which may read archived tickets.
+        archive.ensure_archive_schema(conn)
+        for version, name, statements in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append((version, name))
+        if applied:
+            conn.execute("ANALYZE")
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+    return applied
+
+
+def ensure_schema():
+    """Migrate only when the database is behind; a no-op read otherwise."""
+    conn = connect()
+    try:
+        if current_version(conn) < LATEST_VERSION:
+            return migrate(conn)
+        archive.ensure_archive_schema(conn)
+        return []
+    finally:
+        conn.close()
+
+
+def init_db():
+    return migrate()
+
+
+# "SCAN tickets" or "SCAN archive.tickets"; index and virtual table scans
+# carry a suffix and are not full scans.
+FULL_SCAN = re.compile(r"^SCAN (?:\w+\.)?(\w+)$")
+
+
+def explain(conn, sql, params=()):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row["detail"] for row in rows]
+
+
+def check_query_plans(conn=None):
+    """Run EXPLAIN QUERY PLAN over the HOT_QUERIES of models, search and api.
+
+    Returns a list of (name, plan, problems); a query that scans a table
+    without an index is a problem unless it is registered as a full listing.
+    By default the plans come from a freshly migrated in-memory database, so
+    the result does not depend on the statistics of a small local dataset.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(":memory:")
+        migrate(conn)
+    results = []
+    try:
+        for name, sql, params, full_listing in models.HOT_QUERIES + search.HOT_QUERIES + api.HOT_QUERIES + archive.HOT_QUERIES + similarity.HOT_QUERIES + scheduler.HOT_QUERIES:
+            plan = explain(conn, sql, params)
+            problems = [] if full_listing else [d for d in plan if FULL_SCAN.match(d)]
+            results.append((name, plan, problems))
+    finally:
+        if own_conn:
+            conn.close()
+    return results
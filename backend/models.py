@@ -1,118 +1,517 @@
+import json
+import os
 from backend.database import get_db
-from werkzeug.security import generate_password_hash
-import smtplib
-from email.mime.text import MIMEText
+from backend.outbox import enqueue_email
+from backend.events import publish_many, record_events
+from backend.cache import cached, bump_data_version
+from backend.archive import tickets_source, comments_source
+from backend.passwords import hash_password, check_password, needs_rehash
+from backend.similarity import index_ticket
+from backend.scheduler import pick_technician, refresh_loads, sla_offset, assign_ticket, set_availability
+from backend.writer import write
+from backend.attachments import record_attachment
+from backend.paging import encode_cursor, filter_clauses, keyset_page, keyset_sql
+
+
+# {tickets} and {comments} are filled in by ticket_sql() with the hot
+# tables, or with views over the hot and archived rows.
+SQL_TICKET_BY_ID = "SELECT * FROM {tickets} WHERE id = ?"
+SQL_TICKETS_FOR_USER = "SELECT * FROM {tickets} WHERE username = ? ORDER BY created_at DESC"
+SQL_ALL_TICKETS = "SELECT * FROM {tickets} ORDER BY created_at DESC"
+SQL_COMMENT_PREVIEWS = """
+SELECT id, ticket_id, technician, comment, created_at, total FROM (
+    SELECT c.*,
+           ROW_NUMBER() OVER (PARTITION BY ticket_id ORDER BY created_at DESC, id DESC) AS rn,
+           COUNT(*) OVER (PARTITION BY ticket_id) AS total
+    FROM {comments} c
+    WHERE ticket_id IN (SELECT value FROM json_each(?))
+)
+WHERE rn <= ?
+ORDER BY ticket_id, created_at ASC, id ASC
+"""
+SQL_COMMENTS_FOR_TICKET = "SELECT id, ticket_id, technician, comment, created_at FROM {comments} WHERE ticket_id = ? ORDER BY created_at ASC, id ASC"
+SQL_TECHNICIAN_PROFILE = "SELECT * FROM technician_profiles WHERE username = ?"
+SQL_ALL_USERS = "SELECT id, username, role FROM users ORDER BY id"
+SQL_USER_ROLE_COUNTS = "SELECT role, COUNT(*) AS count FROM users GROUP BY role"
+SQL_USER_BY_USERNAME = "SELECT * FROM users WHERE username = ?"
+SQL_TICKET_COUNTS_BY_WEEK = """
+SELECT week, SUM(count) as count
+FROM ticket_rollup
+GROUP BY week
+ORDER BY week
+"""
+
+
+def ticket_sql(template, include_archived=False, **params):
+    return template.format(tickets=tickets_source(include_archived), comments=comments_source(include_archived), **params)
 
 
 # def get_external_tickets():
 #     response = requests.get("http://infrastructure-server-address/api/tickets")
 #     return response.json()
 
+def run_statement(conn, sql, params):
+    """A write job of one statement; returns the rows it changed."""
+    return conn.execute(sql, params).rowcount
+
 def create_user(username, password, role):
-    conn = get_db()
-    hashed_pw = generate_password_hash(password)
-    conn.execute(
-        "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-        (username, hashed_pw, role)
-    )
-    conn.commit()
-    conn.close()
+    # Hash before queueing the write, so the writer never waits on it.
+    hashed_pw = hash_password(password)
+    write(run_statement, "INSERT INTO users (username, password, role) VALUES (?, ?, ?)", (username, hashed_pw, role))
+    bump_data_version()
+
+def set_user_role(user_id, role):
+    write(run_statement, "UPDATE users SET role = ? WHERE id = ?", (role, user_id))
+    bump_data_version()
+
+def remove_user(user_id):
+    write(run_statement, "DELETE FROM users WHERE id = ?", (user_id,))
+    bump_data_version()
+
+def set_password(user_id, password):
+    hashed_pw = hash_password(password)
+    write(run_statement, "UPDATE users SET password = ? WHERE id = ?", (hashed_pw, user_id))
+    bump_data_version()
     
-def create_ticket(username, title, category, description, email, phone, attachment=None):
+def create_ticket(username, title, category, description, email, phone, attachment=None, upload=None):
+    """Create a ticket; ``upload`` is a blob from attachments.store_upload(),
+    whose row commits in the same write as the ticket."""
+    def insert(conn):
+        attachment_id = record_attachment(conn, upload)["id"] if upload else None
+        assignee = pick_technician(conn, category)
+        ticket = conn.execute(
+            "INSERT INTO tickets (username, title, category, description, email, phone, attachment, attachment_id, "
+            "assignee, due_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', ?)) "
+            "RETURNING id, username, title, category, status, created_at, assignee, due_at",
+            (username, title, category, description, email, phone, attachment, attachment_id,
+             assignee, sla_offset(category))
+        ).fetchone()
+        queue_ticket_confirmation(conn, email, title)
+        index_ticket(conn, ticket["id"], title, description)
+        events = [("ticket-created", ticket_event_data(ticket))]
+        record_events(conn, events)
+        return ticket["id"], events
+
+    ticket_id, events = write(insert)
+    bump_data_version()
+    publish_many(events)
+    return ticket_id
+
+TICKET_EVENT_FIELDS = ("id", "username", "title", "category", "status", "created_at", "assignee", "due_at")
+
+def ticket_event_data(ticket):
+    return {field: ticket[field] for field in TICKET_EVENT_FIELDS}
+
+def get_user_by_username(username):
     conn = get_db()
-    conn.execute(
-        "INSERT INTO tickets (username, title, category, description, email, phone, attachment) VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (username, title, category, description, email, phone, attachment)
-    )
-    conn.commit()
-    conn.close()
-
-def get_ticket_by_id(ticket_id):
+    user = conn.execute(SQL_USER_BY_USERNAME, (username,)).fetchone()
+    return dict(user) if user else None
+
+def authenticate(username, password):
+    """Return the user if the password matches, upgrading an outdated hash."""
+    user = get_user_by_username(username)
+    if not user or not check_password(user["password"], password):
+        return None
+    if needs_rehash(user["password"]):
+        # Only if the password was not changed in the meantime.
+        write(run_statement, "UPDATE users SET password = ? WHERE id = ? AND password = ?",
+              (hash_password(password), user["id"], user["password"]))
+        bump_data_version()
+    return user
+
+def get_ticket_by_id(ticket_id, include_archived=False):
     conn = get_db()
-    ticket = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
-    conn.close()
+    ticket = conn.execute(ticket_sql(SQL_TICKET_BY_ID, include_archived), (ticket_id,)).fetchone()
     return dict(ticket) if ticket else None
 
-from email.mime.text import MIMEText
-import smtplib
-
-def send_ticket_confirmation(to_email, ticket_title):
-    from_email = "smartnoreplycampus@gmail.com"
+def queue_ticket_confirmation(conn, to_email, ticket_title):
     subject = "Smart Campus Services Support"
     body = f"Dear Student,\n\nThis is confirm that your case '{ticket_title}' has been received. Our technician will contact you soon.\n\nIf you have any other questions, please go ahead to our portal and create a new ticket.\n\nBest regards,\n\nSmart Campus Services Team"
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = from_email
-    msg["To"] = to_email
-
-    # Update with your SMTP server details
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
-    smtp_user = "smartnoreplycampus@gmail.com"
-    smtp_password = "xqkn uizr hnfu leec"
-
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.sendmail(from_email, [to_email], msg.as_string())
-        server.quit()
-    except Exception as e:
-        print("Email sending failed:", e)
-
-
-def send_email(to, subject, body):
-    from_email = "smartnoreplycampus@gmail.com"
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
-    smtp_user = "smartnoreplycampus@gmail.com"
-    smtp_password = "xqkn uizr hnfu leec"
-
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = from_email
-    msg["To"] = to
-
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.sendmail(from_email, [to], msg.as_string())
-        server.quit()
-    except Exception as e:
-        print("Email sending failed:", e)
-
-def get_tickets(username=None):
+    enqueue_email(conn, to_email, subject, body)
+
+def create_comment(ticket_id, technician, comment):
+    def insert(conn):
+        ticket = conn.execute(ticket_sql(SQL_TICKET_BY_ID), (ticket_id,)).fetchone()
+        if not ticket:
+            return None, None
+        row = conn.execute(
+            "INSERT INTO comments (ticket_id, technician, comment) VALUES (?, ?, ?) "
+            "RETURNING id, ticket_id, technician, comment, created_at",
+            (ticket_id, technician, comment)
+        ).fetchone()
+        enqueue_email(
+            conn,
+            to=ticket["email"],
+            subject="New Comment on Your Ticket",
+            body=f"Dear {ticket['username']},\n\nA new comment has been added to your ticket '{ticket['title']}'. Please log in to view the details.\n\nThank you!"
+        )
+        events = [("comment-added", dict(row))]
+        record_events(conn, events)
+        return dict(ticket), events
+
+    ticket, events = write(insert)
+    if ticket:
+        bump_data_version()
+        publish_many(events)
+    return ticket
+
+def check_status(status):
+    if status not in TICKET_STATUSES:
+        raise ValueError(f"Unknown status: {status}")
+
+def update_ticket_status(ticket_id, status, notify=True):
+    """Set a ticket's status; None if there is no such ticket. An unknown
+    status raises ValueError."""
+    check_status(status)
+
+    def update(conn):
+        row = conn.execute(ticket_sql(SQL_TICKET_BY_ID), (ticket_id,)).fetchone()
+        if not row:
+            return None
+        ticket = dict(row)
+        conn.execute("UPDATE tickets SET status=? WHERE id=?", (status, ticket_id))
+        if ticket["status"] == "closed" and status != "closed":
+            index_ticket(conn, ticket_id, ticket["title"], ticket["description"])
+        assigned = []
+        if (ticket["status"] == "closed") != (status == "closed"):
+            assigned = refresh_loads(conn, [ticket["assignee"]])
+        if notify:
+            enqueue_email(
+                conn,
+                to=ticket["email"],
+                subject="Ticket Status Updated",
+                body=f"Dear {ticket['username']},\n\nThe status of your ticket '{ticket['title']}' has been updated to '{status}'. Please log in to view the details.\n\nThank you!"
+            )
+        ticket["status"] = status
+        events = [("status-changed", ticket_event_data(ticket))] + assignment_events(assigned)
+        record_events(conn, events)
+        return ticket, events
+
+    ticket, events = write(update) or (None, [])
+    if ticket:
+        bump_data_version()
+        publish_many(events)
+    return ticket
+
+def reassign_ticket(ticket_id, assignee):
+    """Give an open ticket to ``assignee``; False if it is closed or missing."""
+    def update(conn):
+        row = conn.execute("SELECT status FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        if not row or row["status"] == "closed":
+            return False
+        assign_ticket(conn, ticket_id, assignee)
+        events = [("ticket-assigned", {"id": ticket_id, "assignee": assignee})]
+        record_events(conn, events)
+        return events
+
+    events = write(update)
+    if not events:
+        return False
+    bump_data_version()
+    publish_many(events)
+    return True
+
+def get_technician_profile(username):
+    row = get_db().execute(SQL_TECHNICIAN_PROFILE, (username,)).fetchone()
+    return dict(row) if row else None
+
+def set_technician_availability(username, available):
+    """Put a technician on or off the rota; going off hands their open
+    tickets to the others. Returns the number of tickets that moved."""
+    def update(conn):
+        moved, assigned = set_availability(conn, username, available)
+        assignees = dict.fromkeys(moved)
+        assignees.update(assigned)
+        events = assignment_events(assignees.items())
+        record_events(conn, events)
+        return len(moved), events
+
+    moved, events = write(update)
+    bump_data_version()
+    publish_many(events)
+    return moved
+
+def assignment_events(assignments):
+    return [("ticket-assigned", {"id": ticket_id, "assignee": assignee}) for ticket_id, assignee in assignments]
+
+TICKET_STATUSES = ("open", "in progress", "closed")
+TICKET_CATEGORIES = ("IT", "Facilities", "Academic", "Other")
+# Tickets one bulk action may touch; the whole action is one transaction.
+BULK_ACTION_LIMIT = int(os.getenv("BULK_ACTION_LIMIT", "1000"))
+
+def tickets_by_id(conn, table, ids):
+    # One JSON array parameter instead of an IN list, which would be bounded
+    # by SQLITE_MAX_VARIABLE_NUMBER.
+    rows = conn.execute(f"SELECT * FROM {table} WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+    return {row["id"]: dict(row) for row in rows}
+
+def queue_bulk_notices(conn, notices):
+    """One email per student, listing every ticket the action changed."""
+    for to_email, (username, lines) in notices.items():
+        body = "\n".join(lines)
+        enqueue_email(
+            conn,
+            to=to_email,
+            subject="Ticket Updates",
+            body=f"Dear {username},\n\nThe following tickets have been updated:\n\n{body}\n\nPlease log in to view the details.\n\nThank you!"
+        )
+
+def bulk_update_tickets(ticket_ids, technician, status=None, comment=None):
+    """Apply a status change and/or a comment to many tickets at once.
+
+    Everything is written as one write with one commit, and each
+    student gets a single email covering all of their tickets. Returns a
+    result per requested ticket, in request order.
+    """
+    if status is None and not comment:
+        raise ValueError("Choose a status or write a comment.")
+    if status is not None:
+        check_status(status)
+    ids = list(dict.fromkeys(ticket_ids))
+    if len(ids) > BULK_ACTION_LIMIT:
+        raise ValueError(f"At most {BULK_ACTION_LIMIT} tickets can be updated at once.")
+
+    def apply(conn):
+        tickets = tickets_by_id(conn, "main.tickets", ids)
+        archived = tickets_by_id(conn, "archive.tickets", [i for i in ids if i not in tickets])
+        results, status_changes, reopened, load_changes, events, notices = [], [], [], [], [], {}
+        for ticket_id in ids:
+            ticket = tickets.get(ticket_id)
+            if ticket is None:
+                error = "Archived tickets are read-only." if ticket_id in archived else "Ticket not found."
+                results.append({"id": ticket_id, "ok": False, "error": error})
+                continue
+            changes = []
+            if status is not None and status != ticket["status"]:
+                if ticket["status"] == "closed":
+                    reopened.append(ticket)
+                if (ticket["status"] == "closed") != (status == "closed"):
+                    load_changes.append(ticket["assignee"])
+                ticket["status"] = status
+                status_changes.append((status, ticket_id))
+                events.append(("status-changed", ticket_event_data(ticket)))
+                changes.append(f"status changed to '{status}'")
+            if comment:
+                row = conn.execute(
+                    "INSERT INTO comments (ticket_id, technician, comment) VALUES (?, ?, ?) "
+                    "RETURNING id, ticket_id, technician, comment, created_at",
+                    (ticket_id, technician, comment)
+                ).fetchone()
+                events.append(("comment-added", dict(row)))
+                changes.append("new comment")
+            if changes:
+                notices.setdefault(ticket["email"], (ticket["username"], []))[1].append(
+                    f"- '{ticket['title']}': {', '.join(changes)}"
+                )
+            results.append({"id": ticket_id, "ok": True, "changed": bool(changes), "status": ticket["status"]})
+        conn.executemany("UPDATE tickets SET status=? WHERE id=?", status_changes)
+        for ticket in reopened:
+            index_ticket(conn, ticket["id"], ticket["title"], ticket["description"])
+        if load_changes:
+            events.extend(assignment_events(refresh_loads(conn, load_changes)))
+        queue_bulk_notices(conn, notices)
+        record_events(conn, events)
+        return results, events
+
+    results, events = write(apply)
+    if events:
+        bump_data_version()
+        publish_many(events)
+    return results
+
+COMMENT_PREVIEW_LIMIT = 3
+
+@cached("tickets")
+def get_tickets(username=None, comment_limit=COMMENT_PREVIEW_LIMIT, include_archived=False):
+    """Tickets, newest first; archived tickets only when asked for."""
     conn = get_db()
     if username:
-        tickets = conn.execute("SELECT * FROM tickets WHERE username = ?", (username,)).fetchall()
+        tickets = conn.execute(ticket_sql(SQL_TICKETS_FOR_USER, include_archived), (username,)).fetchall()
     else:
-        tickets = conn.execute("SELECT * FROM tickets").fetchall()
-    # Attach comments to each ticket
-    ticket_list = []
-    for ticket in tickets:
-        comments = conn.execute("SELECT * FROM comments WHERE ticket_id = ? ORDER BY created_at ASC", (ticket["id"],)).fetchall()
-        ticket_dict = dict(ticket)
-        ticket_dict["comments"] = [dict(c) for c in comments]
-        ticket_list.append(ticket_dict)
-    conn.close()
+        tickets = conn.execute(ticket_sql(SQL_ALL_TICKETS, include_archived)).fetchall()
+    ticket_list = [dict(t) for t in tickets]
+    attach_comment_previews(conn, ticket_list, comment_limit, include_archived)
     return ticket_list
 
 
+TICKET_PAGE_SIZE = int(os.getenv("TICKET_PAGE_SIZE", "50"))
+USER_PAGE_SIZE = int(os.getenv("USER_PAGE_SIZE", "10"))
+
+# Listing filters: name -> condition. A condition without a placeholder is
+# a flag, applied when its value is true.
+TICKET_FILTERS = {
+    "status": "status = ?",
+    "category": "category = ?",
+    "username": "username = ?",
+    "assignee": "assignee = ?",
+    "unassigned": "assignee IS NULL",
+    "open": "status != 'closed'",
+    "created_from": "created_at >= ?",
+    "created_to": "created_at < date(?, '+1 day')",
+}
+USER_FILTERS = {
+    "role": "role = ?",
+}
+# Sort name -> (direction, keyset columns). Each ends in the primary key so
+# the order is total, and each is served by an index.
+TICKET_SORTS = {
+    "newest": ("DESC", ("created_at", "id")),
+    "oldest": ("ASC", ("created_at", "id")),
+    "due": ("ASC", ("due_at", "id")),
+}
+USER_SORTS = {
+    "id": ("ASC", ("id",)),
+    "username": ("ASC", ("username", "id")),
+}
+# The facets ignore their own filter, so every option shows what picking it would give.
+TICKET_FACETS = ("status", "category")
+
+
+def listing_key(filters):
+    """Filters as a hashable, order-independent cache key."""
+    return tuple(sorted(filters.items()))
+
+
+def get_ticket_page(filters, sort="newest", cursor=None, limit=TICKET_PAGE_SIZE, include_archived=False):
+    """A page of tickets matching ``filters`` (see TICKET_FILTERS), with
+    comment previews. Raises ValueError for an unknown filter, sort or a
+    malformed cursor."""
+    return _ticket_page(listing_key(filters), sort, cursor, limit, include_archived)
+
+
+@cached("ticket_page")
+def _ticket_page(filters, sort, cursor, limit, include_archived):
+    conn = get_db()
+    page = keyset_page(conn, tickets_source(include_archived), filters, TICKET_FILTERS, sort, TICKET_SORTS,
+                       cursor, limit)
+    attach_comment_previews(conn, page["rows"], include_archived=include_archived)
+    return page
+
+
+def facets_sql(source, filters):
+    clauses, params = filter_clauses([(k, v) for k, v in filters if k not in TICKET_FACETS], TICKET_FILTERS)
+    sql = f"SELECT {', '.join(TICKET_FACETS)}, COUNT(*) AS count FROM {source}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql + f" GROUP BY {', '.join(TICKET_FACETS)}", params
+
+
+def get_ticket_facets(filters, include_archived=False):
+    """Ticket counts per status and per category, and the number matching
+    every filter, from one grouped query."""
+    return _ticket_facets(listing_key(filters), include_archived)
+
+
+@cached("ticket_facets")
+def _ticket_facets(filters, include_archived):
+    chosen = {k: v for k, v in filters if k in TICKET_FACETS and v}
+    sql, params = facets_sql(tickets_source(include_archived), filters)
+    facets = {facet: {} for facet in TICKET_FACETS}
+    total = 0
+    for row in get_db().execute(sql, params):
+        for facet in TICKET_FACETS:
+            # Count the row under this facet if it passes every other facet's filter.
+            if all(row[other] == chosen[other] for other in chosen if other != facet):
+                facets[facet][row[facet]] = facets[facet].get(row[facet], 0) + row["count"]
+        if all(row[facet] == value for facet, value in chosen.items()):
+            total += row["count"]
+    return {"facets": facets, "total": total}
+
+
+def get_user_page(filters, sort="id", cursor=None, limit=USER_PAGE_SIZE):
+    return _user_page(listing_key(filters), sort, cursor, limit)
+
+
+@cached("user_page")
+def _user_page(filters, sort, cursor, limit):
+    page = keyset_page(get_db(), "users", filters, USER_FILTERS, sort, USER_SORTS, cursor, limit)
+    page["rows"] = [{"id": u["id"], "username": u["username"], "role": u["role"]} for u in page["rows"]]
+    return page
+
+
+@cached("user_role_counts")
+def get_user_role_counts():
+    return {row["role"]: row["count"] for row in get_db().execute(SQL_USER_ROLE_COUNTS)}
+
+
+def attach_comment_previews(conn, ticket_list, comment_limit=COMMENT_PREVIEW_LIMIT, include_archived=False):
+    """Inline the latest comments and the comment count on each ticket.
+
+    Comments for every ticket are fetched with one windowed query, the ids
+    passed as a single JSON array.
+    """
+    by_id = {}
+    for ticket in ticket_list:
+        ticket["comments"] = []
+        ticket["comment_count"] = 0
+        by_id[ticket["id"]] = ticket
+    if not by_id:
+        return ticket_list
+    rows = conn.execute(
+        ticket_sql(SQL_COMMENT_PREVIEWS, include_archived), (json.dumps(list(by_id)), comment_limit)
+    ).fetchall()
+    for row in rows:
+        ticket = by_id[row["ticket_id"]]
+        ticket["comment_count"] = row["total"]
+        comment = dict(row)
+        del comment["total"]
+        ticket["comments"].append(comment)
+    return ticket_list
+
+
+def get_comments(ticket_id, include_archived=False):
+    conn = get_db()
+    comments = conn.execute(ticket_sql(SQL_COMMENTS_FOR_TICKET, include_archived), (ticket_id,)).fetchall()
+    return [dict(c) for c in comments]
+
+
 def get_users():
     conn = get_db()
-    users = conn.execute("SELECT id, username, role FROM users ORDER BY id").fetchall()
-    conn.close()
+    users = conn.execute(SQL_ALL_USERS).fetchall()
     return [dict(u) for u in users]
 
+@cached("ticket_counts_by_week")
 def get_ticket_counts_by_week():
     conn = get_db()
     cur = conn.cursor()
-    cur.execute("""
-    SELECT strftime('%W', created_at) as week, COUNT(*) as count
-    FROM tickets
-    GROUP BY week
-    """)
+    cur.execute(SQL_TICKET_COUNTS_BY_WEEK)
     rows = cur.fetchall()
-    conn.close()
     return [{"week": row["week"], "count": row["count"]} for row in rows]
+
+
+def listing_query(source, filters, sort, sorts=TICKET_SORTS, allowed=TICKET_FILTERS, cursor_values=None):
+    """Sample page query for HOT_QUERIES, continuing after ``cursor_values``."""
+    cursor = encode_cursor("after", cursor_values) if cursor_values else None
+    sql, params = keyset_sql(source, list(filters.items()), allowed, sort, sorts, cursor, TICKET_PAGE_SIZE)
+    return sql, tuple(params)
+
+
+# Queries checked by migrations.check_query_plans (cli.py check-plans).
+# Entries are (name, sql, sample params, full_listing); full listings read
+# every row by design and are reported but not flagged.
+HOT_QUERIES = [
+    ("ticket_by_id", ticket_sql(SQL_TICKET_BY_ID), (1,), False),
+    ("tickets_for_user", ticket_sql(SQL_TICKETS_FOR_USER), ("student",), False),
+    ("all_tickets", ticket_sql(SQL_ALL_TICKETS), (), False),
+    ("comment_previews", ticket_sql(SQL_COMMENT_PREVIEWS), ("[1, 2]", COMMENT_PREVIEW_LIMIT), False),
+    ("comments_for_ticket", ticket_sql(SQL_COMMENTS_FOR_TICKET), (1,), False),
+    ("archived_ticket_by_id", ticket_sql(SQL_TICKET_BY_ID, True), (1,), False),
+    ("archived_tickets_for_user", ticket_sql(SQL_TICKETS_FOR_USER, True), ("student",), False),
+    ("archived_comments_for_ticket", ticket_sql(SQL_COMMENTS_FOR_TICKET, True), (1,), False),
+    ("user_by_username", SQL_USER_BY_USERNAME, ("student",), False),
+    ("all_users", SQL_ALL_USERS, (), True),
+    ("user_role_counts", SQL_USER_ROLE_COUNTS, (), False),
+    # Reads the whole rollup, which grows by one row per week/category/status.
+    ("ticket_counts_by_week", SQL_TICKET_COUNTS_BY_WEEK, (), True),
+    ("ticket_page_newest", *listing_query("tickets", {}, "newest", cursor_values=["2024-01-01 00:00:00", 10]), False),
+    ("ticket_page_status", *listing_query("tickets", {"status": "open"}, "newest"), False),
+    ("ticket_page_category", *listing_query("tickets", {"category": "IT", "created_from": "2024-01-01"}, "newest"), False),
+    ("ticket_page_student", *listing_query("tickets", {"username": "student"}, "oldest"), False),
+    ("ticket_page_mine", *listing_query("tickets", {"assignee": "tech", "open": True}, "due", cursor_values=["2024-01-01 00:00:00", 10]), False),
+    ("ticket_page_unassigned", *listing_query("tickets", {"unassigned": True, "open": True}, "due"), False),
+    ("user_page_role", *listing_query("users", {"role": "technician"}, "id", USER_SORTS, USER_FILTERS, [10]), False),
+    ("user_page_username", *listing_query("users", {}, "username", USER_SORTS, USER_FILTERS, ["alice", 10]), False),
+    # Counts every matching ticket, from a covering index.
+    ("ticket_facets", *facets_sql("tickets", [("created_from", "2024-01-01")]), False),
+    ("ticket_facets_mine", *facets_sql("tickets", [("assignee", "tech"), ("open", True)]), False),
+]
@@ -0,0 +1,127 @@
+import os
+import smtplib
+import time
+from backend.database import get_db, release_db
+from backend.emailer import SMTPSession, email_configured
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+# A claimed message becomes due again after this long, so a crashed worker
+# does not strand it.
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+
+
+def enqueue_email(conn, to, subject, body):
+    """Queue a message on the caller's connection without committing.
+
+    The caller commits it together with the write it describes, so a
+    notification is recorded if and only if that write is.
+    """
+    conn.execute(
+        "INSERT INTO outbox (recipient, subject, body) VALUES (?, ?, ?)",
+        (to, subject, body)
+    )
+
+
+def backoff_seconds(attempts):
+    return min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+def claim_batch(conn, limit=OUTBOX_BATCH_SIZE):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute("""
+        SELECT id, recipient, subject, body, attempts FROM outbox
+        WHERE status = 'pending' AND next_attempt_at <= datetime('now')
+        ORDER BY next_attempt_at, id
+        LIMIT ?
+        """, (limit,)).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE outbox SET next_attempt_at = datetime('now', ?) WHERE id = ?",
+                [(f"+{OUTBOX_LEASE_SECONDS} seconds", row["id"]) for row in rows]
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [dict(row) for row in rows]
+
+
+def record_result(conn, message, error=None):
+    if error is None:
+        conn.execute(
+            "UPDATE outbox SET status = 'sent', sent_at = datetime('now'), last_error = NULL WHERE id = ?",
+            (message["id"],)
+        )
+        return "sent"
+    attempts = message["attempts"] + 1
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        conn.execute(
+            "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+            (attempts, error, message["id"])
+        )
+        return "dead"
+    conn.execute(
+        "UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = datetime('now', ?) WHERE id = ?",
+        (attempts, error, f"+{backoff_seconds(attempts)} seconds", message["id"])
+    )
+    return "retry"
+
+
+def drain(session, batch_size=OUTBOX_BATCH_SIZE):
+    """Send one batch over ``session`` and return counts per outcome."""
+    conn = get_db()
+    counts = {"sent": 0, "retry": 0, "dead": 0}
+    for message in claim_batch(conn, batch_size):
+        error = None
+        try:
+            session.send(message["recipient"], message["subject"], message["body"])
+        except (smtplib.SMTPException, OSError) as e:
+            error = f"{type(e).__name__}: {e}"
+            # Start the next message on a fresh connection.
+            session.close()
+        counts[record_result(conn, message, error)] += 1
+        conn.commit()
+    return counts
+
+
+def run_worker(batch_size=OUTBOX_BATCH_SIZE, poll_seconds=OUTBOX_POLL_SECONDS, once=False, echo=print):
+    if not email_configured():
+        echo("⚠️ Email not configured. Set SMTP_HOST or SMTP_USER/SMTP_PASS to deliver the outbox.")
+        return
+    session = SMTPSession()
+    try:
+        while True:
+            counts = drain(session, batch_size)
+            if any(counts.values()):
+                echo(f"Outbox: {counts['sent']} sent, {counts['retry']} to retry, {counts['dead']} dead-lettered")
+            if once:
+                if counts["sent"] + counts["retry"] + counts["dead"] < batch_size:
+                    break
+                continue
+            if counts["sent"] + counts["retry"] + counts["dead"] == 0:
+                # Idle: drop the SMTP connection rather than let the server time it out.
+                session.close()
+                time.sleep(poll_seconds)
+    finally:
+        session.close()
+        release_db()
+
+
+def outbox_stats():
+    conn = get_db()
+    rows = conn.execute("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status").fetchall()
+    return {row["status"]: row["count"] for row in rows}
+
+
+def retry_dead():
+    conn = get_db()
+    cur = conn.execute(
+        "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = datetime('now') WHERE status = 'dead'"
+    )
+    conn.commit()
+    return cur.rowcount
@@ -0,0 +1,90 @@
+import base64
+import json
+
+# Keyset pagination shared by the dashboards and the JSON API. ``allowed``
+# maps filter names to conditions and ``sorts`` maps sort names to
+# (direction, keyset columns), as models.TICKET_FILTERS and TICKET_SORTS do.
+# Unknown filters and sorts and malformed cursors raise ValueError.
+
+CURSOR_DIRECTIONS = ("after", "before")
+
+
+def encode_cursor(direction, values):
+    return base64.urlsafe_b64encode(json.dumps([direction, values]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(decoded, list) or len(decoded) != 2:
+        raise ValueError("Invalid cursor.")
+    direction, values = decoded
+    if (direction not in CURSOR_DIRECTIONS or not isinstance(values, list) or len(values) != size
+            or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values)):
+        raise ValueError("Invalid cursor.")
+    return direction, values
+
+
+def filter_clauses(filters, allowed):
+    """WHERE conditions and parameters for ``filters``, a sequence of (name, value)."""
+    clauses, params = [], []
+    for name, value in filters:
+        if name not in allowed:
+            raise ValueError(f"Unknown filter: {name}")
+        if value in (None, "", False):
+            continue
+        clauses.append(allowed[name])
+        if "?" in allowed[name]:
+            params.append(value)
+    return clauses, params
+
+
+def keyset_sql(source, filters, allowed, sort, sorts, cursor, limit, columns=("*",)):
+    """SELECT of ``columns`` for one page of ``source`` and its parameters.
+
+    A cursor holds the sort key of the row a page starts after (or ends
+    before), so every page is an index range read of ``limit + 1`` rows,
+    however deep it is.
+    """
+    if sort not in sorts:
+        raise ValueError(f"Unknown sort: {sort}")
+    direction, keys = sorts[sort]
+    clauses, params = filter_clauses(filters, allowed)
+    backward = False
+    if cursor:
+        where, values = decode_cursor(cursor, len(keys))
+        backward = where == "before"
+        operator = "<" if (direction == "DESC") != backward else ">"
+        clauses.append(f"({', '.join(keys)}) {operator} ({', '.join('?' * len(keys))})")
+        params += values
+    if backward:
+        direction = "ASC" if direction == "DESC" else "DESC"
+    sql = f"SELECT {', '.join(columns)} FROM {source}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {', '.join(f'{c} {direction}' for c in keys)} LIMIT ?"
+    return sql, params + [limit + 1]
+
+
+def keyset_page(conn, source, filters, allowed, sort, sorts, cursor, limit, columns=("*",)):
+    """One page of rows with the cursors of the pages before and after it.
+
+    ``columns`` must include the sort's keyset columns.
+    """
+    sql, params = keyset_sql(source, filters, allowed, sort, sorts, cursor, limit, columns)
+    rows = [dict(r) for r in conn.execute(sql, params)]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    backward = bool(cursor) and decode_cursor(cursor, len(sorts[sort][1]))[0] == "before"
+    if backward:
+        rows.reverse()
+    keys = sorts[sort][1]
+    page = {"rows": rows, "next_cursor": None, "prev_cursor": None}
+    if rows:
+        if more or backward:
+            page["next_cursor"] = encode_cursor("after", [rows[-1][c] for c in keys])
+        if (more and backward) or (cursor and not backward):
+            page["prev_cursor"] = encode_cursor("before", [rows[0][c] for c in keys])
+    return page
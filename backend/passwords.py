@@ -0,0 +1,86 @@
+import concurrent.futures
+import os
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Any method string Werkzeug accepts, e.g. "scrypt", "scrypt:65536:8:1" or
+# "pbkdf2:sha256:600000". Stored hashes made with other parameters are
+# replaced on the user's next successful login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+# Hashes computed at once by one web worker, and how many more may wait for
+# a slot before requests are turned away.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def make_hash(password):
+    """Hash synchronously with the configured parameters."""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD, salt_length=PASSWORD_SALT_LENGTH)
+
+
+_method_prefix = None
+
+
+def current_method():
+    """The parameter prefix ("scrypt:32768:8:1") new hashes are stored with."""
+    global _method_prefix
+    if _method_prefix is None:
+        _method_prefix = make_hash("").split("$", 1)[0]
+    return _method_prefix
+
+
+def needs_rehash(stored):
+    return stored.split("$", 1)[0] != current_method()
+
+
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid, _slots
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = concurrent.futures.ThreadPoolExecutor(PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+                _slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _run(fn, *args):
+    """Run ``fn`` on the bounded hashing executor and wait for it.
+
+    hashlib releases the GIL while hashing, so a few executor threads keep
+    the cores busy while the remaining request threads go on serving other
+    routes. When every slot is taken, HashingBusy is raised at once.
+    """
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Too many password checks in progress.")
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    return _run(make_hash, password)
+
+
+def check_password(stored, password):
+    if not stored:
+        return False
+    return _run(check_password_hash, stored, password)
+
+
+def hash_many(pool, passwords, chunksize=16):
+    """Hash a batch on a ProcessPoolExecutor; returns hashes in input order."""
+    return list(pool.map(make_hash, passwords, chunksize=chunksize))
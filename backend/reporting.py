@@ -0,0 +1,166 @@
+from backend.database import get_db
+from backend.cache import cached, bump_data_version
+from backend.archive import tickets_source
+
+# Upper bounds, in minutes, of the time-to-close histogram buckets; the last
+# bucket is open-ended. The rollup triggers embed these values, so changing
+# them needs a migration that recreates the triggers and rebuilds rollups.
+CLOSE_TIME_BUCKETS = [15, 30, 60, 120, 240, 480, 1440, 2880, 4320, 10080, 20160, 43200, 86400]
+
+WEEK_EXPR = "strftime('%Y-%W', {column})"
+
+
+def minutes_between(start, end):
+    return f"((julianday({end}) - julianday({start})) * 1440)"
+
+
+def bucket_expr(minutes):
+    """SQL CASE expression mapping a duration in minutes to its bucket index."""
+    cases = " ".join(f"WHEN {minutes} < {bound} THEN {i}" for i, bound in enumerate(CLOSE_TIME_BUCKETS))
+    return f"(CASE {cases} ELSE {len(CLOSE_TIME_BUCKETS)} END)"
+
+
+# {source} is filled with tickets_source(True): archiving does not touch the
+# rollups, so a rebuild has to count the archived tickets too.
+SQL_REBUILD_ROLLUP = f"""
+INSERT INTO ticket_rollup (week, category, status, assignee, count)
+SELECT {WEEK_EXPR.format(column="created_at")}, COALESCE(category, ''), COALESCE(status, ''), {{assignee}}, COUNT(*)
+FROM {{source}}
+GROUP BY 1, 2, 3, 4
+"""
+SQL_REBUILD_CLOSE_HISTOGRAM = f"""
+INSERT INTO ticket_close_histogram (week, category, bucket, count)
+SELECT {WEEK_EXPR.format(column="closed_at")}, COALESCE(category, ''),
+       {bucket_expr(minutes_between("created_at", "closed_at"))}, COUNT(*)
+FROM {{source}}
+WHERE status = 'closed' AND closed_at IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+
+def refill_rollups(conn):
+    """Recompute both rollup tables from the live and archived tickets,
+    inside the caller's transaction."""
+    source = tickets_source(include_archived=True)
+    conn.execute("DELETE FROM ticket_rollup")
+    conn.execute("DELETE FROM ticket_close_histogram")
+    conn.execute(SQL_REBUILD_ROLLUP.format(source=source, assignee="COALESCE(assignee, '')"))
+    conn.execute(SQL_REBUILD_CLOSE_HISTOGRAM.format(source=source))
+
+
+def rebuild_rollups(conn=None):
+    """Recompute both rollup tables from the live and archived tickets."""
+    conn = conn or get_db()
+    refill_rollups(conn)
+    conn.commit()
+    bump_data_version()
+    return conn.execute("SELECT COALESCE(SUM(count), 0) FROM ticket_rollup").fetchone()[0]
+
+
+def _filters(since=None, until=None, category=None, week_column="week"):
+    clauses, params = [], []
+    if since:
+        clauses.append(f"{week_column} >= ?")
+        params.append(since)
+    if until:
+        clauses.append(f"{week_column} <= ?")
+        params.append(until)
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+@cached("report_weekly_counts")
+def weekly_counts(since=None, until=None, category=None):
+    """Tickets created per year-week ('YYYY-WW'), oldest first."""
+    where, params = _filters(since, until, category)
+    rows = get_db().execute(
+        f"SELECT week, SUM(count) AS count FROM ticket_rollup{where} GROUP BY week ORDER BY week",
+        params
+    ).fetchall()
+    return [{"week": r["week"], "count": r["count"]} for r in rows]
+
+
+@cached("report_weekly_counts_by")
+def weekly_counts_by(dimension, since=None, until=None, category=None):
+    """Weekly series split by ``category``, ``status`` or ``assignee``."""
+    if dimension not in ("category", "status", "assignee"):
+        raise ValueError(f"Unknown dimension: {dimension}")
+    where, params = _filters(since, until, category)
+    rows = get_db().execute(
+        f"SELECT week, {dimension} AS key, SUM(count) AS count FROM ticket_rollup{where} "
+        # Rows emptied by status changes and reassignments are kept at zero.
+        f"GROUP BY week, {dimension} HAVING SUM(count) != 0 ORDER BY week, {dimension}",
+        params
+    ).fetchall()
+    series = {}
+    for r in rows:
+        series.setdefault(r["key"], []).append({"week": r["week"], "count": r["count"]})
+    return series
+
+
+@cached("report_category_breakdown")
+def category_breakdown(since=None, until=None):
+    """Ticket counts per category, split by status."""
+    where, params = _filters(since, until)
+    rows = get_db().execute(
+        f"SELECT category, status, SUM(count) AS count FROM ticket_rollup{where} GROUP BY category, status",
+        params
+    ).fetchall()
+    breakdown = {}
+    for r in rows:
+        entry = breakdown.setdefault(r["category"], {"total": 0, "by_status": {}})
+        entry["by_status"][r["status"]] = r["count"]
+        entry["total"] += r["count"]
+    return breakdown
+
+
+@cached("report_backlog")
+def backlog():
+    """Open backlog depth: tickets not yet closed, by category and by age in weeks."""
+    rows = get_db().execute(
+        "SELECT week, category, SUM(count) AS count FROM ticket_rollup WHERE status != 'closed' GROUP BY week, category"
+    ).fetchall()
+    by_category, by_week, total = {}, {}, 0
+    for r in rows:
+        if not r["count"]:
+            continue
+        by_category[r["category"]] = by_category.get(r["category"], 0) + r["count"]
+        by_week[r["week"]] = by_week.get(r["week"], 0) + r["count"]
+        total += r["count"]
+    return {"total": total, "by_category": by_category, "by_created_week": dict(sorted(by_week.items()))}
+
+
+@cached("report_time_to_close_percentiles")
+def time_to_close_percentiles(percentiles=(50, 90, 95, 99), since=None, until=None, category=None):
+    """Estimate time-to-close percentiles, in minutes, from the histogram.
+
+    Each estimate is interpolated linearly inside its bucket; values in the
+    open-ended last bucket are reported as that bucket's lower bound.
+    """
+    where, params = _filters(since, until, category)
+    rows = get_db().execute(
+        f"SELECT bucket, SUM(count) AS count FROM ticket_close_histogram{where} GROUP BY bucket ORDER BY bucket",
+        params
+    ).fetchall()
+    counts = [(r["bucket"], r["count"]) for r in rows if r["count"] > 0]
+    total = sum(c for _, c in counts)
+    result = {"closed": total, "minutes": {}}
+    if not total:
+        return result
+    for p in percentiles:
+        target = total * p / 100
+        seen = 0
+        for bucket, count in counts:
+            if seen + count >= target:
+                lower = CLOSE_TIME_BUCKETS[bucket - 1] if bucket > 0 else 0
+                if bucket >= len(CLOSE_TIME_BUCKETS):
+                    value = lower
+                else:
+                    value = lower + (CLOSE_TIME_BUCKETS[bucket] - lower) * (target - seen) / count
+                result["minutes"][f"p{p}"] = round(value, 1)
+                break
+            seen += count
+    return result
@@ -0,0 +1,388 @@
+import calendar
+import heapq
+import math
+import os
+import threading
+import time
+from backend.database import get_db, release_db
+from backend.cache import bump_data_version
+from backend.events import publish_many, record_events
+from backend.writer import on_rollback, write
+
+# Hours to resolve a ticket, per category, e.g. "IT:24,Facilities:72".
+SLA_HOURS = {
+    category: int(hours)
+    for category, _, hours in (part.partition(":") for part in
+                               os.getenv("SLA_HOURS", "IT:24,Facilities:72,Academic:120,Other:72").split(","))
+}
+SLA_DEFAULT_HOURS = int(os.getenv("SLA_DEFAULT_HOURS", "72"))
+# Open tickets a technician is given before new ones wait in the backlog.
+TECHNICIAN_CAPACITY = int(os.getenv("TECHNICIAN_CAPACITY", "25"))
+# The in-memory queues are reloaded when another connection has written to
+# the database, after a write rolls back, and at least this often.
+SCHEDULER_RESYNC_SECONDS = float(os.getenv("SCHEDULER_RESYNC_SECONDS", "60"))
+SLA_TICK_SECONDS = float(os.getenv("SLA_TICK_SECONDS", "1"))
+SLA_WHEEL_SLOTS = int(os.getenv("SLA_WHEEL_SLOTS", "512"))
+SLA_SCAN_SECONDS = float(os.getenv("SLA_SCAN_SECONDS", "60"))
+BACKLOG_BATCH_SIZE = 500
+
+SQL_PROFILES = "SELECT username, skills, available, capacity, open_tickets FROM technician_profiles"
+SQL_PROFILE = "SELECT username, skills, available, capacity, open_tickets FROM technician_profiles WHERE username = ?"
+SQL_BACKLOG = """
+SELECT id, category FROM tickets
+WHERE assignee IS NULL AND status != 'closed'
+ORDER BY due_at
+LIMIT ?
+"""
+SQL_DUE_SOON = """
+SELECT id, due_at FROM tickets
+WHERE status != 'closed' AND escalated_at IS NULL AND due_at <= ?
+ORDER BY due_at
+"""
+
+HOT_QUERIES = [
+    ("technician_profile", SQL_PROFILE, ("tech",), False),
+    ("backlog", SQL_BACKLOG, (BACKLOG_BATCH_SIZE,), False),
+    ("sla_due_soon", SQL_DUE_SOON, ("2024-01-01 00:00:00",), False),
+    # One row per technician.
+    ("technician_profiles", SQL_PROFILES, (), True),
+]
+
+
+def sla_offset(category):
+    return f"+{SLA_HOURS.get(category, SLA_DEFAULT_HOURS)} hours"
+
+
+def sla_case_sql(category_column, created_column):
+    """SQL computing the SLA deadline of a row, for backfills and triggers."""
+    cases = " ".join(f"WHEN '{category}' THEN '{sla_offset(category)}'" for category in SLA_HOURS)
+    return f"datetime({created_column}, CASE {category_column} {cases} ELSE '+{SLA_DEFAULT_HOURS} hours' END)"
+
+
+def parse_skills(skills):
+    return {s.strip() for s in (skills or "").split(",") if s.strip()}
+
+
+class Scheduler:
+    """Per-category heaps of available technicians keyed by open load.
+
+    A ticket goes to the least-loaded technician skilled in its category,
+    or else to the least-loaded available technician, below capacity. Heap
+    entries are not removed when a load changes; a fresh entry is pushed
+    and stale ones are skipped when they reach the top, so picking and
+    updating a technician cost O(log n).
+    """
+
+    def __init__(self):
+        self.technicians = {}
+        self.heaps = {}
+        self._lock = threading.RLock()
+        # id(conn) -> (conn, PRAGMA data_version when last looked at).
+        self._data_versions = {}
+        self._synced_at = 0.0
+
+    def load(self, conn):
+        self.technicians = {}
+        self.heaps = {None: []}
+        for row in conn.execute(SQL_PROFILES):
+            self._set(row)
+        self._data_versions = {}
+        self._synced_at = time.monotonic()
+
+    def sync(self, conn):
+        """Reload when another connection committed since the last look.
+
+        PRAGMA data_version only changes for commits made through other
+        connections, and each connection has its own counter. It is kept
+        per connection, so the writer's own assignments keep the heaps
+        valid, and so do those of the pooled connections that run writes
+        with WRITER_ENABLED=0 until one of them sees another's commit.
+        """
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = self._data_versions.get(id(conn))
+        if (seen is None or seen[0] is not conn or seen[1] != version
+                or time.monotonic() - self._synced_at > SCHEDULER_RESYNC_SECONDS):
+            self.load(conn)
+        elif len(self._data_versions) > 64:
+            # Connections come and go with the pool; forget closed ones.
+            self._data_versions = {}
+        self._data_versions[id(conn)] = (conn, version)
+
+    def invalidate(self):
+        """Reload on the next sync; the heaps may count rolled-back work."""
+        with self._lock:
+            self._synced_at = float("-inf")
+
+    def _set(self, row):
+        tech = {
+            "skills": parse_skills(row["skills"]),
+            "available": bool(row["available"]),
+            "capacity": TECHNICIAN_CAPACITY if row["capacity"] is None else row["capacity"],
+            "load": row["open_tickets"],
+        }
+        self.technicians[row["username"]] = tech
+        if tech["available"]:
+            self._push(row["username"], tech)
+
+    def _push(self, username, tech):
+        entry = (tech["load"], username)
+        for key in (None, *tech["skills"]):
+            heapq.heappush(self.heaps.setdefault(key, []), entry)
+
+    def _compact(self):
+        """Drop stale entries once they outnumber the live ones."""
+        live = sum(1 + len(t["skills"]) for t in self.technicians.values() if t["available"])
+        if sum(len(h) for h in self.heaps.values()) > 4 * live + 64:
+            self.heaps = {None: []}
+            for username, tech in self.technicians.items():
+                if tech["available"]:
+                    self._push(username, tech)
+
+    def pick(self, conn, category):
+        """Choose a technician for a ticket of ``category`` and count it
+        against their load, or return None when everyone is full."""
+        with self._lock:
+            self.sync(conn)
+            for key in (category, None):
+                heap = self.heaps.get(key)
+                while heap:
+                    load, username = heap[0]
+                    tech = self.technicians.get(username)
+                    if tech is None or not tech["available"] or tech["load"] != load or load >= tech["capacity"]:
+                        # Stale, or full until a ticket of theirs is closed.
+                        heapq.heappop(heap)
+                        continue
+                    tech["load"] += 1
+                    self._push(username, tech)
+                    self._compact()
+                    return username
+            return None
+
+    def refresh(self, conn, usernames):
+        """Re-read technicians whose load or availability just changed."""
+        with self._lock:
+            self.sync(conn)
+            for username in set(usernames) - {None}:
+                row = conn.execute(SQL_PROFILE, (username,)).fetchone()
+                if row:
+                    self._set(row)
+                else:
+                    self.technicians.pop(username, None)
+            self._compact()
+
+    def free_capacity(self):
+        return sum(max(t["capacity"] - t["load"], 0) for t in self.technicians.values() if t["available"])
+
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler, _scheduler_pid
+    if _scheduler is None or _scheduler_pid != os.getpid():
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler_pid != os.getpid():
+                _scheduler = Scheduler()
+                _scheduler_pid = os.getpid()
+    return _scheduler
+
+
+@on_rollback
+def _discard_rolled_back_loads():
+    # pick() and refresh() update the heaps before the write commits.
+    if _scheduler is not None:
+        _scheduler.invalidate()
+
+
+def pick_technician(conn, category):
+    return get_scheduler().pick(conn, category)
+
+
+def refresh_loads(conn, usernames):
+    """Note that open tickets of ``usernames`` were closed, reopened or
+    moved, and refill freed capacity from the backlog."""
+    get_scheduler().refresh(conn, usernames)
+    return assign_backlog(conn, limit=len(usernames))
+
+
+def assign_backlog(conn, limit=None):
+    """Assign unassigned open tickets, earliest deadline first, while anyone
+    has capacity. Runs inside the caller's transaction; returns the
+    (ticket id, assignee) pairs made."""
+    scheduler = get_scheduler()
+    with scheduler._lock:
+        scheduler.sync(conn)
+        free = scheduler.free_capacity()
+        limit = free if limit is None else min(limit, free)
+        assigned = []
+        while limit > 0:
+            rows = conn.execute(SQL_BACKLOG, (min(limit, BACKLOG_BATCH_SIZE),)).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                assignee = scheduler.pick(conn, row["category"])
+                if assignee is None:
+                    return assigned
+                conn.execute("UPDATE tickets SET assignee = ? WHERE id = ?", (assignee, row["id"]))
+                assigned.append((row["id"], assignee))
+            limit -= len(rows)
+        return assigned
+
+
+def assign_ticket(conn, ticket_id, assignee):
+    """Hand a ticket to ``assignee`` (None to unassign); returns the previous assignee."""
+    row = conn.execute("SELECT assignee FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+    if row is None:
+        return None
+    conn.execute("UPDATE tickets SET assignee = ? WHERE id = ?", (assignee, ticket_id))
+    get_scheduler().refresh(conn, [row["assignee"], assignee])
+    return row["assignee"]
+
+
+def set_availability(conn, username, available):
+    """Take a technician on or off the rota.
+
+    Going offline hands their open tickets back to the backlog, from which
+    the other technicians are refilled at once, earliest deadline first.
+    """
+    conn.execute("UPDATE technician_profiles SET available = ? WHERE username = ?", (int(available), username))
+    moved = []
+    if not available:
+        moved = [r[0] for r in conn.execute(
+            "UPDATE tickets SET assignee = NULL WHERE assignee = ? AND status != 'closed' RETURNING id", (username,)
+        )]
+    get_scheduler().refresh(conn, [username])
+    return moved, assign_backlog(conn)
+
+
+def update_profile(conn, username, skills=None, capacity=None):
+    """Change a technician's skills (comma-separated categories) or capacity,
+    then fill any capacity freed. Returns the assignments made, or None when
+    ``username`` is not a technician."""
+    if not conn.execute(SQL_PROFILE, (username,)).fetchone():
+        return None
+    if skills is not None:
+        conn.execute("UPDATE technician_profiles SET skills = ? WHERE username = ?",
+                     (",".join(sorted(parse_skills(skills))), username))
+    if capacity is not None:
+        conn.execute("UPDATE technician_profiles SET capacity = ? WHERE username = ?", (capacity, username))
+    get_scheduler().refresh(conn, [username])
+    return assign_backlog(conn)
+
+
+def technician_profiles():
+    return [dict(r) for r in get_db().execute(SQL_PROFILES + " ORDER BY username")]
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) to schedule, O(1) per tick plus expiries.
+
+    Deadlines further out than one revolution carry a round count and are
+    passed over until it reaches zero.
+    """
+
+    def __init__(self, slots=SLA_WHEEL_SLOTS, tick=SLA_TICK_SECONDS, now=None):
+        self.slots = [[] for _ in range(slots)]
+        self.tick = tick
+        self.cursor = 0
+        self.time = time.time() if now is None else now
+
+    def schedule(self, when, item):
+        ticks = max(1, math.ceil((when - self.time) / self.tick))
+        rounds, offset = divmod(ticks - 1, len(self.slots))
+        self.slots[(self.cursor + 1 + offset) % len(self.slots)].append([rounds, item])
+
+    def advance(self, now):
+        """Move the wheel up to ``now`` and return the items that expired."""
+        expired = []
+        while self.time + self.tick <= now:
+            self.time += self.tick
+            self.cursor = (self.cursor + 1) % len(self.slots)
+            slot = self.slots[self.cursor]
+            keep = []
+            for entry in slot:
+                if entry[0] == 0:
+                    expired.append(entry[1])
+                else:
+                    entry[0] -= 1
+                    keep.append(entry)
+            self.slots[self.cursor] = keep
+        return expired
+
+
+def escalate(conn, ticket_ids):
+    """Mark overdue tickets escalated and give unassigned ones a technician,
+    recording a ticket-escalated event for each in the same write."""
+    placeholders = ",".join("?" * len(ticket_ids))
+    rows = conn.execute(
+        f"""
+        UPDATE tickets SET escalated_at = datetime('now')
+        WHERE id IN ({placeholders}) AND status != 'closed' AND escalated_at IS NULL AND due_at <= datetime('now')
+        RETURNING id, username, title, category, status, created_at, assignee, due_at
+        """,
+        ticket_ids
+    ).fetchall()
+    escalated = [dict(r) for r in rows]
+    for ticket in escalated:
+        if ticket["assignee"] is None:
+            ticket["assignee"] = pick_technician(conn, ticket["category"])
+            if ticket["assignee"]:
+                conn.execute("UPDATE tickets SET assignee = ? WHERE id = ?", (ticket["assignee"], ticket["id"]))
+    record_events(conn, [("ticket-escalated", ticket) for ticket in escalated])
+    return escalated
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def _epoch(timestamp):
+    return calendar.timegm(time.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+
+
+def run_sla_worker(once=False, echo=print):
+    """Escalate tickets as their SLA deadlines pass, and refill queues.
+
+    Every SLA_SCAN_SECONDS the deadlines falling before the next scan are
+    read with one indexed range query and put on the timer wheel; the wheel
+    then fires each one on time without polling the database.
+    """
+    wheel = TimerWheel()
+    scheduled = set()
+    next_scan = 0.0
+    try:
+        while True:
+            now = time.time()
+            overdue = []
+            if now >= next_scan:
+                horizon = now + 2 * SLA_SCAN_SECONDS
+                for row in get_db().execute(SQL_DUE_SOON, (_timestamp(horizon),)):
+                    if row["id"] in scheduled:
+                        continue
+                    due_at = _epoch(row["due_at"])
+                    if due_at <= now:
+                        overdue.append(row["id"])
+                    else:
+                        scheduled.add(row["id"])
+                        wheel.schedule(due_at, row["id"])
+                assigned = write(assign_backlog)
+                if assigned:
+                    bump_data_version()
+                    echo(f"Assigned {len(assigned)} tickets from the backlog.")
+                next_scan = now + SLA_SCAN_SECONDS
+            due = overdue + wheel.advance(now)
+            for start in range(0, len(due), BACKLOG_BATCH_SIZE):
+                batch = due[start:start + BACKLOG_BATCH_SIZE]
+                escalated = write(escalate, batch)
+                scheduled.difference_update(batch)
+                if escalated:
+                    bump_data_version()
+                    publish_many([("ticket-escalated", ticket) for ticket in escalated])
+                    echo(f"Escalated {len(escalated)} overdue tickets.")
+            if once:
+                break
+            time.sleep(SLA_TICK_SECONDS)
+    finally:
+        release_db()
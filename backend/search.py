@@ -0,0 +1,144 @@
+import re
+from markupsafe import escape, Markup
+from backend.database import get_db
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# bm25 weights for title, description, category, comments.
+TICKET_RANK_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# snippet() markers; control characters never appear in ticket text, so the
+# snippet can be HTML-escaped first and the markers swapped for <mark> after.
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+SQL_SEARCH_TICKETS = f"""
+SELECT t.id, t.title, t.category, t.status, t.username, t.created_at,
+       snippet(tickets_fts, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 12) AS snippet,
+       bm25(tickets_fts, {", ".join(str(w) for w in TICKET_RANK_WEIGHTS)}) AS rank
+FROM {{schema}}tickets_fts
+JOIN {{schema}}tickets t ON t.id = tickets_fts.rowid
+WHERE tickets_fts MATCH ?{{filters}}
+ORDER BY rank
+LIMIT ? OFFSET ?
+"""
+# FTS5 auxiliary functions cannot share a query with a window function, so
+# the total comes from a second, index-only query.
+SQL_COUNT_TICKET_MATCHES = """
+SELECT COUNT(*)
+FROM {schema}tickets_fts
+JOIN {schema}tickets t ON t.id = tickets_fts.rowid
+WHERE tickets_fts MATCH ?{filters}
+"""
+SQL_SEARCH_USERS = """
+SELECT u.id, u.username, u.role, COUNT(*) OVER () AS total
+FROM users_fts
+JOIN users u ON u.id = users_fts.rowid
+WHERE users_fts.username LIKE ?
+ORDER BY u.id
+LIMIT ? OFFSET ?
+"""
+
+HOT_QUERIES = [
+    ("search_tickets", SQL_SEARCH_TICKETS.format(schema="", filters=" AND t.status = ? AND t.category = ?"), ('"wifi"*', "open", "IT", 20, 0), False),
+    ("count_ticket_matches", SQL_COUNT_TICKET_MATCHES.format(schema="", filters=" AND t.status = ?"), ('"wifi"*', "open"), False),
+    ("search_archived_tickets", SQL_SEARCH_TICKETS.format(schema="archive.", filters=" AND t.username = ?"), ('"wifi"*', "student", 20, 0), False),
+    ("search_users", SQL_SEARCH_USERS, ("%ali%", 10, 0), False),
+]
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    terms = re.findall(r"\w+", query or "")
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet or "")).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>"))
+
+
+def clamp_page(page, per_page):
+    return max(page, 1), min(max(per_page, 1), SEARCH_MAX_PAGE_SIZE)
+
+
+def search_tickets(query, status=None, category=None, username=None, page=1, per_page=SEARCH_PAGE_SIZE,
+                   include_archived=False):
+    """Ranked full-text search over ticket text and comments.
+
+    Returns (results, total); each result carries an HTML-safe ``snippet``
+    with the matched terms wrapped in <mark>. With ``include_archived`` the
+    archive's index is searched too and both rankings are merged.
+    """
+    match = match_expression(query)
+    if not match:
+        return [], 0
+    page, per_page = clamp_page(page, per_page)
+    filters = ""
+    params = [match]
+    for column, value in (("status", status), ("category", category), ("username", username)):
+        if value:
+            filters += f" AND t.{column} = ?"
+            params.append(value)
+    conn = get_db()
+    offset = (page - 1) * per_page
+    if include_archived:
+        # Each index has to supply everything up to the end of this page
+        # before the merged ranking can be cut.
+        rows = []
+        total = 0
+        for schema in ("", "archive."):
+            rows += conn.execute(SQL_SEARCH_TICKETS.format(schema=schema, filters=filters), params + [offset + per_page, 0]).fetchall()
+            total += conn.execute(SQL_COUNT_TICKET_MATCHES.format(schema=schema, filters=filters), params).fetchone()[0]
+        rows = sorted(rows, key=lambda r: r["rank"])[offset:offset + per_page]
+    else:
+        rows = conn.execute(SQL_SEARCH_TICKETS.format(schema="", filters=filters), params + [per_page, offset]).fetchall()
+        if page == 1 and len(rows) < per_page:
+            total = len(rows)
+        else:
+            total = conn.execute(SQL_COUNT_TICKET_MATCHES.format(schema="", filters=filters), params).fetchone()[0]
+    results = []
+    for row in rows:
+        result = dict(row)
+        result["snippet"] = highlight(result["snippet"])
+        results.append(result)
+    return results, total
+
+
+def search_users(query, page=1, per_page=10):
+    """Substring search on usernames through the trigram index.
+
+    Returns (users, total) from a single query.
+    """
+    page, per_page = clamp_page(page, per_page)
+    conn = get_db()
+    # No ESCAPE clause: it stops FTS5 from using the trigram index, and a
+    # stray wildcard in a username search is harmless.
+    rows = conn.execute(
+        SQL_SEARCH_USERS,
+        (f"%{query or ''}%", per_page, (page - 1) * per_page)
+    ).fetchall()
+    total = rows[0]["total"] if rows else 0
+    return [{"id": r["id"], "username": r["username"], "role": r["role"]} for r in rows], total
+
+
+def rebuild_search_index(conn=None):
+    """Repopulate the FTS indexes, the archive's included, from the base tables."""
+    conn = conn or get_db()
+    conn.execute("DELETE FROM tickets_fts")
+    conn.execute("""
+    INSERT INTO tickets_fts (rowid, title, description, category, comments)
+    SELECT t.id, t.title, t.description, t.category,
+           COALESCE((SELECT group_concat(c.comment, ' ') FROM comments c WHERE c.ticket_id = t.id), '')
+    FROM tickets t
+    """)
+    conn.execute("DELETE FROM archive.tickets_fts")
+    conn.execute("""
+    INSERT INTO archive.tickets_fts (rowid, title, description, category, comments)
+    SELECT t.id, t.title, t.description, t.category,
+           COALESCE((SELECT group_concat(c.comment, ' ') FROM archive.comments c WHERE c.ticket_id = t.id), '')
+    FROM archive.tickets t
+    """)
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO tickets_fts (tickets_fts) VALUES ('optimize')")
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('optimize')")
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM tickets_fts").fetchone()[0]
@@ -0,0 +1,152 @@
+import datetime
+import random
+from backend.database import get_db
+from backend.search import rebuild_search_index
+from backend.similarity import index_open_tickets
+from backend.scheduler import assign_backlog
+from backend.passwords import make_hash
+
+# (users, tickets, comments) per named scale.
+SCALES = {
+    "small": (500, 2000, 8000),
+    "medium": (5000, 50000, 200000),
+    "large": (50000, 500000, 2000000),
+}
+SEED_PASSWORD = "password"
+SEED_START = datetime.datetime(2024, 1, 1, 8, 0, 0)
+SEED_DAYS = 365
+TECHNICIAN_SHARE = 0.02
+
+CATEGORY_WEIGHTS = {"IT": 45, "Facilities": 30, "Academic": 15, "Other": 10}
+SUBJECTS = {
+    "IT": ["wifi", "printer", "laptop", "password reset", "email", "projector", "VPN", "software license", "login portal"],
+    "Facilities": ["heating", "air conditioning", "broken chair", "leaking tap", "door lock", "lighting", "elevator", "parking permit"],
+    "Academic": ["course registration", "transcript", "grade appeal", "exam schedule", "library access", "advisor meeting"],
+    "Other": ["lost and found", "ID card", "meal plan", "event booking", "shuttle bus"],
+}
+PROBLEMS = ["not working", "keeps failing", "is very slow", "needs replacing", "stopped responding", "shows an error", "is missing"]
+PLACES = ["in the library", "in building A", "in the dorms", "in lab 3", "at the student center", "in room 204", "in the gym"]
+REPLIES = [
+    "Thanks, we are looking into it.",
+    "Could you share a screenshot of the error?",
+    "A technician has been scheduled to visit.",
+    "This should be fixed now, please confirm.",
+    "We ordered a replacement part.",
+    "Restarting the device resolved it on our side.",
+    "Forwarded to the facilities team.",
+]
+
+
+def timestamp(minutes):
+    return (SEED_START + datetime.timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate_users(rng, count):
+    """Yield (username, role) rows; the first few percent are technicians."""
+    technicians = max(2, int(count * TECHNICIAN_SHARE))
+    for i in range(count):
+        if i < technicians:
+            yield f"tech{i + 1:05d}", "technician"
+        else:
+            yield f"student{i - technicians + 1:06d}", "student"
+
+
+def created_minute(index, count):
+    """Minutes after SEED_START at which ticket ``index`` (0-based) was created."""
+    return int(SEED_DAYS * 24 * 60 * index / count) + (index * 7919) % 60
+
+
+def generate_tickets(rng, count, students):
+    """Yield ticket rows, with explicit ids, in creation order."""
+    categories = list(CATEGORY_WEIGHTS)
+    weights = list(CATEGORY_WEIGHTS.values())
+    for i in range(count):
+        created = created_minute(i, count)
+        category = rng.choices(categories, weights)[0]
+        subject = rng.choice(SUBJECTS[category])
+        username = rng.choice(students)
+        title = f"{subject.capitalize()} {rng.choice(PROBLEMS)}"
+        description = f"The {subject} {rng.choice(PROBLEMS)} {rng.choice(PLACES)} since {rng.choice(['this morning', 'yesterday', 'last week'])}."
+        # Older tickets are more likely to be resolved.
+        age = 1 - i / count
+        roll = rng.random()
+        if roll < 0.3 + 0.6 * age:
+            status = "closed"
+            closed_at = timestamp(created + min(int(rng.expovariate(1 / 1440)) + 5, 90 * 1440))
+        elif roll < 0.5 + 0.4 * age:
+            status, closed_at = "in progress", None
+        else:
+            status, closed_at = "open", None
+        yield (
+            i + 1, username, title, category, description, f"{username}@campus.example",
+            f"555-{rng.randrange(10000):04d}", status, timestamp(created), closed_at,
+        )
+
+
+def generate_comments(rng, count, tickets, technicians):
+    for _ in range(count):
+        index = rng.randrange(tickets)
+        yield (
+            index + 1, rng.choice(technicians), rng.choice(REPLIES),
+            timestamp(created_minute(index, tickets) + rng.randrange(1, 7 * 1440)),
+        )
+
+
+def _insert(conn, sql, rows, batch_size, label, total, echo):
+    batch, done = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            conn.commit()
+            done += len(batch)
+            batch = []
+            if echo:
+                echo(f"{label}: {done}/{total}")
+    if batch:
+        conn.executemany(sql, batch)
+        conn.commit()
+        done += len(batch)
+    if echo:
+        echo(f"{label}: {done}/{total}")
+
+
+def seed(users, tickets, comments, seed=42, batch_size=5000, echo=None):
+    """Fill an empty database with a deterministic synthetic campus dataset.
+
+    The same seed and sizes always produce the same rows, except for the
+    password salt: every user shares SEED_PASSWORD, hashed once.
+    """
+    conn = get_db()
+    if conn.execute("SELECT EXISTS (SELECT 1 FROM tickets) OR EXISTS (SELECT 1 FROM users)").fetchone()[0]:
+        raise ValueError("The database already has users or tickets; seed a fresh DB_PATH.")
+    rng = random.Random(seed)
+    password = make_hash(SEED_PASSWORD)
+
+    user_rows = list(generate_users(rng, users))
+    _insert(conn, "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+            ((username, password, role) for username, role in user_rows), batch_size, "users", users, echo)
+    technicians = [u for u, role in user_rows if role == "technician"]
+    students = [u for u, role in user_rows if role == "student"]
+
+    # Comments go in before their tickets: the trigger that appends each
+    # comment to the ticket's search document then has nothing to update,
+    # and the index is rebuilt once at the end instead of once per comment.
+    if tickets:
+        _insert(conn, "INSERT INTO comments (ticket_id, technician, comment, created_at) VALUES (?, ?, ?, ?)",
+                generate_comments(rng, comments, tickets, technicians), batch_size, "comments", comments, echo)
+    _insert(conn, "INSERT INTO tickets (id, username, title, category, description, email, phone, status, created_at, closed_at) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            generate_tickets(rng, tickets, students), batch_size, "tickets", tickets, echo)
+    if echo:
+        echo("Rebuilding the search index...")
+    rebuild_search_index(conn)
+    if echo:
+        echo("Rebuilding the similarity index...")
+    index_open_tickets(conn)
+    if echo:
+        echo("Assigning open tickets to technicians...")
+    assign_backlog(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    return {"users": users, "tickets": tickets, "comments": comments if tickets else 0}
@@ -0,0 +1,302 @@
+import collections
+import hashlib
+import math
+import os
+import random
+import re
+import struct
+import time
+from backend.database import get_db
+from backend.cache import cached, bump_data_version
+
+# Open tickets are indexed by MinHash signatures split into LSH bands. Two
+# tickets whose word-shingle Jaccard similarity is s share at least one band
+# bucket with probability 1 - (1 - s**LSH_ROWS)**LSH_BANDS: about 0.93 at
+# s = 0.5 and 0.42 at s = 0.3 with the defaults. Changing LSH_BANDS or LSH_ROWS needs a
+# `cli.py rebuild-similarity`.
+LSH_BANDS = int(os.getenv("LSH_BANDS", "20"))
+LSH_ROWS = int(os.getenv("LSH_ROWS", "3"))
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.5"))
+# Candidates verified per query, best band overlap first; keeps a query
+# bounded even when a widespread outage fills a few buckets.
+SIMILARITY_MAX_CANDIDATES = int(os.getenv("SIMILARITY_MAX_CANDIDATES", "200"))
+SUGGESTION_LIMIT = 5
+CLUSTER_MIN_SIZE = int(os.getenv("CLUSTER_MIN_SIZE", "3"))
+CLUSTER_LIMIT = 20
+
+PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(PRIME)) for _ in range(LSH_BANDS * LSH_ROWS)]
+
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are at be for from has have i in is it its my of on or our since the this to was with".split()
+)
+
+SQL_CANDIDATES = """
+SELECT t.id, t.title, t.description, t.category, t.status, t.created_at, t.username, COUNT(*) AS hits
+FROM ticket_lsh l
+JOIN tickets t ON t.id = l.ticket_id
+WHERE l.bucket IN ({placeholders}) AND t.status != 'closed'
+GROUP BY t.id
+ORDER BY hits DESC
+LIMIT ?
+"""
+SQL_LEADER_CANDIDATES = """
+SELECT t.id, t.title, t.description, s.cluster_id, COUNT(*) AS hits
+FROM ticket_lsh l
+JOIN ticket_cluster_summaries s ON s.leader_id = l.ticket_id
+JOIN tickets t ON t.id = l.ticket_id
+WHERE l.bucket IN ({placeholders})
+GROUP BY t.id
+ORDER BY hits DESC
+LIMIT ?
+"""
+# Cluster sizes are kept in ticket_cluster_summaries by triggers, so only
+# the members of the clusters shown are read.
+SQL_CLUSTERS = """
+SELECT s.leader_id, s.size, t.title, t.category, t.created_at AS since,
+       (SELECT group_concat(c.ticket_id) FROM ticket_clusters c WHERE c.leader_id = s.cluster_id) AS ids
+FROM ticket_cluster_summaries s
+LEFT JOIN tickets t ON t.id = s.leader_id
+WHERE s.size >= ?
+ORDER BY s.size DESC, s.leader_id
+LIMIT ?
+"""
+
+HOT_QUERIES = [
+    ("similar_candidates", SQL_CANDIDATES.format(placeholders="?,?"), (1, 2, SIMILARITY_MAX_CANDIDATES), False),
+    ("cluster_leader_candidates", SQL_LEADER_CANDIDATES.format(placeholders="?,?"), (1, 2, SIMILARITY_MAX_CANDIDATES), False),
+    ("incident_clusters", SQL_CLUSTERS, (CLUSTER_MIN_SIZE, CLUSTER_LIMIT), False),
+]
+
+
+def shingles(title, description):
+    """Words and adjacent word pairs of the ticket text, without stopwords."""
+    words = [w for w in WORD.findall(f"{title or ''} {description or ''}".lower()) if w not in STOPWORDS]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def signature(shingle_set):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingle_set]
+    return [min((a * h + b) % PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def band_buckets(sig):
+    """One signed 64-bit bucket key per band; the band number is part of the key."""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = sig[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<I{LSH_ROWS}Q", band, *rows), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def buckets_for(title, description):
+    shingle_set = shingles(title, description)
+    return band_buckets(signature(shingle_set)) if shingle_set else []
+
+
+def best_leader(shingle_set, candidates, threshold=SIMILARITY_THRESHOLD):
+    """The most similar of ``candidates`` (id, shingles) above ``threshold``,
+    the oldest on a tie, or None."""
+    best, best_score = None, threshold
+    for leader, leader_shingles in candidates:
+        score = jaccard(shingle_set, leader_shingles)
+        if score > best_score or (score == best_score and (best is None or leader < best)):
+            best, best_score = leader, score
+    return best
+
+
+def index_ticket(conn, ticket_id, title, description):
+    """Add or refresh one ticket in the index and its cluster; the caller commits.
+
+    The ticket joins the cluster of the most similar leader it shares a
+    bucket with, or founds a new cluster. Every member is similar to the
+    leader it joined, so clusters do not chain through loosely related
+    tickets; when a leader closes, the oldest member takes over.
+    """
+    conn.execute("DELETE FROM ticket_lsh WHERE ticket_id = ?", (ticket_id,))
+    conn.execute("DELETE FROM ticket_clusters WHERE ticket_id = ?", (ticket_id,))
+    shingle_set = shingles(title, description)
+    if not shingle_set:
+        return
+    buckets = band_buckets(signature(shingle_set))
+    rows = conn.execute(
+        SQL_LEADER_CANDIDATES.format(placeholders=",".join("?" * len(buckets))),
+        (*buckets, SIMILARITY_MAX_CANDIDATES)
+    ).fetchall()
+    leader = best_leader(shingle_set, ((r["id"], shingles(r["title"], r["description"])) for r in rows))
+    cluster = next(r["cluster_id"] for r in rows if r["id"] == leader) if leader is not None else ticket_id
+    conn.executemany(
+        "INSERT OR IGNORE INTO ticket_lsh (bucket, ticket_id) VALUES (?, ?)",
+        [(bucket, ticket_id) for bucket in buckets]
+    )
+    conn.execute("INSERT INTO ticket_clusters (ticket_id, leader_id) VALUES (?, ?)", (ticket_id, cluster))
+
+
+def index_open_tickets(conn, batch_size=2000, echo=None):
+    """Rebuild the index from the open tickets on ``conn``, without committing.
+
+    Tickets are clustered oldest first exactly as index_ticket would, with
+    the leaders' buckets kept in memory instead of queried per ticket.
+    """
+    conn.execute("DELETE FROM ticket_lsh")
+    conn.execute("DELETE FROM ticket_clusters")
+    cur = conn.execute("SELECT id, title, description FROM tickets WHERE status != 'closed' ORDER BY id")
+    leaders_in, leader_shingles = {}, {}
+    count = 0
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        lsh_rows, cluster_rows = [], []
+        for row in rows:
+            shingle_set = shingles(row["title"], row["description"])
+            if not shingle_set:
+                continue
+            buckets = band_buckets(signature(shingle_set))
+            shared = collections.Counter(
+                leader for bucket in buckets for leader in leaders_in.get(bucket, ())
+            )
+            leader = best_leader(
+                shingle_set, ((l, leader_shingles[l]) for l, _ in shared.most_common(SIMILARITY_MAX_CANDIDATES))
+            )
+            if leader is None:
+                leader = row["id"]
+                leader_shingles[leader] = shingle_set
+                for bucket in buckets:
+                    leaders_in.setdefault(bucket, []).append(leader)
+            lsh_rows.extend((bucket, row["id"]) for bucket in set(buckets))
+            cluster_rows.append((row["id"], leader))
+        conn.executemany("INSERT INTO ticket_lsh (bucket, ticket_id) VALUES (?, ?)", lsh_rows)
+        conn.executemany("INSERT INTO ticket_clusters (ticket_id, leader_id) VALUES (?, ?)", cluster_rows)
+        count += len(rows)
+        if echo:
+            echo(f"Indexed {count} open tickets.")
+    return count
+
+
+def rebuild_similarity_index(echo=None):
+    conn = get_db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        count = index_open_tickets(conn, echo=echo)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    bump_data_version()
+    return count
+
+
+def similar_open_tickets(title, description, exclude=None, limit=SUGGESTION_LIMIT, threshold=SIMILARITY_THRESHOLD):
+    """Open tickets that look like the same issue, most similar first.
+
+    Candidates come from the LSH buckets the text falls into, so the cost
+    depends on the size of those buckets rather than on the number of open
+    tickets; their exact Jaccard similarity is then checked.
+    """
+    shingle_set = shingles(title, description)
+    if not shingle_set:
+        return []
+    buckets = band_buckets(signature(shingle_set))
+    rows = get_db().execute(
+        SQL_CANDIDATES.format(placeholders=",".join("?" * len(buckets))),
+        (*buckets, SIMILARITY_MAX_CANDIDATES)
+    ).fetchall()
+    matches = []
+    for row in rows:
+        if row["id"] == exclude:
+            continue
+        score = jaccard(shingle_set, shingles(row["title"], row["description"]))
+        if score >= threshold:
+            match = dict(row)
+            del match["hits"], match["description"]
+            match["similarity"] = round(score, 2)
+            matches.append(match)
+    matches.sort(key=lambda m: (-m["similarity"], m["id"]))
+    return matches[:limit]
+
+
+@cached("incident_clusters")
+def incident_clusters(min_size=CLUSTER_MIN_SIZE, limit=CLUSTER_LIMIT):
+    """Groups of open tickets that look like one incident, largest first."""
+    clusters = []
+    for row in get_db().execute(SQL_CLUSTERS, (min_size, limit)):
+        ids = sorted(int(i) for i in row["ids"].split(","))
+        clusters.append({
+            "ids": ids,
+            "size": row["size"],
+            # The leader may have been archived since.
+            "title": row["title"] or f"Ticket #{row['leader_id']}",
+            "category": row["category"],
+            "since": row["since"],
+        })
+    return clusters
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)] if sorted_values else None
+
+
+def benchmark(queries=200, seed=1, brute_force=True):
+    """Time index rebuilds and lookups against DB_PATH, and measure recall.
+
+    Queries are the texts of randomly chosen open tickets. With
+    ``brute_force``, each one is also answered by comparing it with every
+    open ticket, which gives the recall of the index and the cost it saves.
+    """
+    conn = get_db()
+    started = time.perf_counter()
+    indexed = rebuild_similarity_index()
+    rebuild_seconds = time.perf_counter() - started
+    open_tickets = [dict(r) for r in conn.execute("SELECT id, title, description FROM tickets WHERE status != 'closed'")]
+    if not open_tickets:
+        raise ValueError("The benchmark needs open tickets; run `seed` first.")
+    rng = random.Random(seed)
+    sample = [rng.choice(open_tickets) for _ in range(queries)]
+
+    latencies, found = [], []
+    for ticket in sample:
+        start = time.perf_counter()
+        matches = similar_open_tickets(ticket["title"], ticket["description"], exclude=ticket["id"], limit=None)
+        latencies.append(time.perf_counter() - start)
+        found.append({m["id"] for m in matches})
+    latencies.sort()
+    results = {
+        "open_tickets": len(open_tickets),
+        "index_rows": conn.execute("SELECT COUNT(*) FROM ticket_lsh").fetchone()[0],
+        "rebuild": {"seconds": round(rebuild_seconds, 3), "tickets_per_second": round(indexed / rebuild_seconds, 1)},
+        "query": {
+            "count": queries,
+            **{f"p{p}_ms": round(_percentile(latencies, p) * 1000, 3) for p in (50, 95, 99)},
+            "mean_matches": round(sum(len(f) for f in found) / queries, 2),
+        },
+    }
+    if brute_force:
+        all_shingles = [(t["id"], shingles(t["title"], t["description"])) for t in open_tickets]
+        latencies, expected, hits = [], 0, 0
+        for ticket, got in zip(sample, found):
+            start = time.perf_counter()
+            query = shingles(ticket["title"], ticket["description"])
+            truth = {i for i, s in all_shingles if i != ticket["id"] and jaccard(query, s) >= SIMILARITY_THRESHOLD}
+            latencies.append(time.perf_counter() - start)
+            expected += len(truth)
+            hits += len(truth & got)
+        latencies.sort()
+        results["brute_force"] = {
+            **{f"p{p}_ms": round(_percentile(latencies, p) * 1000, 3) for p in (50, 95, 99)},
+            "recall": round(hits / expected, 3) if expected else None,
+        }
+    started = time.perf_counter()
+    clusters = incident_clusters.uncached()
+    results["clusters"] = {"count": len(clusters), "seconds": round(time.perf_counter() - started, 3),
+                           "largest": clusters[0]["size"] if clusters else 0}
+    return results
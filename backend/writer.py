@@ -0,0 +1,195 @@
+import concurrent.futures
+import os
+import queue
+import sqlite3
+import threading
+import time
+from backend.database import connect, get_db
+from backend.metrics import write_batch_size, write_rejections
+
+# Request writes go through one writer thread per process, which commits
+# whatever arrived within WRITE_BATCH_WINDOW_MS as one transaction. With
+# WRITER_ENABLED=0 each write runs in its own transaction on the caller's
+# connection instead.
+WRITER_ENABLED = os.getenv("WRITER_ENABLED", "1") == "1"
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "256"))
+WRITE_BATCH_WINDOW_MS = float(os.getenv("WRITE_BATCH_WINDOW_MS", "2"))
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "64"))
+# How long a caller waits for room in the queue, and then for its write.
+WRITE_ENQUEUE_TIMEOUT = float(os.getenv("WRITE_ENQUEUE_TIMEOUT", "1"))
+WRITE_TIMEOUT = float(os.getenv("WRITE_TIMEOUT", "15"))
+
+
+class WriterBusy(Exception):
+    pass
+
+
+# Functions called with no arguments after a write rolls back, for modules
+# that keep in-memory state in step with what their writes changed.
+_rollback_hooks = []
+
+
+def on_rollback(hook):
+    _rollback_hooks.append(hook)
+    return hook
+
+
+def _rolled_back():
+    for hook in _rollback_hooks:
+        hook()
+
+
+def _is_locked(error):
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+class _Job:
+    __slots__ = ("fn", "args", "future")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = concurrent.futures.Future()
+
+
+class Writer:
+    """A single writer thread with its own connection and a bounded queue.
+
+    Each write runs inside its own SAVEPOINT of the shared transaction, so a
+    write that raises is rolled back alone and its caller gets the error,
+    while the rest of the batch commits. Futures resolve only after the
+    commit, so a result means the write is durable.
+    """
+
+    def __init__(self, path=None, queue_size=WRITE_QUEUE_SIZE, window=WRITE_BATCH_WINDOW_MS / 1000,
+                 batch_max=WRITE_BATCH_MAX):
+        self.path = path
+        self.window = window
+        self.batch_max = batch_max
+        self.pid = os.getpid()
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, timeout=WRITE_ENQUEUE_TIMEOUT):
+        """Queue ``fn(conn, *args)`` and return a Future for its result.
+
+        ``fn`` must not commit. When the queue stays full for ``timeout``
+        seconds, WriterBusy is raised and nothing is written.
+        """
+        job = _Job(fn, args)
+        try:
+            self._queue.put(job, timeout=timeout)
+        except queue.Full:
+            write_rejections.inc("queue_full")
+            raise WriterBusy("Too many writes queued.")
+        return job.future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            # Writes whose caller already gave up are dropped here.
+            jobs = [job for job in self._next_batch() if job.future.set_running_or_notify_cancel()]
+            if jobs:
+                self._commit(conn, jobs)
+
+    def _commit(self, conn, jobs):
+        try:
+            # Waits up to DB_BUSY_TIMEOUT_MS for writers in other processes.
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if _is_locked(e):
+                write_rejections.inc("locked")
+                e = WriterBusy(f"Database is locked: {e}")
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+        outcomes = []
+        try:
+            for job in jobs:
+                conn.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((job, job.fn(conn, *job.args), None))
+                    conn.execute("RELEASE write")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    _rolled_back()
+                    outcomes.append((job, None, e))
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            _rolled_back()
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+        write_batch_size.observe(len(jobs))
+        for job, result, error in outcomes:
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    # A forked worker starts its own writer thread and connection.
+    if _writer is None or _writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = Writer()
+    return _writer
+
+
+def _write_inline(fn, args):
+    conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError as e:
+        if _is_locked(e):
+            write_rejections.inc("locked")
+            raise WriterBusy(f"Database is locked: {e}")
+        raise
+    try:
+        result = fn(conn, *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        _rolled_back()
+        raise
+    return result
+
+
+def write(fn, *args, timeout=WRITE_TIMEOUT):
+    """Run ``fn(conn, *args)`` in a committed transaction and return its result.
+
+    A write still queued after ``timeout`` seconds is withdrawn and
+    WriterBusy is raised; one that has started is waited for.
+    """
+    if not WRITER_ENABLED:
+        return _write_inline(fn, args)
+    future = get_writer().submit(fn, *args)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        if future.cancel():
+            write_rejections.inc("timeout")
+            raise WriterBusy("The write was not started in time.")
+        return future.result()
@@ -1,8 +1,286 @@
-function filterTickets() {
-  let input = document.getElementById("search").value.toLowerCase();
-  let tickets = document.getElementsByClassName("ticket");
-  for (let i = 0; i < tickets.length; i++) {
-    let text = tickets[i].innerText.toLowerCase();
-    tickets[i].style.display = text.includes(input) ? "" : "none";
+let searchTimer = null;
+
+function searchTickets() {
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(runSearch, 250);
+}
+
+function runSearch() {
+  let form = document.getElementById("search-form");
+  let results = document.getElementById("search-results");
+  let query = document.getElementById("search").value.trim();
+  if (!query) {
+    results.innerHTML = "";
+    results.hidden = true;
+    return;
+  }
+  let params = new URLSearchParams(new FormData(form));
+  fetch(form.dataset.url + "?" + params.toString(), { credentials: "same-origin" })
+    .then(function (response) {
+      if (!response.ok) throw new Error(response.statusText);
+      return response.json();
+    })
+    .then(function (data) {
+      results.innerHTML = "";
+      results.hidden = false;
+      let summary = document.createElement("p");
+      summary.textContent = data.total + (data.total === 1 ? " matching ticket" : " matching tickets");
+      results.appendChild(summary);
+      data.results.forEach(function (t) {
+        let card = document.createElement("div");
+        card.className = "ticket-card search-result";
+        let title = document.createElement("b");
+        title.textContent = t.title;
+        let meta = document.createElement("div");
+        meta.textContent = t.category + " | " + t.status + " | " + t.username + " | " + t.created_at;
+        let snippet = document.createElement("div");
+        // Snippets are HTML-escaped on the server; only <mark> is added.
+        snippet.innerHTML = t.snippet;
+        card.append(title, meta, snippet);
+        results.appendChild(card);
+      });
+    });
+}
+
+let similarTimer = null;
+
+function suggestSimilar(form) {
+  clearTimeout(similarTimer);
+  similarTimer = setTimeout(function () {
+    let box = document.getElementById("similar-tickets");
+    let params = new URLSearchParams({ title: form.title.value, description: form.description.value });
+    fetch(box.dataset.url + "?" + params.toString(), { credentials: "same-origin" })
+      .then(function (response) {
+        if (!response.ok) throw new Error(response.statusText);
+        return response.json();
+      })
+      .then(function (data) {
+        let others = data.others || 0;
+        box.innerHTML = "";
+        box.hidden = data.results.length === 0 && others === 0;
+        if (box.hidden) return;
+        if (data.results.length) {
+          let summary = document.createElement("p");
+          summary.textContent = "Already reported? These open tickets look similar:";
+          box.appendChild(summary);
+          let list = document.createElement("ul");
+          data.results.forEach(function (t) {
+            let item = document.createElement("li");
+            item.textContent = t.title + " (" + t.category + ", " + t.status + ", since " + t.created_at + ")";
+            list.appendChild(item);
+          });
+          box.appendChild(list);
+        }
+        if (others) {
+          let note = document.createElement("p");
+          note.textContent = others + " open tickets from other users look like the same issue; technicians will handle them together.";
+          box.appendChild(note);
+        }
+      });
+  }, 400);
+}
+
+function loadComments(button, ticketId) {
+  button.disabled = true;
+  fetch(button.dataset.url, { credentials: "same-origin" })
+    .then(function (response) {
+      if (!response.ok) throw new Error(response.statusText);
+      return response.json();
+    })
+    .then(function (comments) {
+      let list = document.getElementById("comments-" + ticketId);
+      list.innerHTML = "";
+      comments.forEach(function (c) {
+        let item = document.createElement("li");
+        item.textContent = c.technician + ": " + c.comment + " (" + c.created_at + ")";
+        list.appendChild(item);
+      });
+      button.remove();
+    })
+    .catch(function () {
+      button.disabled = false;
+    });
+}
+
+function startLiveUpdates() {
+  let grid = document.getElementById("ticket-grid");
+  if (!grid || !window.EventSource || !window.fetch) return;
+
+  document.addEventListener("submit", submitAsync);
+  let bulkForm = document.getElementById("bulk-form");
+  if (bulkForm) bulkForm.addEventListener("submit", submitBulk);
+
+  let source = new EventSource(grid.dataset.eventsUrl);
+  source.addEventListener("ticket-created", function (e) {
+    let ticket = JSON.parse(e.data);
+    if (canInsert(grid, ticket.assignee)) insertTicketCard(grid, ticket.id);
+  });
+  source.addEventListener("ticket-assigned", function (e) {
+    moveTicketCard(grid, JSON.parse(e.data));
+  });
+  source.addEventListener("ticket-escalated", function (e) {
+    markEscalated(JSON.parse(e.data));
+  });
+  source.addEventListener("status-changed", function (e) {
+    patchTicketStatus(JSON.parse(e.data));
+  });
+  source.addEventListener("comment-added", function (e) {
+    appendTicketComment(JSON.parse(e.data));
+  });
+  source.addEventListener("resync", function () {
+    window.location.reload();
+  });
+}
+
+function submitAsync(event) {
+  let form = event.target;
+  if (!form.classList.contains("async-action")) return;
+  event.preventDefault();
+  let button = form.querySelector("button[type=submit]");
+  if (button) button.disabled = true;
+  fetch(form.action, {
+    method: "POST",
+    body: new FormData(form),
+    credentials: "same-origin",
+    headers: { Accept: "application/json" }
+  })
+    .then(function (response) {
+      if (!response.ok) throw new Error(response.statusText);
+      // The card itself is patched by the event stream, for every technician.
+      let textarea = form.querySelector("textarea");
+      if (textarea) textarea.value = "";
+    })
+    .catch(function () {
+      form.submit();
+    })
+    .finally(function () {
+      if (button) button.disabled = false;
+    });
+}
+
+function selectAllTickets(toggle) {
+  document.querySelectorAll(".bulk-select").forEach(function (box) {
+    box.checked = toggle.checked;
+  });
+}
+
+function selectTickets(ids) {
+  ids.forEach(function (id) {
+    let box = document.querySelector(".bulk-select[value='" + id + "']");
+    if (box) box.checked = true;
+  });
+  document.getElementById("bulk-form").scrollIntoView();
+}
+
+function submitBulk(event) {
+  let form = event.target;
+  event.preventDefault();
+  let button = form.querySelector("button[type=submit]");
+  let results = document.getElementById("bulk-results");
+  button.disabled = true;
+  fetch(form.action, {
+    method: "POST",
+    body: new FormData(form),
+    credentials: "same-origin",
+    headers: { Accept: "application/json" }
+  })
+    .then(function (response) {
+      return response.json().then(function (data) {
+        if (!response.ok) throw new Error(data.error || response.statusText);
+        return data;
+      });
+    })
+    .then(function (data) {
+      // Cards are patched by the event stream; clear what was applied.
+      data.results.forEach(function (r) {
+        let box = document.querySelector(".bulk-select[value='" + r.id + "']");
+        if (box && r.ok) box.checked = false;
+      });
+      form.querySelector("textarea").value = "";
+      document.getElementById("bulk-select-all").checked = false;
+      let failures = data.results.filter(function (r) { return !r.ok; });
+      results.textContent = data.updated + " updated, " + data.failed + " failed" +
+        failures.map(function (r) { return "\n#" + r.id + ": " + r.error; }).join("");
+      results.hidden = false;
+    })
+    .catch(function (error) {
+      results.textContent = error.message;
+      results.hidden = false;
+    })
+    .finally(function () {
+      button.disabled = false;
+    });
+}
+
+function belongsInView(grid, assignee) {
+  if (grid.dataset.view === "mine") return assignee === grid.dataset.username;
+  if (grid.dataset.view === "unassigned") return !assignee;
+  return true;
+}
+
+function canInsert(grid, assignee) {
+  // Filtered, re-sorted and later pages are left alone until reloaded.
+  return grid.dataset.liveInsert === "1" && belongsInView(grid, assignee);
+}
+
+function moveTicketCard(grid, ticket) {
+  let card = document.getElementById("ticket-" + ticket.id);
+  if (!belongsInView(grid, ticket.assignee)) {
+    if (card) card.remove();
+    return;
   }
+  if (!card) {
+    if (canInsert(grid, ticket.assignee)) insertTicketCard(grid, ticket.id);
+    return;
+  }
+  card.dataset.assignee = ticket.assignee || "";
+  card.querySelector(".ticket-assignee").textContent = ticket.assignee || "Unassigned";
+}
+
+function markEscalated(ticket) {
+  let card = document.getElementById("ticket-" + ticket.id);
+  if (!card) {
+    // An escalated ticket may just have been assigned from the backlog.
+    let grid = document.getElementById("ticket-grid");
+    if (canInsert(grid, ticket.assignee)) insertTicketCard(grid, ticket.id);
+    return;
+  }
+  card.classList.add("escalated");
+  card.querySelector(".ticket-escalated").hidden = false;
+  if (ticket.assignee) moveTicketCard(document.getElementById("ticket-grid"), ticket);
+}
+
+function insertTicketCard(grid, ticketId) {
+  if (document.getElementById("ticket-" + ticketId)) return;
+  let url = grid.dataset.cardUrl.replace("/0/", "/" + ticketId + "/");
+  fetch(url, { credentials: "same-origin" })
+    .then(function (response) {
+      if (!response.ok) throw new Error(response.statusText);
+      return response.text();
+    })
+    .then(function (html) {
+      if (!document.getElementById("ticket-" + ticketId)) {
+        grid.insertAdjacentHTML("afterbegin", html);
+      }
+    });
+}
+
+function patchTicketStatus(ticket) {
+  let card = document.getElementById("ticket-" + ticket.id);
+  if (!card) return;
+  let badge = card.querySelector(".ticket-status");
+  badge.textContent = ticket.status;
+  badge.className = "ticket-status " + ticket.status.toLowerCase();
+  let select = card.querySelector("select[name=status]");
+  if (select) select.value = ticket.status;
+}
+
+function appendTicketComment(comment) {
+  let list = document.getElementById("comments-" + comment.ticket_id);
+  if (!list) return;
+  let placeholder = list.querySelector(".no-comments");
+  if (placeholder) placeholder.remove();
+  let item = document.createElement("li");
+  item.textContent = comment.technician + ": " + comment.comment + " (" + comment.created_at + ")";
+  list.appendChild(item);
 }
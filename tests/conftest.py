@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+# Configuration is read when the backend modules are imported, so point
+# everything at scratch files before the first import.
+_scratch = tempfile.mkdtemp(prefix="smartcampus-tests-")
+os.environ["DB_PATH"] = os.path.join(_scratch, "tickets.db")
+os.environ["ATTACHMENT_DIR"] = os.path.join(_scratch, "attachments")
+os.environ["ASSET_DIR"] = os.path.join(_scratch, "dist")
+os.environ["JINJA_CACHE_DIR"] = os.path.join(_scratch, "jinja-cache")
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+
+import pytest
+
+from backend import database, events, scheduler, writer
+from backend.migrations import ensure_schema
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A freshly migrated database, with the pool, writer, scheduler and
+    event broker of the previous test forgotten."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "tickets.db"))
+    monkeypatch.setattr(database, "ARCHIVE_DB_PATH", str(tmp_path / "tickets-archive.db"))
+    monkeypatch.setattr(database, "_pool", None)
+    monkeypatch.setattr(writer, "_writer", None)
+    monkeypatch.setattr(scheduler, "_scheduler", None)
+    monkeypatch.setattr(events, "_broker", None)
+    ensure_schema()
+    yield database
+    database.release_db()
+    database.get_pool().close_all()
+
+
+@pytest.fixture
+def client(db):
+    from backend.app import app, create_app
+    create_app(preload=False)
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def login(client, username, role):
+    with client.session_transaction() as session:
+        session["user"] = {"username": username, "role": role}
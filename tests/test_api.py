@@ -0,0 +1,74 @@
+import base64
+import json
+
+import pytest
+
+from backend import api as api_module
+
+from backend.models import create_comment, create_ticket, create_user
+from conftest import login
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.fixture
+def api(client):
+    for n in range(5):
+        create_ticket("alice", f"Ticket {n}", "IT", "Details", "alice@example.com", "555-0100")
+    login(client, "alice", "student")
+    return client
+
+
+def test_tickets_page_through_cursors(api):
+    seen, url = [], "/api/v1/tickets?limit=2&fields=title"
+    while url:
+        body = api.get(url).get_json()
+        seen += [t["title"] for t in body["data"]]
+        url = body["next_cursor"] and f"/api/v1/tickets?limit=2&fields=title&cursor={body['next_cursor']}"
+    assert seen == [f"Ticket {n}" for n in reversed(range(5))]
+
+    back = api.get(f"/api/v1/tickets?limit=2&fields=title&cursor={body['prev_cursor']}").get_json()
+    assert [t["title"] for t in back["data"]] == ["Ticket 2", "Ticket 1"]
+
+
+@pytest.mark.parametrize("value", ["not-a-cursor", cursor([1]), cursor([{"a": 1}, 1]), cursor(["after", [{"a": 1}, 1]]),
+                                   cursor(["after", [None, 1]]), cursor(["sideways", ["2024-01-01", 1]]),
+                                   cursor(["after", [True, 1]]), "NQ", "bnVsbA"])
+def test_malformed_cursor_is_rejected(api, value):
+    response = api.get(f"/api/v1/tickets?cursor={value}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor."}
+
+
+def test_comments_and_users_pages(api):
+    for n in range(3):
+        create_comment(1, "bob", f"Note {n}")
+        create_user(f"tech{n}", "Secret1!", "technician")
+    body = api.get("/api/v1/tickets/1/comments?limit=2&fields=comment").get_json()
+    more = api.get(f"/api/v1/tickets/1/comments?limit=2&fields=comment&cursor={body['next_cursor']}").get_json()
+    assert [c["comment"] for c in body["data"] + more["data"]] == ["Note 0", "Note 1", "Note 2"]
+    assert api.get("/api/v1/users").status_code == 403
+
+    login(api, "bob", "technician")
+    users = api.get("/api/v1/users?role=technician&limit=2").get_json()
+    assert [u["username"] for u in users["data"]] == ["tech0", "tech1"] and users["next_cursor"]
+
+
+@pytest.mark.parametrize("url", ["/technician?view=all&cursor=NQ", "/technician?cursor=bnVsbA", "/users?cursor=bnVsbA",
+                                 "/users?cursor=NQ"])
+def test_dashboards_reject_scalar_cursors(client, url):
+    login(client, "bob", "technician")
+    assert client.get(url).status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/api/v1/tickets/1", "/api/v1/tickets/1/comments"])
+def test_etag_does_not_bypass_access_check(api, monkeypatch, path):
+    etag = api.get(path).headers["ETag"].strip('"')
+    assert api.get(path, headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+    # ETags can be computed from public inputs, so a match must not skip the check.
+    monkeypatch.setattr(api_module, "etag_for", lambda *tables: etag)
+    login(api, "mallory", "student")
+    assert api.get(path, headers={"If-None-Match": f'"{etag}"'}).status_code == 403
+    assert api.get(path.replace("/1", "/999"), headers={"If-None-Match": f'"{etag}"'}).status_code == 404
@@ -0,0 +1,87 @@
+import pytest
+
+from backend.archive import archive_batch, archive_closed, archive_stats, ensure_archive_schema
+from backend.database import get_db
+from backend.models import (create_comment, create_ticket, get_comments, get_ticket_by_id, get_ticket_page,
+                            get_tickets, update_ticket_status)
+from backend.reporting import rebuild_rollups, time_to_close_percentiles, weekly_counts
+from backend.search import search_tickets
+
+
+@pytest.fixture
+def closed(db):
+    """Two tickets closed a year ago, one closed today and one open."""
+    ids = [create_ticket("alice", f"Broken radiator {n}", "Facilities", "Room is cold", "alice@example.com",
+                         "555-0100") for n in range(4)]
+    for ticket_id in ids[:3]:
+        create_comment(ticket_id, "bob", "Replaced the valve")
+        update_ticket_status(ticket_id, "closed", notify=False)
+    conn = get_db()
+    conn.execute(f"UPDATE tickets SET closed_at = datetime('now', '-365 days') WHERE id IN ({ids[0]}, {ids[1]})")
+    conn.commit()
+    return ids
+
+
+def test_archived_tickets_are_read_through_include_archived(closed):
+    old, _, recent, open_ticket = closed
+    assert archive_closed(older_than_days=180) == 2
+    assert archive_stats() == {"hot_tickets": 2, "archived_tickets": 2, "archived_comments": 2}
+
+    assert get_ticket_by_id(old) is None
+    archived = get_ticket_by_id(old, include_archived=True)
+    assert archived["title"] == "Broken radiator 0" and archived["status"] == "closed"
+    assert archived["assignee"] == get_db().execute(
+        "SELECT assignee FROM archive.tickets WHERE id = ?", (old,)).fetchone()[0]
+    assert get_comments(old) == []
+    assert [c["comment"] for c in get_comments(old, include_archived=True)] == ["Replaced the valve"]
+
+    assert {t["id"] for t in get_tickets("alice")} == {recent, open_ticket}
+    everything = get_tickets("alice", include_archived=True)
+    assert {t["id"] for t in everything} == set(closed)
+    assert [c["comment"] for c in next(t for t in everything if t["id"] == old)["comments"]] == ["Replaced the valve"]
+
+    page = get_ticket_page({"status": "closed"}, "oldest", include_archived=True)
+    assert [t["id"] for t in page["rows"]] == closed[:3]
+    results, total = search_tickets("radiator", include_archived=True)
+    assert total == 4 and {r["id"] for r in results} == set(closed)
+    assert search_tickets("radiator")[1] == 2
+
+
+def test_archiving_again_after_a_partial_copy(closed):
+    old = closed[0]
+    conn = get_db()
+    conn.execute(f"INSERT INTO archive.tickets (id, title) VALUES ({old}, 'stale copy')")
+    conn.commit()
+    archive_batch(conn, [old])
+    assert get_ticket_by_id(old) is None
+    assert get_ticket_by_id(old, include_archived=True)["title"] == "Broken radiator 0"
+    assert archive_closed(older_than_days=180) == 1
+
+
+def test_rebuilt_rollups_still_count_archived_tickets(closed):
+    before = weekly_counts(), time_to_close_percentiles()
+    assert sum(week["count"] for week in before[0]) == 4
+    archive_closed(older_than_days=180)
+    rebuild_rollups()
+    assert (weekly_counts(), time_to_close_percentiles()) == before
+
+
+def test_archive_from_before_deadlines_is_backfilled_and_pages_by_due(closed):
+    conn = get_db()
+    conn.execute("DROP TABLE archive.tickets")
+    conn.execute("CREATE TABLE archive.tickets (id INTEGER PRIMARY KEY, username TEXT, title TEXT, category TEXT, "
+                 "description TEXT, email TEXT, phone TEXT, attachment TEXT, status TEXT, created_at TIMESTAMP, "
+                 "closed_at TIMESTAMP, attachment_id INTEGER, archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO archive.tickets (id, title, category, status, created_at) "
+                 "VALUES (1000, 'Old', 'IT', 'closed', '2020-01-01 00:00:00'), (1001, 'Older', 'IT', 'closed', NULL)")
+    ensure_archive_schema(conn)
+    assert conn.execute("SELECT COUNT(*) FROM archive.tickets WHERE due_at IS NULL").fetchone()[0] == 0
+
+    pages, cursor = [], None
+    while True:
+        page = get_ticket_page({}, "due", cursor, 2, include_archived=True)
+        pages += [t["id"] for t in page["rows"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert pages[0] == 1000 and sorted(pages) == sorted(closed + [1000, 1001])
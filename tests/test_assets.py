@@ -0,0 +1,74 @@
+import gzip
+import os
+
+from backend import assets
+
+
+def build(monkeypatch, tmp_path):
+    monkeypatch.setattr(assets, "ASSET_DIR", str(tmp_path / "dist"))
+    monkeypatch.setattr(assets, "ASSET_MANIFEST", str(tmp_path / "dist" / "manifest.json"))
+    messages = []
+    manifest = assets.build_assets(echo=messages.append)
+    monkeypatch.setattr(assets, "_manifest", manifest)
+    return manifest, messages
+
+
+def css_asset(manifest):
+    return next(path for path in manifest if path.endswith(".css"))
+
+
+def test_hashed_assets_are_served_precompressed(client, monkeypatch, tmp_path):
+    manifest, _ = build(monkeypatch, tmp_path)
+    path = css_asset(manifest)
+    with client.application.test_request_context():
+        url = assets.asset_url(path)
+    assert url == f"/assets/{manifest[path]}" and url != f"/assets/{path}"
+    with open(os.path.join(assets.STATIC_DIR, path), "rb") as f:
+        source = f.read()
+
+    plain = client.get(url)
+    assert plain.status_code == 200 and plain.data == source
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Cache-Control"] == assets.ASSET_CACHE_CONTROL
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzipped.data) == source
+
+    # brotli may not be installed here; the server only looks for the file.
+    with open(tmp_path / "dist" / (manifest[path] + ".br"), "wb") as f:
+        f.write(b"brotli bytes")
+    brotli = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert brotli.headers["Content-Encoding"] == "br" and brotli.data == b"brotli bytes"
+    assert brotli.headers["Cache-Control"] == assets.ASSET_CACHE_CONTROL
+
+
+def test_build_warns_about_files_left_on_the_cdn(monkeypatch, tmp_path):
+    monkeypatch.setattr(assets, "STATIC_DIR", str(tmp_path / "static"))
+    os.makedirs(tmp_path / "static" / "css")
+    (tmp_path / "static" / "css" / "site.css").write_text("body { color: black; }\n" * 20)
+    manifest, messages = build(monkeypatch, tmp_path)
+    assert list(manifest) == ["css/site.css"]
+    assert assets.missing_vendored() == ["vendor/chart.umd.min.js"]
+    assert any(m.startswith("Warning: vendor/chart.umd.min.js is not vendored") and assets.CHART_JS_URL in m
+               for m in messages)
+
+    os.makedirs(tmp_path / "static" / "vendor")
+    (tmp_path / "static" / "vendor" / "chart.umd.min.js").write_text("/* chart */")
+    _, messages = build(monkeypatch, tmp_path)
+    assert assets.missing_vendored() == []
+    assert not any(m.startswith("Warning:") for m in messages)
+
+
+def test_template_cache_dir_is_made_by_create_app(db, monkeypatch, tmp_path):
+    from backend import app as app_module
+    cache_dir = tmp_path / "jinja-cache"
+    monkeypatch.setattr(assets, "JINJA_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(app_module, "_created", False)
+    monkeypatch.setattr(app_module.app.jinja_env, "bytecode_cache", None)
+    assets.init_app(app_module.app)
+    assert not cache_dir.exists()
+
+    app_module.create_app(preload=True)
+    assert cache_dir.is_dir() and os.listdir(cache_dir)
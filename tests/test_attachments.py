@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from backend.app import app
+from backend.attachments import MAX_ATTACHMENT_BYTES
+from backend.database import get_db
+from backend.models import create_user
+from conftest import login
+
+CONTENT = b"%PDF-1.4 0123456789abcdef"
+
+
+@pytest.fixture
+def attachment(client):
+    create_user("alice", "Secret1!", "student")
+    login(client, "alice", "student")
+    client.post("/ticket/new", data={
+        "title": "Projector broken", "category": "IT", "description": "No signal in room 4",
+        "email": "alice@example.com", "phone": "555-0100",
+        "attachment": (io.BytesIO(CONTENT), "photo.pdf"),
+    }, content_type="multipart/form-data")
+    ticket_id = get_db().execute("SELECT id FROM tickets").fetchone()[0]
+    return f"/ticket/{ticket_id}/attachment"
+
+
+def test_range_request_gets_partial_content(client, attachment):
+    response = client.get(attachment, headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.data == CONTENT[2:6]
+    assert response.headers["Content-Range"] == f"bytes 2-5/{len(CONTENT)}"
+
+
+def test_matching_etag_gets_not_modified(client, attachment):
+    etag = client.get(attachment).headers["ETag"]
+    response = client.get(attachment, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.data == b""
+
+
+def test_unsatisfiable_range_gets_416(client, attachment):
+    response = client.get(attachment, headers={"Range": f"bytes={len(CONTENT) + 10}-{len(CONTENT) + 20}"})
+    assert response.status_code == 416
+
+
+def test_other_students_cannot_download(client, attachment):
+    login(client, "mallory", "student")
+    assert client.get(attachment).status_code == 403
+
+
+@pytest.fixture
+def small_uploads(monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1024)
+
+
+def test_too_large_upload_sends_a_student_back_to_their_dashboard(client, small_uploads):
+    login(client, "alice", "student")
+    response = client.post("/ticket/new", data={
+        "title": "Big", "category": "IT", "description": "x", "email": "a@example.com", "phone": "1",
+        "attachment": (io.BytesIO(b"x" * 4096), "big.pdf"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 302 and response.headers["Location"].endswith("/student")
+
+
+def test_too_large_request_sends_a_technician_back_to_theirs(client, small_uploads):
+    login(client, "bob", "technician")
+    response = client.post("/tickets/bulk", data={"comment": "x" * 4096})
+    assert response.status_code == 302 and response.headers["Location"].endswith("/technician")
+
+
+def test_too_large_request_answers_json_callers_with_413(client, small_uploads):
+    login(client, "bob", "technician")
+    response = client.post("/tickets/bulk", data={"comment": "x" * 4096}, headers={"Accept": "application/json"})
+    assert response.status_code == 413
+    assert response.get_json() == {"error": f"Attachments are limited to {MAX_ATTACHMENT_BYTES // (1024 * 1024)} MB."}
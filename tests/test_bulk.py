@@ -0,0 +1,77 @@
+import csv
+import json
+
+import pytest
+
+from backend.bulk import BulkImportError, export_file, import_file
+from backend.database import get_db
+from backend.models import get_user_by_username
+from backend.passwords import check_password
+
+
+def jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def tickets(count):
+    return [{"id": n, "username": "alice", "title": f"Ticket {n}", "category": "IT", "status": "open"}
+            for n in range(1, count + 1)]
+
+
+def test_import_then_export_round_trips(db, tmp_path):
+    source = jsonl(tmp_path / "tickets.jsonl", tickets(5))
+    assert import_file("tickets", source, batch_size=2)["rows"] == 5
+
+    output = str(tmp_path / "tickets.csv")
+    assert export_file("tickets", output) == 5
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["id"], r["title"], r["status"]) for r in rows] == [(str(n), f"Ticket {n}", "open") for n in range(1, 6)]
+
+
+def test_interrupted_import_resumes_after_its_checkpoint(db, tmp_path):
+    source = jsonl(tmp_path / "tickets.jsonl", tickets(7))
+    messages = []
+
+    def interrupt(message):
+        messages.append(message)
+        if len(messages) == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        import_file("tickets", source, batch_size=2, echo=interrupt)
+    assert json.load(open(source + ".checkpoint"))["line"] == 4
+
+    result = import_file("tickets", source, batch_size=2)
+    assert (result["rows"], result["resumed_after_line"]) == (3, 4)
+    assert get_db().execute("SELECT COUNT(*) FROM tickets").fetchone()[0] == 7
+
+
+@pytest.mark.parametrize("mode, role", [("update", "technician"), ("skip", "student")])
+def test_conflicting_users_are_updated_or_skipped(db, tmp_path, mode, role):
+    import_file("users", jsonl(tmp_path / "first.jsonl", [{"username": "alice", "password": "Secret1!", "role": "student"}]))
+    again = jsonl(tmp_path / "again.jsonl", [{"username": "alice", "password": "Other2!", "role": "technician"},
+                                             {"username": "bob", "password": "Secret1!", "role": "student"}])
+    import_file("users", again, on_conflict=mode)
+    alice = get_user_by_username("alice")
+    assert alice["role"] == role
+    assert check_password(alice["password"], "Other2!" if mode == "update" else "Secret1!")
+    assert get_user_by_username("bob")["role"] == "student"
+
+
+def test_conflicting_user_fails_the_batch(db, tmp_path):
+    import_file("users", jsonl(tmp_path / "first.jsonl", [{"username": "alice", "password": "Secret1!", "role": "student"}]))
+    again = jsonl(tmp_path / "again.jsonl", [{"username": "bob", "password": "Secret1!", "role": "student"},
+                                             {"username": "alice", "password": "Other2!", "role": "student"}])
+    with pytest.raises(BulkImportError, match="line 2"):
+        import_file("users", again, on_conflict="fail")
+    assert get_user_by_username("bob") is None
+
+
+@pytest.mark.parametrize("password", [12345, None, ["Secret1!"]])
+def test_password_that_is_not_a_string_names_its_line(db, tmp_path, password):
+    source = jsonl(tmp_path / "users.jsonl", [{"username": "alice", "password": "Secret1!", "role": "student"},
+                                              {"username": "bob", "password": password, "role": "student"}])
+    with pytest.raises(BulkImportError, match="Line 2"):
+        import_file("users", source)
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from backend import cache
+from backend.models import create_ticket, get_tickets
+
+
+@pytest.fixture
+def caching(db, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "cache", cache.LRUCache())
+    return db
+
+
+def ticket(title):
+    return create_ticket("alice", title, "IT", "Details", "alice@example.com", "555-0100")
+
+
+def titles():
+    return [t["title"] for t in get_tickets("alice")]
+
+
+def insert_from_another_process(db, title):
+    conn = db.connect()
+    conn.execute("INSERT INTO tickets (username, title, category) VALUES ('alice', ?, 'IT')", (title,))
+    conn.commit()
+    conn.close()
+
+
+def test_results_are_copies(caching):
+    ticket("Projector broken")
+    first = get_tickets("alice")
+    first[0]["title"] = "changed"
+    first.append({})
+    assert titles() == ["Projector broken"]
+
+
+def test_write_through_the_models_invalidates(caching):
+    ticket("Projector broken")
+    assert titles() == ["Projector broken"]
+    ticket("Wifi down")
+    assert sorted(titles()) == ["Projector broken", "Wifi down"]
+    assert cache.cache.stats()["hits"] == 0
+
+
+def test_local_backend_sees_other_processes_after_the_ttl(caching, monkeypatch):
+    monkeypatch.setattr(cache, "data_version", cache.LocalVersion())
+    monkeypatch.setattr(cache, "cache", cache.LRUCache(ttl=0.2))
+    ticket("Projector broken")
+    assert titles() == ["Projector broken"]
+    insert_from_another_process(caching, "Wifi down")
+    assert titles() == ["Projector broken"]
+
+    time.sleep(0.25)
+    assert sorted(titles()) == ["Projector broken", "Wifi down"]
+
+
+def test_sqlite_backend_sees_other_processes_at_once(caching, monkeypatch):
+    monkeypatch.setattr(cache, "data_version", cache.SQLiteVersion())
+    ticket("Projector broken")
+    assert titles() == ["Projector broken"]
+    assert titles() == ["Projector broken"] and cache.cache.stats()["hits"] == 1
+    insert_from_another_process(caching, "Wifi down")
+    assert sorted(titles()) == ["Projector broken", "Wifi down"]
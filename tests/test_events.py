@@ -0,0 +1,68 @@
+import json
+import time
+
+import pytest
+
+from backend import events
+from backend.database import get_db
+from backend.events import EventBroker, MemoryBroker, SQLiteBroker
+from backend.models import create_ticket
+from backend.writer import write
+
+
+def test_broker_needs_a_publish():
+    with pytest.raises(TypeError):
+        EventBroker()
+
+
+def wait_for(broker, after, count):
+    seen = []
+    while len(seen) < count:
+        batch, missed = broker.wait(seen[-1][0] if seen else after, timeout=5)
+        assert batch and not missed
+        seen += batch
+    return [(event_type, data) for _, event_type, data in seen]
+
+
+@pytest.mark.parametrize("broker_class", [MemoryBroker, SQLiteBroker])
+def test_subscriber_receives_events_published_after_it(db, broker_class):
+    broker = broker_class()
+    after = broker.subscribe()
+    first, rest = [("ticket-created", {"id": 1})], [("status-changed", {"id": 1}), ("comment-added", {"id": 2})]
+    for batch in (first, rest):
+        conn = get_db()
+        broker.record(conn, batch)
+        conn.commit()
+        broker.publish_many(batch)
+    assert wait_for(broker, after, 3) == first + rest
+
+
+def test_events_commit_with_their_write(db, monkeypatch):
+    monkeypatch.setattr(events, "EVENT_BACKEND", "sqlite")
+    ticket_id = create_ticket("alice", "Wifi down", "IT", "Library", "alice@example.com", "555-0100")
+
+    def fail(conn):
+        events.record_events(conn, [("ticket-created", {"id": 99})])
+        raise RuntimeError("rolled back")
+
+    with pytest.raises(RuntimeError):
+        write(fail)
+    rows = get_db().execute("SELECT type, data FROM events").fetchall()
+    assert [(r["type"], json.loads(r["data"])["id"]) for r in rows] == [("ticket-created", ticket_id)]
+
+
+def test_poller_survives_database_errors(db, monkeypatch, caplog):
+    monkeypatch.setattr(events, "EVENT_POLL_SECONDS", 0.01)
+    broker = SQLiteBroker()
+    after = broker.subscribe()
+    conn = get_db()
+    conn.execute("ALTER TABLE events RENAME TO events_moved")
+    conn.commit()
+    # Let the poller fail on the missing table a few times.
+    time.sleep(0.2)
+    assert "Event poll failed" in caplog.text
+    conn.execute("ALTER TABLE events_moved RENAME TO events")
+    broker.record(conn, [("ticket-created", {"id": 1})])
+    conn.commit()
+    assert wait_for(broker, after, 1) == [("ticket-created", {"id": 1})]
+    assert broker._poller.is_alive()
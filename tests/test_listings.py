@@ -0,0 +1,79 @@
+import pytest
+
+from backend.database import get_db
+from backend.models import TICKET_CATEGORIES, create_user, get_ticket_page, get_user_page
+
+
+@pytest.fixture
+def tickets(db):
+    """23 tickets over 8 timestamps, so pages split runs of equal created_at."""
+    conn = get_db()
+    for n in range(23):
+        conn.execute(
+            "INSERT INTO tickets (username, title, category, description, email, phone, status, created_at) "
+            "VALUES ('alice', ?, ?, 'Details', 'alice@example.com', '555-0100', ?, datetime('2024-03-01', ?))",
+            (f"Ticket {n}", TICKET_CATEGORIES[n % 4], "closed" if n % 5 == 0 else "open", f"+{n // 3} days")
+        )
+    conn.commit()
+    return db
+
+
+def expected(order, where=""):
+    return [r["id"] for r in get_db().execute(f"SELECT id FROM tickets {where} ORDER BY {order}")]
+
+
+def walk(filters, sort, limit=5):
+    """Page forward to the end, then back to the start; returns both id lists."""
+    pages, cursor = [], None
+    while True:
+        page = get_ticket_page(filters, sort, cursor, limit)
+        pages.append([t["id"] for t in page["rows"]])
+        assert all(len(p) == limit for p in pages[:-1])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    forward = [i for p in pages for i in p]
+
+    back, cursor = [], page["prev_cursor"]
+    while cursor:
+        page = get_ticket_page(filters, sort, cursor, limit)
+        back.insert(0, [t["id"] for t in page["rows"]])
+        cursor = page["prev_cursor"]
+    assert back == pages[:-1]
+    return forward
+
+
+def test_newest_pages_forward_and_back(tickets):
+    assert walk({}, "newest") == expected("created_at DESC, id DESC")
+
+
+def test_oldest_with_filters(tickets):
+    assert walk({"category": "IT", "open": True}, "oldest", limit=2) == \
+        expected("created_at, id", "WHERE category = 'IT' AND status != 'closed'")
+
+
+def test_due_order(tickets):
+    assert walk({}, "due", limit=4) == expected("due_at, id")
+
+
+def test_next_page_of_a_back_page_continues_after_it(tickets):
+    first = get_ticket_page({}, "newest", None, 5)
+    second = get_ticket_page({}, "newest", first["next_cursor"], 5)
+    back = get_ticket_page({}, "newest", second["prev_cursor"], 5)
+    assert back["rows"] == first["rows"] and back["prev_cursor"] is None
+    assert get_ticket_page({}, "newest", back["next_cursor"], 5)["rows"] == second["rows"]
+
+
+@pytest.mark.parametrize("sort, cursor", [("nope", None), ("newest", "not-a-cursor"), ("newest", "W3siYSI6MX0sMV0")])
+def test_bad_sort_or_cursor(tickets, sort, cursor):
+    with pytest.raises(ValueError):
+        get_ticket_page({}, sort, cursor)
+
+
+def test_user_pages(db):
+    for n in range(7):
+        create_user(f"user{n}", "Secret1!", "technician" if n % 2 else "student")
+    first = get_user_page({"role": "student"}, "username", limit=3)
+    assert [u["username"] for u in first["rows"]] == ["user0", "user2", "user4"]
+    second = get_user_page({"role": "student"}, "username", first["next_cursor"], limit=3)
+    assert [u["username"] for u in second["rows"]] == ["user6"] and second["next_cursor"] is None
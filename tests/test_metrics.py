@@ -0,0 +1,41 @@
+import pytest
+
+from backend import database
+from backend.metrics import statement_count
+from backend.models import create_user, get_tickets, get_user_page
+
+
+def test_statement_count_follows_instrumented_connections(db, monkeypatch):
+    monkeypatch.setattr(database, "_instrumented", False)
+    create_user("alice", "Secret1!", "student")
+    conn = database.get_db()
+    before = statement_count()
+    conn.execute("SELECT 1").fetchall()
+    assert statement_count() == before
+
+    database.release_db()
+    database.enable_statement_counting()
+    conn = database.get_db()
+    before = statement_count()
+    conn.execute("SELECT 1").fetchall()
+    conn.executemany("UPDATE users SET role = ? WHERE username = ?", [("student", "alice")] * 3)
+    get_user_page({})
+    # Statements run by triggers are not counted.
+    assert statement_count() - before == 3
+
+
+@pytest.mark.parametrize("count", [3, 1200])
+def test_ticket_list_runs_a_fixed_number_of_statements(db, monkeypatch, count):
+    conn = database.get_db()
+    conn.executemany("INSERT INTO tickets (username, title, category) VALUES ('alice', ?, 'IT')",
+                     [(f"Ticket {n}",) for n in range(count)])
+    conn.execute("INSERT INTO comments (ticket_id, technician, comment) SELECT id, 'bob', 'On it' FROM tickets")
+    conn.commit()
+    database.release_db()
+    monkeypatch.setattr(database, "_instrumented", False)
+    database.enable_statement_counting()
+    database.get_db()
+    before = statement_count()
+    tickets = get_tickets()
+    assert statement_count() - before == 2
+    assert len(tickets) == count and all(t["comment_count"] == 1 for t in tickets)
@@ -0,0 +1,38 @@
+import pytest
+from click.testing import CliRunner
+
+from backend import cli
+from backend.database import get_db
+from backend.migrations import FULL_SCAN, explain
+
+
+@pytest.mark.parametrize("detail, table", [("SCAN tickets", "tickets"), ("SCAN archive.tickets", "tickets")])
+def test_full_scans_are_recognised(detail, table):
+    assert FULL_SCAN.match(detail).group(1) == table
+
+
+@pytest.mark.parametrize("detail", ["SCAN tickets USING INDEX idx_tickets_created",
+                                    "SCAN archive.tickets_fts VIRTUAL TABLE INDEX 0:M4", "SEARCH tickets USING INTEGER PRIMARY KEY (rowid=?)"])
+def test_index_reads_are_not_full_scans(detail):
+    assert FULL_SCAN.match(detail) is None
+
+
+def test_unindexed_archive_query_is_a_full_scan(db):
+    plan = explain(get_db(), "SELECT id FROM archive.tickets WHERE phone = ?", ("555-0100",))
+    assert [d for d in plan if FULL_SCAN.match(d)]
+
+
+def test_check_plans_closes_the_live_connection_when_it_fails(db, monkeypatch):
+    opened = []
+
+    def connect():
+        conn = db.connect()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(cli, "connect", connect)
+    monkeypatch.setattr(cli, "check_query_plans", lambda conn: [("slow", ["SCAN tickets"], ["SCAN tickets"])])
+    result = CliRunner().invoke(cli.cli, ["check-plans", "--live"])
+    assert result.exit_code == 1 and "full table scan" in result.output
+    with pytest.raises(Exception, match="closed"):
+        opened[0].execute("SELECT 1")
@@ -0,0 +1,124 @@
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from backend import emailer, outbox
+from backend.database import get_db
+from backend.models import create_ticket, update_ticket_status
+from backend.outbox import drain, enqueue_email, outbox_stats, retry_dead, run_worker
+from backend.emailer import SMTPSession
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no TLS, no auth, one reply line per command."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stand-in ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().rstrip("\r\n")
+            command = line[:4].upper()
+            if not line or command == "QUIT":
+                self.reply("221 bye")
+                return
+            if command == "RCPT":
+                recipient = line.split(":", 1)[1].strip("<> ")
+                if recipient in server.refuse:
+                    self.reply("550 no such user")
+                    continue
+                recipients.append(recipient)
+                self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                data = []
+                while (body := self.rfile.readline().decode()) != ".\r\n":
+                    data.append(body)
+                server.messages.append((recipients, "".join(data)))
+                recipients = []
+                self.reply("250 queued")
+            elif command == "RSET":
+                recipients = []
+                self.reply("250 ok")
+            else:
+                # EHLO, HELO, MAIL, NOOP
+                self.reply("250 ok")
+
+
+@pytest.fixture
+def smtp(db, monkeypatch):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+    server.daemon_threads = True
+    server.messages, server.refuse, server.connections = [], set(), 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(emailer, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(emailer, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(emailer, "SMTP_STARTTLS", False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def queue(*recipients):
+    conn = get_db()
+    for n, to in enumerate(recipients):
+        enqueue_email(conn, to, f"Message {n}", "Hello")
+    conn.commit()
+
+
+def test_ticket_notifications_are_delivered_over_one_connection(smtp):
+    ticket_id = create_ticket("alice", "Wifi down", "IT", "Library", "alice@example.com", "555-0100")
+    update_ticket_status(ticket_id, "in progress")
+    assert outbox_stats() == {"pending": 2}
+
+    messages = []
+    run_worker(once=True, echo=messages.append)
+    assert outbox_stats() == {"sent": 2}
+    assert smtp.connections == 1
+    assert [to for to, _ in smtp.messages] == [["alice@example.com"]] * 2
+    assert "Subject: Ticket Status Updated" in smtp.messages[1][1]
+    assert messages == ["Outbox: 2 sent, 0 to retry, 0 dead-lettered"]
+
+
+def test_refused_message_is_retried_then_dead_lettered(smtp, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+    smtp.refuse.add("gone@example.com")
+    queue("gone@example.com", "alice@example.com")
+
+    with SMTPSession() as session:
+        assert drain(session) == {"sent": 1, "retry": 1, "dead": 0}
+        # Backing off: nothing is due yet.
+        assert drain(session) == {"sent": 0, "retry": 0, "dead": 0}
+        conn = get_db()
+        conn.execute("UPDATE outbox SET next_attempt_at = datetime('now') WHERE status = 'pending'")
+        conn.commit()
+        assert drain(session) == {"sent": 0, "retry": 0, "dead": 1}
+    row = get_db().execute("SELECT attempts, last_error FROM outbox WHERE status = 'dead'").fetchone()
+    assert row["attempts"] == 2 and "SMTPRecipientsRefused" in row["last_error"]
+    assert [to for to, _ in smtp.messages] == [["alice@example.com"]]
+
+    smtp.refuse.clear()
+    assert retry_dead() == 1
+    with SMTPSession() as session:
+        assert drain(session) == {"sent": 1, "retry": 0, "dead": 0}
+    assert outbox_stats() == {"sent": 2}
+
+
+def test_unreachable_server_leaves_messages_pending(smtp, monkeypatch):
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    monkeypatch.setattr(emailer, "SMTP_PORT", port)
+    queue("alice@example.com")
+
+    with SMTPSession() as session:
+        assert drain(session) == {"sent": 0, "retry": 1, "dead": 0}
+    row = get_db().execute("SELECT status, attempts, next_attempt_at > datetime('now') AS later FROM outbox").fetchone()
+    assert (row["status"], row["attempts"], row["later"]) == ("pending", 1, 1)
@@ -0,0 +1,97 @@
+from backend.archive import archive_batch
+from backend.database import connect, get_db
+from backend.migrations import migrate
+from backend.models import create_ticket, create_user, reassign_ticket, set_technician_availability, update_ticket_status
+from backend.reporting import CLOSE_TIME_BUCKETS, rebuild_rollups, weekly_counts_by
+
+
+def totals(series):
+    return {key: sum(week["count"] for week in weeks) for key, weeks in series.items()}
+
+
+def rollup():
+    return get_db().execute("SELECT * FROM ticket_rollup WHERE count != 0 ORDER BY 1, 2, 3, 4").fetchall()
+
+
+def test_weekly_counts_by_assignee_follow_reassignment(db):
+    for username in ("bob", "dave"):
+        create_user(username, "Secret1!", "technician")
+    ids = [create_ticket("alice", "Printer jam", "IT", "Floor 2", "alice@example.com", "555-0100") for _ in range(3)]
+    assert totals(weekly_counts_by("assignee")) == {"bob": 2, "dave": 1}
+
+    reassign_ticket(ids[0], "dave")
+    assert totals(weekly_counts_by("assignee")) == {"bob": 1, "dave": 2}
+    set_technician_availability("dave", False)
+    assert totals(weekly_counts_by("assignee")) == {"bob": 3}
+    set_technician_availability("bob", False)
+    assert totals(weekly_counts_by("assignee")) == {"": 3}
+
+    incremental = [tuple(row) for row in rollup()]
+    rebuild_rollups()
+    assert [tuple(row) for row in rollup()] == incremental
+
+
+def test_upgrade_rebuilds_rollups_by_assignee_with_archived_tickets(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    migrate(conn, target=12)
+    conn.executemany(
+        "INSERT INTO tickets (username, title, category, status, assignee, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [("alice", "Old", "IT", "closed", "bob", "2023-01-02 10:00:00"),
+         ("alice", "New", "IT", "open", "dave", "2024-05-06 10:00:00")]
+    )
+    conn.commit()
+    archive_batch(conn, [1])
+    assert [m[0] for m in migrate(conn, target=14)] == [13, 14]
+    rows = conn.execute("SELECT week, category, status, assignee, count FROM ticket_rollup ORDER BY 1").fetchall()
+    assert [tuple(r) for r in rows] == [("2023-01", "IT", "closed", "bob", 1), ("2024-19", "IT", "open", "dave", 1)]
+    conn.close()
+
+
+ALL_TICKETS = ("(SELECT created_at, closed_at, category, status, assignee FROM main.tickets "
+               "UNION ALL SELECT created_at, closed_at, category, status, assignee FROM archive.tickets)")
+
+
+def bucket(minutes):
+    return next((i for i, bound in enumerate(CLOSE_TIME_BUCKETS) if minutes < bound), len(CLOSE_TIME_BUCKETS))
+
+
+def assert_rollups_match_base_tables():
+    conn = get_db()
+    counted = conn.execute(f"""
+        SELECT strftime('%Y-%W', created_at), COALESCE(category, ''), COALESCE(status, ''), COALESCE(assignee, ''),
+               COUNT(*)
+        FROM {ALL_TICKETS} GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4
+    """).fetchall()
+    assert [tuple(r) for r in rollup()] == [tuple(r) for r in counted]
+
+    closed = conn.execute(f"""
+        SELECT strftime('%Y-%W', closed_at), COALESCE(category, ''),
+               (julianday(closed_at) - julianday(created_at)) * 1440
+        FROM {ALL_TICKETS} WHERE status = 'closed' AND closed_at IS NOT NULL
+    """).fetchall()
+    histogram = {}
+    for week, category, minutes in closed:
+        key = (week, category, bucket(minutes))
+        histogram[key] = histogram.get(key, 0) + 1
+    stored = conn.execute("SELECT week, category, bucket, count FROM ticket_close_histogram WHERE count != 0").fetchall()
+    assert {tuple(r[:3]): r[3] for r in stored} == histogram
+
+
+def test_rollups_match_a_fresh_group_by_after_every_change(db):
+    create_user("bob", "Secret1!", "technician")
+    ids = [create_ticket("alice", f"Ticket {n}", category, "Details", "alice@example.com", "555-0100")
+           for n, category in enumerate(("IT", "IT", "Facilities", "Other"))]
+    assert_rollups_match_base_tables()
+
+    update_ticket_status(ids[0], "in progress", notify=False)
+    assert_rollups_match_base_tables()
+    for ticket_id in ids[:3]:
+        update_ticket_status(ticket_id, "closed", notify=False)
+    assert_rollups_match_base_tables()
+
+    update_ticket_status(ids[2], "open", notify=False)
+    reassign_ticket(ids[3], None)
+    assert_rollups_match_base_tables()
+
+    archive_batch(get_db(), [ids[0], ids[1]])
+    assert_rollups_match_base_tables()
@@ -0,0 +1,117 @@
+import pytest
+
+from backend.database import get_db
+from backend.models import create_ticket, create_user, get_ticket_by_id, set_technician_availability, update_ticket_status
+from backend import scheduler, writer
+from backend.scheduler import TimerWheel, pick_technician, run_sla_worker, update_profile
+from backend.writer import write
+
+
+def technician(username, skills, capacity=None):
+    create_user(username, "Secret1!", "technician")
+    write(update_profile, username, skills, capacity)
+
+
+def ticket(category="IT"):
+    ticket_id = create_ticket("alice", f"{category} problem", category, "Details", "alice@example.com", "555-0100")
+    return get_ticket_by_id(ticket_id)
+
+
+@pytest.fixture
+def staff(db):
+    create_user("alice", "Secret1!", "student")
+    technician("bob", "IT")
+    technician("carol", "Facilities")
+    technician("dave", "IT,Academic")
+    return db
+
+
+def test_ticket_goes_to_least_loaded_skilled_technician(staff):
+    assert [ticket("IT")["assignee"] for _ in range(4)] == ["bob", "dave", "bob", "dave"]
+    assert ticket("Facilities")["assignee"] == "carol"
+    assert ticket("Academic")["assignee"] == "dave"
+
+
+def test_unskilled_category_goes_to_least_loaded_technician(staff):
+    ticket("IT")
+    ticket("Facilities")
+    assert ticket("Other")["assignee"] == "dave"
+
+
+def test_backlog_waits_for_free_capacity(staff):
+    for username in ("bob", "carol", "dave"):
+        write(update_profile, username, None, 1)
+    first, second, third = ticket("IT"), ticket("IT"), ticket("Facilities")
+    assert {first["assignee"], second["assignee"]} == {"bob", "dave"}
+    assert third["assignee"] == "carol"
+    waiting = ticket("IT")
+    assert waiting["assignee"] is None
+
+    update_ticket_status(first["id"], "closed", notify=False)
+    assert get_ticket_by_id(waiting["id"])["assignee"] == first["assignee"]
+
+
+def test_rolled_back_pick_does_not_count(staff):
+    def pick_then_fail(conn):
+        assert pick_technician(conn, "IT") == "bob"
+        raise RuntimeError("rolled back")
+
+    with pytest.raises(RuntimeError):
+        write(pick_then_fail)
+    assert ticket("IT")["assignee"] == "bob"
+
+
+def test_inline_writes_reload_only_after_other_commits(staff, monkeypatch):
+    monkeypatch.setattr(writer, "WRITER_ENABLED", False)
+    loads, load = [], scheduler.Scheduler.load
+
+    def counting_load(self, conn):
+        loads.append(conn)
+        load(self, conn)
+
+    monkeypatch.setattr(scheduler.Scheduler, "load", counting_load)
+    ticket("IT")
+    ticket("IT")
+    ticket("Facilities")
+    assert len(loads) == 1
+
+    conn = staff.connect()
+    conn.execute("UPDATE technician_profiles SET capacity = 0 WHERE username = 'carol'")
+    conn.commit()
+    conn.close()
+    assert ticket("Facilities")["assignee"] != "carol"
+    assert len(loads) == 2
+
+
+def test_going_offline_hands_tickets_to_others(staff):
+    mine = [ticket("IT") for _ in range(2)]
+    moved = [t for t in mine if t["assignee"] == "bob"]
+    assert set_technician_availability("bob", False) == len(moved)
+    for t in moved:
+        assert get_ticket_by_id(t["id"])["assignee"] in ("carol", "dave")
+    assert ticket("IT")["assignee"] != "bob"
+
+
+def test_overdue_tickets_are_escalated(staff):
+    late, on_time = ticket("IT"), ticket("IT")
+    conn = get_db()
+    conn.execute("UPDATE tickets SET due_at = datetime('now', '-1 hour'), assignee = NULL WHERE id = ?", (late["id"],))
+    conn.commit()
+
+    messages = []
+    run_sla_worker(once=True, echo=messages.append)
+    conn = get_db()
+    escalated = conn.execute("SELECT id, assignee FROM tickets WHERE escalated_at IS NOT NULL").fetchall()
+    assert [row["id"] for row in escalated] == [late["id"]]
+    assert escalated[0]["assignee"] is not None
+    assert get_ticket_by_id(on_time["id"])["escalated_at"] is None
+
+
+def test_timer_wheel_fires_deadlines_on_their_tick():
+    wheel = TimerWheel(slots=4, tick=1, now=0)
+    wheel.schedule(2.5, "soon")
+    wheel.schedule(9, "after a revolution")
+    assert wheel.advance(2) == []
+    assert wheel.advance(3) == ["soon"]
+    assert wheel.advance(8) == []
+    assert wheel.advance(9) == ["after a revolution"]
@@ -0,0 +1,70 @@
+import pytest
+
+from backend.archive import archive_batch
+from backend.database import get_db
+from backend.models import create_comment, create_ticket, create_user, update_ticket_status
+from backend.search import SEARCH_MAX_PAGE_SIZE, search_tickets
+from conftest import login
+
+
+def ids(query, **kwargs):
+    return [r["id"] for r in search_tickets(query, **kwargs)[0]]
+
+
+def ticket(title="Projector broken", description="No signal in room 4"):
+    return create_ticket("alice", title, "IT", description, "alice@example.com", "555-0100")
+
+
+def test_index_follows_inserts_updates_and_comments(db):
+    ticket_id = ticket()
+    assert ids("projector") == [ticket_id]
+
+    conn = get_db()
+    conn.execute("UPDATE tickets SET title = 'Beamer broken' WHERE id = ?", (ticket_id,))
+    conn.commit()
+    assert ids("projector") == [] and ids("beamer") == [ticket_id]
+
+    create_comment(ticket_id, "bob", "Replaced the HDMI cable")
+    assert ids("hdmi") == [ticket_id]
+    conn.execute("DELETE FROM comments WHERE ticket_id = ?", (ticket_id,))
+    conn.commit()
+    assert ids("hdmi") == []
+
+
+def test_archived_tickets_move_to_the_archive_index(db):
+    ticket_id = ticket()
+    create_comment(ticket_id, "bob", "Replaced the HDMI cable")
+    update_ticket_status(ticket_id, "closed", notify=False)
+    archive_batch(get_db(), [ticket_id])
+    assert ids("hdmi") == []
+    assert ids("hdmi", include_archived=True) == [ticket_id]
+
+
+def test_snippets_escape_ticket_text(db):
+    ticket(description="<script>alert('wifi')</script> wifi & printer")
+    snippet = str(search_tickets("wifi")[0][0]["snippet"])
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet and "&amp;" in snippet
+    assert "<mark>wifi</mark>" in snippet
+
+
+@pytest.mark.parametrize("query, page, per_page", [
+    ("page=x&per_page=y", 1, 20),
+    ("page=-3&per_page=0", 1, 1),
+    ("page=2&per_page=100000", 2, SEARCH_MAX_PAGE_SIZE),
+])
+def test_search_bounds_paging(client, query, page, per_page):
+    create_user("alice", "Secret1!", "student")
+    login(client, "alice", "student")
+    response = client.get(f"/search?q=projector&{query}")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["page"], body["per_page"]) == (page, per_page)
+
+
+def test_user_search_ignores_a_bad_page(client):
+    create_user("alice", "Secret1!", "student")
+    login(client, "tech", "technician")
+    for page in ("x", "-1"):
+        response = client.get(f"/users/search?q=ali&page={page}")
+        assert response.status_code == 200 and b"alice" in response.data
@@ -0,0 +1,67 @@
+from backend.database import connect, get_db
+from backend.migrations import migrate
+from backend.models import create_ticket, update_ticket_status
+from backend.similarity import incident_clusters
+from conftest import login
+
+DRAFT = {"title": "Wifi down in the library", "description": "No wifi on the second floor of the library"}
+
+
+def report(username, title=DRAFT["title"]):
+    return create_ticket(username, title, "IT", DRAFT["description"], f"{username}@example.com", "555-0100")
+
+
+def test_students_only_see_their_own_similar_tickets(client):
+    mine = report("alice")
+    report("bob", "Wifi down in the library for bob's thesis defence")
+    report("carol")
+    login(client, "alice", "student")
+    body = client.get("/tickets/similar", query_string=DRAFT).get_json()
+    assert [t["id"] for t in body["results"]] == [mine]
+    assert "username" not in body["results"][0]
+    assert body["others"] == 2
+
+
+def test_technicians_see_every_similar_ticket(client):
+    ids = [report(username) for username in ("alice", "bob")]
+    login(client, "tech", "technician")
+    body = client.get("/tickets/similar", query_string=DRAFT).get_json()
+    assert sorted(t["id"] for t in body["results"]) == ids
+    assert {t["username"] for t in body["results"]} == {"alice", "bob"}
+
+
+def summaries(conn):
+    return [tuple(r) for r in conn.execute("SELECT cluster_id, leader_id, size FROM ticket_cluster_summaries ORDER BY 1")]
+
+
+def test_cluster_leader_is_reelected_when_it_closes(db):
+    first, second, third = [report(username, f"Wifi down in the library {n}") for n, username in
+                            enumerate(("alice", "bob", "carol"))]
+    assert [c["ids"] for c in incident_clusters.uncached(min_size=3)] == [[first, second, third]]
+
+    update_ticket_status(first, "closed", notify=False)
+    clusters = incident_clusters.uncached(min_size=2)
+    assert [(c["ids"], c["size"], c["title"]) for c in clusters] == [
+        ([second, third], 2, "Wifi down in the library 1")]
+    fourth = report("dave", "Wifi down in the library 3")
+    assert incident_clusters.uncached(min_size=3)[0]["ids"] == [second, third, fourth]
+
+    conn = get_db()
+    counted = [tuple(r) for r in conn.execute(
+        "SELECT leader_id, MIN(ticket_id), COUNT(*) FROM ticket_clusters GROUP BY leader_id ORDER BY 1")]
+    assert summaries(conn) == counted == [(first, second, 3)]
+    for ticket_id in (second, third, fourth):
+        update_ticket_status(ticket_id, "closed", notify=False)
+    assert summaries(conn) == [] and incident_clusters.uncached() == []
+
+
+def test_upgrade_summarises_existing_clusters(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    migrate(conn, target=14)
+    # Cluster 1 lost its leader to the old close trigger.
+    conn.executemany("INSERT INTO ticket_clusters (ticket_id, leader_id) VALUES (?, ?)",
+                     [(2, 1), (3, 1), (4, 4), (5, 4)])
+    conn.commit()
+    assert [m[0] for m in migrate(conn)] == [15]
+    assert summaries(conn) == [(1, 2, 2), (4, 4, 2)]
+    conn.close()
@@ -0,0 +1,70 @@
+import pytest
+
+from backend.archive import archive_batch
+from backend.database import get_db
+from backend.models import create_ticket, get_ticket_by_id, update_ticket_status
+from conftest import login
+
+JSON = {"Accept": "application/json"}
+
+
+def ticket(title="Projector broken"):
+    return create_ticket("alice", title, "IT", "No signal in room 4", "alice@example.com", "555-0100")
+
+
+@pytest.fixture
+def tech(client):
+    login(client, "bob", "technician")
+    return client
+
+
+def test_single_status_change_rejects_an_unknown_status(tech):
+    ticket_id = ticket()
+    with pytest.raises(ValueError):
+        update_ticket_status(ticket_id, "resolved")
+    response = tech.post(f"/ticket/{ticket_id}/status", data={"status": "resolved"}, headers=JSON)
+    assert response.status_code == 400 and response.get_json() == {"error": "Unknown status: resolved"}
+    assert get_ticket_by_id(ticket_id)["status"] == "open"
+
+
+def test_bulk_action_reports_each_ticket(tech):
+    changed, unchanged, archived = ticket("One"), ticket("Two"), ticket("Three")
+    update_ticket_status(unchanged, "in progress", notify=False)
+    update_ticket_status(archived, "closed", notify=False)
+    archive_batch(get_db(), [archived])
+
+    response = tech.post("/tickets/bulk", headers=JSON, data={
+        "ticket_ids": [changed, unchanged, archived, 999, changed], "status": "in progress"})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "results": [
+            {"id": changed, "ok": True, "changed": True, "status": "in progress"},
+            {"id": unchanged, "ok": True, "changed": False, "status": "in progress"},
+            {"id": archived, "ok": False, "error": "Archived tickets are read-only."},
+            {"id": 999, "ok": False, "error": "Ticket not found."},
+        ],
+        "updated": 1,
+        "failed": 2,
+    }
+    assert get_ticket_by_id(changed)["status"] == "in progress"
+
+
+def test_bulk_comment_reaches_every_found_ticket(tech):
+    ids = [ticket("One"), ticket("Two")]
+    response = tech.post("/tickets/bulk", headers=JSON, data={"ticket_ids": ids + [999], "comment": "Looking into it"})
+    body = response.get_json()
+    assert (body["updated"], body["failed"]) == (2, 1)
+    comments = get_db().execute("SELECT ticket_id, technician FROM comments ORDER BY ticket_id").fetchall()
+    assert [tuple(c) for c in comments] == [(ids[0], "bob"), (ids[1], "bob")]
+
+
+@pytest.mark.parametrize("data, error", [
+    ({"ticket_ids": [1], "status": "resolved"}, "Unknown status: resolved"),
+    ({"ticket_ids": [1]}, "Choose a status or write a comment."),
+    ({"status": "closed"}, "Select at least one ticket."),
+])
+def test_invalid_bulk_action_changes_nothing(tech, data, error):
+    ticket()
+    response = tech.post("/tickets/bulk", headers=JSON, data=data)
+    assert response.status_code == 400 and response.get_json() == {"error": error}
+    assert get_ticket_by_id(1)["status"] == "open"
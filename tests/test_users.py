@@ -0,0 +1,47 @@
+from werkzeug.security import generate_password_hash
+
+from backend import models
+from backend.database import get_db
+from backend.models import create_user, get_user_by_username
+from backend.passwords import check_password, current_method
+from conftest import login
+
+
+def test_login_replaces_an_outdated_hash(client):
+    old = generate_password_hash("Secret1!", method="pbkdf2:sha256:500")
+    conn = get_db()
+    conn.execute("INSERT INTO users (username, password, role) VALUES ('alice', ?, 'student')", (old,))
+    conn.commit()
+
+    response = client.post("/login", data={"username": "alice", "password": "Secret1!"})
+    assert response.status_code == 302 and response.headers["Location"].endswith("/student")
+    stored = get_user_by_username("alice")["password"]
+    assert stored != old and stored.split("$", 1)[0] == current_method()
+    assert check_password(stored, "Secret1!")
+
+
+def test_user_management_writes_go_through_the_writer(client, monkeypatch):
+    jobs = []
+
+    def recording_write(fn, *args):
+        jobs.append(args[0].split()[0])
+        return write(fn, *args)
+
+    write = models.write
+    monkeypatch.setattr(models, "write", recording_write)
+    create_user("alice", "Secret1!", "student")
+    alice = get_user_by_username("alice")
+    login(client, "tech", "technician")
+
+    client.post(f"/users/edit/{alice['id']}", data={"role": "technician"})
+    assert get_user_by_username("alice")["role"] == "technician"
+    client.post(f"/users/reset_password/{alice['id']}", data={"new_password": "Changed2!"})
+    assert check_password(get_user_by_username("alice")["password"], "Changed2!")
+
+    login(client, "alice", "technician")
+    client.post("/change_password", data={"old_password": "Changed2!", "new_password": "Again3!"})
+    assert check_password(get_user_by_username("alice")["password"], "Again3!")
+
+    client.post(f"/users/delete/{alice['id']}")
+    assert get_user_by_username("alice") is None
+    assert jobs == ["INSERT", "UPDATE", "UPDATE", "UPDATE", "DELETE"]
@@ -0,0 +1,143 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from backend import attachments, models, writer
+from backend.database import connect, get_db
+from backend.models import create_user
+from backend.writer import Writer, WriterBusy
+from conftest import login
+
+
+def insert(conn, value):
+    conn.execute("INSERT INTO scratch (value) VALUES (?)", (value,))
+    return value
+
+
+def committed(db):
+    conn = connect(db.DB_PATH)
+    try:
+        return [row["value"] for row in conn.execute("SELECT value FROM scratch ORDER BY value")]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def scratch(db):
+    conn = connect(db.DB_PATH)
+    conn.execute("CREATE TABLE scratch (value INTEGER)")
+    conn.commit()
+    conn.close()
+    return db
+
+
+def test_writes_within_the_window_commit_together(scratch):
+    seen = []
+
+    def last(conn):
+        # Earlier writes of the batch are not visible to other connections yet.
+        seen.extend(committed(scratch))
+        return insert(conn, 4)
+
+    w = Writer(scratch.DB_PATH, window=0.5, batch_max=10)
+    futures = [w.submit(insert, value) for value in (1, 2, 3)] + [w.submit(last)]
+    assert [f.result(5) for f in futures] == [1, 2, 3, 4]
+    assert seen == []
+    assert committed(scratch) == [1, 2, 3, 4]
+
+
+def test_failed_write_is_rolled_back_alone(scratch):
+    def broken(conn):
+        insert(conn, 2)
+        raise ValueError("boom")
+
+    w = Writer(scratch.DB_PATH, window=0.5, batch_max=10)
+    futures = [w.submit(insert, 1), w.submit(broken), w.submit(insert, 3)]
+    assert futures[0].result(5) == 1
+    with pytest.raises(ValueError, match="boom"):
+        futures[1].result(5)
+    assert futures[2].result(5) == 3
+    assert committed(scratch) == [1, 3]
+
+
+def test_full_queue_raises_writer_busy(scratch):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(conn):
+        started.set()
+        release.wait(5)
+        return insert(conn, 1)
+
+    w = Writer(scratch.DB_PATH, queue_size=1, window=0)
+    first = w.submit(blocking)
+    assert started.wait(5)
+    queued = w.submit(insert, 2)
+    with pytest.raises(WriterBusy):
+        w.submit(insert, 3, timeout=0.05)
+    release.set()
+    assert first.result(5) == 1 and queued.result(5) == 2
+    assert committed(scratch) == [1, 2]
+
+
+def test_locked_database_raises_writer_busy(scratch, monkeypatch):
+    blocker = sqlite3.connect(scratch.DB_PATH)
+    blocker.execute("BEGIN IMMEDIATE")
+    conn = connect(scratch.DB_PATH)
+    conn.execute("PRAGMA busy_timeout=0")
+    monkeypatch.setattr(writer, "connect", lambda path=None: conn)
+    try:
+        with pytest.raises(WriterBusy):
+            Writer(scratch.DB_PATH).submit(insert, 1).result(5)
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_new_ticket_with_attachment(client, monkeypatch, enabled):
+    monkeypatch.setattr(writer, "WRITER_ENABLED", enabled)
+    create_user("alice", "Secret1!", "student")
+    login(client, "alice", "student")
+    response = client.post("/ticket/new", data={
+        "title": "Projector broken", "category": "IT", "description": "No signal in room 4",
+        "email": "alice@example.com", "phone": "555-0100",
+        "attachment": (io.BytesIO(b"%PDF-1.4 test"), "photo.pdf"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 302
+
+    conn = get_db()
+    ticket = conn.execute("SELECT * FROM tickets WHERE username = 'alice'").fetchone()
+    assert ticket["attachment"] == "photo.pdf"
+    row = conn.execute("SELECT * FROM attachments WHERE id = ?", (ticket["attachment_id"],)).fetchone()
+    assert row["size"] == len(b"%PDF-1.4 test")
+    download = client.get(f"/ticket/{ticket['id']}/attachment")
+    assert download.status_code == 200 and download.data == b"%PDF-1.4 test"
+
+
+def test_failed_ticket_does_not_leave_its_upload_behind(client, monkeypatch):
+    create_user("alice", "Secret1!", "student")
+    login(client, "alice", "student")
+
+    def post(content):
+        return client.post("/ticket/new", data={
+            "title": "Projector broken", "category": "IT", "description": "No signal in room 4",
+            "email": "alice@example.com", "phone": "555-0100",
+            "attachment": (io.BytesIO(content), "photo.pdf"),
+        }, content_type="multipart/form-data")
+
+    assert post(b"%PDF-1.4 kept").status_code == 302
+    kept = get_db().execute("SELECT sha256 FROM attachments").fetchone()["sha256"]
+
+    def broken(*args):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(models, "index_ticket", broken)
+    for content in (b"%PDF-1.4 orphan", b"%PDF-1.4 kept"):
+        with pytest.raises(RuntimeError):
+            post(content)
+    assert not os.path.exists(attachments.blob_path(hashlib.sha256(b"%PDF-1.4 orphan").hexdigest()))
+    assert os.path.exists(attachments.blob_path(kept))